@@ -1,10 +1,2 @@
 # StableQueue Forge Extension
-print("\n\n==================================================")
-print("STABLEQUEUE EXTENSION: LOADING")
-print("==================================================\n\n")
-
-print("STABLEQUEUE: Extension initialized")
-
-print("\n\n==================================================")
-print("STABLEQUEUE EXTENSION: LOADING COMPLETE")
-print("==================================================\n\n") 
\ No newline at end of file
+# Forge loads scripts/stablequeue.py; this file intentionally does no work at import.
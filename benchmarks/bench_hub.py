@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+End-to-end submission benchmark against a local fake hub
+
+Loads the extension with Forge stubbed, points it at benchmarks/fake_hub.py
+and measures single-submit latency percentiles, bulk throughput (through the
+bulk endpoint and through client-side fan-out) and memory use.
+
+    python benchmarks/bench_hub.py --single 500 --bulk 5000 --json hub.json
+    python benchmarks/bench_hub.py --latency 0.02 --error-rate 0.05 --max-rps 50 --rate-limit adaptive
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from benchmarks import forge_stubs
+from benchmarks.bench_sweep import BASE_PARAMS
+from benchmarks.fake_hub import FakeHub
+
+
+def percentiles(samples, points=(50, 95, 99)):
+    """Nearest-rank percentiles of samples, in milliseconds"""
+    if not samples:
+        return {f"p{point}": None for point in points}
+    ordered = sorted(samples)
+    return {f"p{point}": ordered[min(len(ordered) - 1, int(len(ordered) * point / 100))] * 1000 for point in points}
+
+
+def bench_single(backend, hub, count):
+    params = dict(BASE_PARAMS, target_server_alias="gpu-1")
+    latencies, failures = [], 0
+    for _ in range(count):
+        start = time.perf_counter()
+        if not backend.submit_to_stablequeue(params, hub.url, "key", "secret"):
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+    return {"submits": count, "failures": failures, **percentiles(latencies),
+            "mean_ms": sum(latencies) / len(latencies) * 1000 if latencies else None}
+
+
+def bench_bulk(backend, hub, count):
+    params = dict(BASE_PARAMS, target_server_alias="gpu-1", seed=1000)
+    start = time.perf_counter()
+    queued = backend.submit_bulk_to_stablequeue(params, count, hub.url, "key", "secret")
+    elapsed = time.perf_counter() - start
+    requests = hub.stats["requests"]
+
+    # Memory is measured on a second run; tracemalloc slows everything it traces
+    tracemalloc.start()
+    backend.submit_bulk_to_stablequeue(params, count, hub.url, "key", "secret")
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "jobs": count,
+        "queued": queued,
+        "seconds": elapsed,
+        "jobs_per_s": queued / elapsed if elapsed else None,
+        "requests": requests,
+        "peak_traced_mb": peak / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--single", type=int, default=200, help="single submissions to time")
+    parser.add_argument("--bulk", type=int, default=2000, help="jobs per bulk run")
+    parser.add_argument("--fanout", type=int, default=500, help="jobs for the run against a hub without a bulk endpoint")
+    parser.add_argument("--latency", type=float, default=0.0, help="hub latency per submission (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random hub latency (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of submissions answered with 500")
+    parser.add_argument("--max-rps", type=int, default=0, help="hub answers 429 above this many submissions per second")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After sent with 429s (seconds)")
+    parser.add_argument("--rate-limit", default="off", choices=["off", "fixed", "adaptive"], help="client rate limit mode")
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--json", help="write machine-readable results to this file")
+    args = parser.parse_args()
+
+    hub_options = dict(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                       max_rps=args.max_rps, retry_after=args.retry_after)
+    forge_stubs.install({
+        "stablequeue_api_key": "key",
+        "stablequeue_api_secret": "secret",
+        "stablequeue_rate_limit_mode": args.rate_limit,
+        "stablequeue_job_delay": 0,
+        "stablequeue_max_in_flight": args.max_in_flight,
+        "stablequeue_track_jobs": False,
+        "stablequeue_outbox_journal": False,
+        "stablequeue_log_level": "ERROR",
+    }, stub_gradio=True)
+    module = forge_stubs.load_extension()
+    backend = module.StableQueueScript().backend
+
+    results = {
+        "benchmark": "hub",
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "options": vars(args),
+    }
+    with FakeHub(**hub_options) as hub:
+        results["single"] = bench_single(backend, hub, args.single)
+        results["single"]["hub"] = dict(hub.stats)
+    with FakeHub(**hub_options) as hub:
+        results["bulk"] = bench_bulk(backend, hub, args.bulk)
+        results["bulk"]["hub"] = dict(hub.stats)
+    with FakeHub(bulk=False, **hub_options) as hub:
+        results["fanout"] = bench_bulk(backend, hub, args.fanout)
+        results["fanout"]["hub"] = dict(hub.stats)
+    results["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    single, bulk, fanout = results["single"], results["bulk"], results["fanout"]
+    print(f"single  {single['submits']} submits, {single['failures']} failed   "
+          f"p50 {single['p50']:.2f} ms   p95 {single['p95']:.2f} ms   p99 {single['p99']:.2f} ms")
+    for name, run in (("bulk", bulk), ("fan-out", fanout)):
+        print(f"{name:<7} {run['queued']}/{run['jobs']} queued in {run['seconds']:.2f} s   "
+              f"{run['jobs_per_s']:,.0f} jobs/s   {run['requests']} requests   peak {run['peak_traced_mb']:.1f} MB traced")
+    print(f"max RSS {results['max_rss_mb']:.1f} MB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
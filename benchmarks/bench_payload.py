@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Bulk payload benchmark: bytes on the wire and JSON encoding time for full
+per-job payloads versus the template-plus-delta format
+
+    python benchmarks/bench_payload.py --jobs 10000 --json payload.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from benchmarks.bench_sweep import AXES, BASE_PARAMS
+from lib_stablequeue import delta, sweep
+
+
+def build_payload(params):
+    # Same shape as Backend.build_payload, without needing Forge settings
+    from lib_stablequeue.backend import Backend
+    return Backend(lambda key, default: default, "http://127.0.0.1", ".").build_payload(params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=10_000)
+    parser.add_argument("--json", help="write machine-readable results to this file")
+    args = parser.parse_args()
+
+    combos = 1
+    for values in AXES.values():
+        combos *= len(values)
+    plan = sweep.build_plan(max(1, args.jobs // combos), 1234, "sequential", axes=AXES)
+    params = dict(BASE_PARAMS, target_server_alias="bench")
+
+    start = time.perf_counter()
+    full = [json.dumps(build_payload(job), separators=(",", ":")) for job in plan.iter_params(params)]
+    full_s = time.perf_counter() - start
+    full_bytes = sum(len(body) for body in full)
+
+    start = time.perf_counter()
+    batch = delta.template(build_payload(params))
+    batch["axes"], batch["columns"] = delta.plan_columns(plan)
+    delta_body = json.dumps(batch, separators=(",", ":"))
+    delta_s = time.perf_counter() - start
+
+    # The hub must be able to rebuild exactly the same jobs
+    assert len(delta.decode(json.loads(delta_body))) == len(full)
+
+    results = {
+        "benchmark": "payload",
+        "jobs": len(plan),
+        "full": {"bytes": full_bytes, "encode_s": full_s},
+        "delta": {"bytes": len(delta_body), "encode_s": delta_s},
+        "bytes_ratio": full_bytes / len(delta_body),
+        "time_ratio": full_s / delta_s,
+    }
+    print(f"{len(plan)} jobs")
+    print(f"full payloads   {full_bytes:>12,} bytes   {full_s * 1000:8.2f} ms")
+    print(f"template+delta  {len(delta_body):>12,} bytes   {delta_s * 1000:8.2f} ms")
+    print(f"reduction       {results['bytes_ratio']:.1f}x bytes, {results['time_ratio']:.1f}x time")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: extension import and UI construction with Forge stubbed
+
+Each round runs in a fresh subprocess so import caches don't hide regressions.
+Any socket connection attempted during import, script construction or UI
+building is counted and reported; it should always be zero.
+
+    python benchmarks/bench_startup.py --rounds 20 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+EXTENSION_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def run_once():
+    """Measure one cold start inside this process and print the result as JSON"""
+    import socket
+    import threading
+
+    sys.path.insert(0, EXTENSION_DIR)
+    from benchmarks import forge_stubs
+
+    connects = []
+    original_connect = socket.socket.connect
+
+    def counting_connect(sock, address):
+        connects.append(address)
+        return original_connect(sock, address)
+
+    socket.socket.connect = counting_connect
+    # Credentials configured so any eager server fetch would show up as a connect
+    forge_stubs.install({"stablequeue_url": "http://127.0.0.1:9", "stablequeue_api_key": "key", "stablequeue_api_secret": "secret"})
+    threads_before = threading.active_count()
+
+    start = time.perf_counter()
+    module = forge_stubs.load_extension()
+    import_time = time.perf_counter() - start
+    import_connects = len(connects)
+
+    start = time.perf_counter()
+    instances = [module.StableQueueScript() for _ in range(4)]
+    construct_time = time.perf_counter() - start
+    construct_connects = len(connects) - import_connects
+    construct_threads = threading.active_count() - threads_before
+
+    start = time.perf_counter()
+    instances[0].ui(False)
+    instances[1].ui(True)
+    module.create_stablequeue_tab()
+    ui_time = time.perf_counter() - start
+
+    print(json.dumps({
+        "import_s": import_time,
+        "construct_s": construct_time,
+        "ui_s": ui_time,
+        "import_connects": import_connects,
+        "construct_connects": construct_connects,
+        "construct_threads": construct_threads,
+        "shared_backend": len({id(instance.backend) for instance in instances}) == 1,
+    }))
+
+
+def summarize(samples, key):
+    values = sorted(sample[key] for sample in samples)
+    return {
+        "median": statistics.median(values),
+        "min": values[0],
+        "max": values[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=10, help="number of cold-start rounds")
+    parser.add_argument("--json", help="write machine-readable results to this file")
+    parser.add_argument("--once", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.once:
+        run_once()
+        return
+
+    samples = []
+    for _ in range(args.rounds):
+        output = subprocess.run([sys.executable, __file__, "--once"], capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    results = {
+        "benchmark": "startup",
+        "rounds": args.rounds,
+        "python": sys.version.split()[0],
+        "import_s": summarize(samples, "import_s"),
+        "construct_s": summarize(samples, "construct_s"),
+        "ui_s": summarize(samples, "ui_s"),
+        "network_connects_during_startup": max(s["import_connects"] + s["construct_connects"] for s in samples),
+        "threads_started_by_constructors": max(s["construct_threads"] for s in samples),
+        "shared_backend": all(s["shared_backend"] for s in samples),
+    }
+
+    for key in ("import_s", "construct_s", "ui_s"):
+        print(f"{key:<12} median {results[key]['median'] * 1000:8.2f} ms   (min {results[key]['min'] * 1000:.2f}, max {results[key]['max'] * 1000:.2f})")
+    print(f"network connects during import/construct: {results['network_connects_during_startup']}")
+    print(f"threads started by constructors: {results['threads_started_by_constructors']}")
+    print(f"single shared backend: {results['shared_backend']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if results["network_connects_during_startup"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Sweep planner benchmark: build large seed/parameter plans and feed them to a
+(no-op) submission path
+
+    python benchmarks/bench_sweep.py --jobs 100000 --json sweep.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from lib_stablequeue import sweep
+
+BASE_PARAMS = {
+    "prompt": "a {red|blue|green} {cat|dog} in a garden",
+    "negative_prompt": "blurry",
+    "width": 512,
+    "height": 512,
+    "steps": 20,
+    "cfg_scale": 7.0,
+    "sampler_name": "Euler",
+    "checkpoint_name": "model_a",
+}
+
+AXES = {
+    "steps": [10, 20, 30, 40, 50],
+    "cfg_scale": [3.0, 5.0, 7.0, 9.0],
+    "sampler_name": ["Euler", "Euler a", "DPM++ 2M", "DDIM", "UniPC"],
+    "checkpoint_name": ["model_a", "model_b"],
+}
+
+
+def timed(fn, repeats):
+    samples = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return result, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=100_000, help="approximate number of planned jobs")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", help="write machine-readable results to this file")
+    args = parser.parse_args()
+
+    axes = dict(AXES, prompt=sweep.expand_wildcards(BASE_PARAMS["prompt"]))
+    combos = 1
+    for values in axes.values():
+        combos *= len(values)
+    seeds_per_combo = max(1, args.jobs // combos)
+
+    results = {"benchmark": "sweep", "python": sys.version.split()[0], "combinations": combos}
+    for mode in sweep.SEED_MODES:
+        plan, build_s = timed(lambda: sweep.build_plan(seeds_per_combo, 1234, mode, stride=7, axes=axes), args.repeats)
+        # Feed the plan to a submission path that only consumes the params
+        _, iterate_s = timed(lambda: sum(1 for _ in plan.iter_params(BASE_PARAMS)), 1)
+        results[mode] = {"jobs": len(plan), "build_s": build_s, "materialize_s": iterate_s}
+        print(f"{mode:<10} {len(plan):>8} jobs   build {build_s * 1000:8.2f} ms   materialize {iterate_s * 1000:8.2f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Local stand-in for a StableQueue hub
+
+Implements just enough of the hub API for benchmarks:
+GET /status, GET /api/v1/servers, POST /api/v2/generate,
+POST /api/v2/generate/bulk and (optionally) chunked NDJSON uploads to
+POST /api/v2/generate/stream, with configurable latency, error rate and
+429 throttling. Runs in a background thread, on an ephemeral port unless
+one is given.
+"""
+
+import gzip
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeHub:
+    """In-process fake hub
+
+    latency/jitter: seconds added to every submission
+    error_rate: fraction of submissions answered with 500
+    max_rps: submissions per second accepted before answering 429 (0 = no limit)
+    retry_after: Retry-After seconds sent with 429s
+    bulk: whether /api/v2/generate/bulk exists (404 otherwise)
+    stream: whether chunked NDJSON uploads to /api/v2/generate/stream are
+        read; otherwise any chunked upload gets 411, like many proxies
+    port: port to listen on (0 = ephemeral), e.g. to restart a stopped hub at the same URL
+
+    Submissions repeating an Idempotency-Key get the original answer again.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, max_rps=0, retry_after=1,
+                 bulk=True, stream=False, servers=("gpu-1", "gpu-2"), seed=0, port=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        self.bulk = bulk
+        self.stream = stream
+        self.port = port
+        self.servers = [{"alias": alias, "status": "online", "queue_depth": 0} for alias in servers]
+        self.random = random.Random(seed)
+        self.job_ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "jobs": 0, "errors": 0, "throttled": 0, "duplicates": 0, "bytes": 0, "chunks": 0}
+        self.idempotent = {}
+        self.window = (0, 0)
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        hub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; don't let Nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/status":
+                    self.reply(200, {"status": "ok"})
+                elif self.path == "/api/v1/servers":
+                    self.reply(200, hub.servers)
+                else:
+                    self.reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    if hub.stream and self.path == "/api/v2/generate/stream":
+                        self.stream_jobs()
+                        return
+                    # Like many proxies: no streamed uploads, and the unread body spoils the connection
+                    self.close_connection = True
+                    self.reply(411, {"error": "length required"}, {"Connection": "close"})
+                    return
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path not in ("/api/v2/generate", "/api/v2/generate/bulk") or (
+                        self.path.endswith("/bulk") and not hub.bulk):
+                    self.reply(404, {"error": "not found"})
+                    return
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                payload = json.loads(body)
+
+                status, headers = hub.admit(len(body))
+                if status != 202:
+                    self.reply(status, {"error": "busy" if status == 429 else "internal error"}, headers)
+                    return
+
+                key = self.headers.get("Idempotency-Key")
+                with hub.lock:
+                    previous = hub.idempotent.get(key) if key else None
+                    if previous is not None:
+                        hub.stats["duplicates"] += 1
+                if previous is not None:
+                    self.reply(202, previous)
+                    return
+
+                if self.path.endswith("/bulk"):
+                    count = int(payload.get("bulk_quantity") or len(payload.get("jobs") or []) or 1)
+                    if payload.get("columns"):
+                        count = len(next(iter(payload["columns"].values())))
+                    result = {"success": True, "total_jobs": count, "job_ids": hub.new_jobs(count)}
+                else:
+                    result = {"success": True, "job_id": hub.new_jobs(1)[0]}
+                if key:
+                    with hub.lock:
+                        hub.idempotent[key] = result
+                self.reply(202, result)
+
+            def stream_jobs(self):
+                # Count job lines as chunks arrive, holding at most one partial line
+                size = count = chunks = 0
+                pending = b""
+                while True:
+                    length = int(self.rfile.readline().split(b";")[0], 16)
+                    if not length:
+                        break
+                    data = pending + self.rfile.read(length)
+                    self.rfile.readline()
+                    size += length
+                    chunks += 1
+                    *lines, pending = data.split(b"\n")
+                    count += sum(1 for line in lines if line.strip())
+                while self.rfile.readline().strip():
+                    pass  # trailers
+                count += 1 if pending.strip() else 0
+                with hub.lock:
+                    hub.stats["chunks"] += chunks
+
+                status, headers = hub.admit(size)
+                if status != 202:
+                    self.reply(status, {"error": "busy" if status == 429 else "internal error"}, headers)
+                    return
+                # The first line is the header (the delta template), not a job
+                total = max(0, count - 1)
+                self.reply(202, {"success": True, "total_jobs": total, "job_ids": hub.new_jobs(total)})
+
+            def reply(self, status, data, headers=None):
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-hub", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def admit(self, size):
+        """Decide how to answer one submission, sleeping for the configured latency"""
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["bytes"] += size
+            if self.max_rps:
+                second = int(time.monotonic())
+                started, count = self.window
+                self.window = (second, count + 1) if started == second else (second, 1)
+                if self.window[1] > self.max_rps:
+                    self.stats["throttled"] += 1
+                    return 429, {"Retry-After": str(self.retry_after)}
+            failed = self.random.random() < self.error_rate
+            delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+        if failed:
+            with self.lock:
+                self.stats["errors"] += 1
+            return 500, {}
+        return 202, {}
+
+    def new_jobs(self, count):
+        with self.lock:
+            self.stats["jobs"] += count
+            return [f"job-{next(self.job_ids)}" for _ in range(count)]
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
@@ -0,0 +1,152 @@
+"""
+Minimal stand-ins for Forge's modules.* (and gradio, if not installed)
+
+Lets benchmarks load scripts/stablequeue.py the way Forge does, without a
+Forge checkout. Only the surface the extension touches is provided.
+"""
+
+import importlib.util
+import os
+import sys
+import types
+
+EXTENSION_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+SCRIPT_PATH = os.path.join(EXTENSION_DIR, "scripts", "stablequeue.py")
+
+
+class _Component:
+    """Stand-in for any gradio component or layout block
+
+    Event listeners are recorded in listeners as (component, event, kwargs).
+    """
+
+    listeners = []
+
+    def __init__(self, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def click(self, *args, **kwargs):
+        self.listeners.append((self, "click", kwargs))
+        return self
+
+    def change(self, *args, **kwargs):
+        self.listeners.append((self, "change", kwargs))
+        return self
+
+    def load(self, *args, **kwargs):
+        self.listeners.append((self, "load", kwargs))
+        return self
+
+    @classmethod
+    def update(cls, **kwargs):
+        return kwargs
+
+
+def _make_gradio():
+    gr = types.ModuleType("gradio")
+    for name in ("Accordion", "Blocks", "Button", "Column", "Dropdown", "HTML", "Radio",
+                 "Row", "Slider", "State", "Textbox", "Number", "Checkbox"):
+        setattr(gr, name, type(name, (_Component,), {}))
+    return gr
+
+
+def install(opts=None, stub_gradio=None):
+    """Register stub modules in sys.modules and return the stub shared.opts.data dict
+
+    stub_gradio=None uses the real gradio when it is importable.
+    """
+    data = dict(opts or {})
+
+    modules = types.ModuleType("modules")
+    modules.__path__ = []
+
+    scripts = types.ModuleType("modules.scripts")
+
+    class Script:
+        pass
+
+    scripts.Script = Script
+    scripts.AlwaysVisible = object()
+
+    shared = types.ModuleType("modules.shared")
+
+    class OptionInfo:
+        def __init__(self, default=None, label="", component=None, component_args=None, section=None, **kwargs):
+            self.default = default
+            self.label = label
+            self.section = section
+
+    class Options:
+        def __init__(self):
+            self.data = data
+            self.data_labels = {}
+
+        def add_option(self, key, info):
+            self.data_labels[key] = info
+            self.data.setdefault(key, info.default)
+
+        def onchange(self, key, func, call=True):
+            if call:
+                func()
+
+    shared.OptionInfo = OptionInfo
+    shared.opts = Options()
+
+    ui_components = types.ModuleType("modules.ui_components")
+    ui_components.FormRow = ui_components.FormGroup = ui_components.ToolButton = _Component
+
+    script_callbacks = types.ModuleType("modules.script_callbacks")
+    script_callbacks.callbacks = {"ui_tabs": [], "ui_settings": [], "app_started": []}
+    script_callbacks.on_ui_tabs = script_callbacks.callbacks["ui_tabs"].append
+    script_callbacks.on_ui_settings = script_callbacks.callbacks["ui_settings"].append
+    script_callbacks.on_app_started = script_callbacks.callbacks["app_started"].append
+
+    processing = types.ModuleType("modules.processing")
+    processing.StableDiffusionProcessing = type("StableDiffusionProcessing", (), {})
+    processing.Processed = type("Processed", (), {"__init__": lambda self, p, images_list, **kwargs: None})
+    # Records every generation that reaches the (stub) GPU
+    processing.local_generations = []
+
+    def process_images(p):
+        processing.local_generations.append(p)
+        return processing.Processed(p, [])
+
+    processing.process_images = process_images
+
+    # Like Forge's img2img, binds process_images by name at import time
+    img2img = types.ModuleType("modules.img2img")
+    img2img.process_images = process_images
+
+    for name, module in [("modules", modules), ("modules.scripts", scripts), ("modules.shared", shared),
+                         ("modules.ui_components", ui_components), ("modules.script_callbacks", script_callbacks),
+                         ("modules.processing", processing), ("modules.img2img", img2img)]:
+        sys.modules[name] = module
+        if "." in name:
+            setattr(modules, name.split(".", 1)[1], module)
+
+    if stub_gradio is None:
+        stub_gradio = importlib.util.find_spec("gradio") is None
+    if stub_gradio:
+        sys.modules["gradio"] = _make_gradio()
+
+    return data
+
+
+def load_extension():
+    """Load scripts/stablequeue.py like Forge does: by path, with the extension dir on sys.path"""
+    saved_path = list(sys.path)
+    sys.path.insert(0, EXTENSION_DIR)
+    try:
+        spec = importlib.util.spec_from_file_location("stablequeue.py", SCRIPT_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    finally:
+        sys.path[:] = saved_path
@@ -41,7 +41,7 @@
             color: white;
             font-weight: 500;
             box-shadow: 0 2px 8px rgba(0,0,0,0.2);
-            background-color: ${type === 'success' ? '#28a745' : '#dc3545'};
+            background-color: ${type === 'success' ? '#28a745' : type === 'pending' ? '#e0a800' : '#dc3545'};
         `;
         notification.textContent = message;
         
@@ -54,6 +54,73 @@
         }, 5000);
     }
 
+    // Jobs queued within BATCH_WINDOW_MS of each other go to Forge in one request
+    const BATCH_WINDOW_MS = 150;
+    const MAX_BATCH_JOBS = 100;
+    let pendingJobs = [];
+    let flushTimer = null;
+
+    // One nonce per click; a resend of the same job reuses it, so the hub
+    // sees the same idempotency key and can drop the duplicate
+    function newNonce() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID().replace(/-/g, '');
+        }
+        return Date.now().toString(16) + Math.random().toString(16).slice(2);
+    }
+
+    function queueJob(params, jobType) {
+        pendingJobs.push({ params, jobType, nonce: newNonce() });
+        if (pendingJobs.length >= MAX_BATCH_JOBS) {
+            flushJobs();
+        } else if (flushTimer === null) {
+            flushTimer = setTimeout(flushJobs, BATCH_WINDOW_MS);
+        }
+    }
+
+    function flushJobs() {
+        clearTimeout(flushTimer);
+        flushTimer = null;
+        const batch = pendingJobs;
+        pendingJobs = [];
+        if (batch.length === 0) {
+            return;
+        }
+
+        fetch('/stablequeue/queue_batch', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                jobs: batch.map(job => ({
+                    context_data: Object.assign({}, job.params, { idempotency_nonce: job.nonce }),
+                    server_alias: '', // Will be handled by Python
+                    job_type: job.jobType
+                }))
+            })
+        })
+        .then(response => response.json())
+        .then(data => {
+            const results = data.results || [];
+            batch.forEach((job, i) => {
+                const result = results[i] || data;
+                job.params.notification = result.success
+                    ? { text: result.message, type: 'success' }
+                    : result.pending
+                        ? { text: result.message, type: 'pending' }
+                        : { text: `Error: ${result.message || 'Unknown error'}`, type: 'error' };
+            });
+            if (batch.length > 1 || !data.success) {
+                showNotification(data.message || 'Unknown error', data.success ? 'success' : 'error');
+            }
+        })
+        .catch(error => {
+            console.error(`[${EXTENSION_NAME}] Error:`, error);
+            batch.forEach(job => {
+                job.params.notification = { text: `Connection error: ${error.message}`, type: 'error' };
+            });
+        });
+    }
+
     // Phase 2: Context menu functionality preserved but simplified  
     // (Still uses the old approach for now - can be enhanced later)
     function registerContextMenuHandlers() {
@@ -65,57 +132,13 @@
         // Note: Context menu still uses the old server selection approach
         // This could be enhanced in Phase 3 to integrate with the new Gradio UI
         window.stablequeue_send_single = function(params) {
-            // Use StableQueue tab server selection for context menu
-            // For now, just forward to Python backend
-            fetch('/stablequeue/context_menu_queue', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    context_data: params,
-                    server_alias: '', // Will be handled by Python
-                    job_type: 'single'
-                })
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.success) {
-                    params.notification = { text: data.message, type: 'success' };
-                } else {
-                    params.notification = { text: `Error: ${data.message || 'Unknown error'}`, type: 'error' };
-                }
-            })
-            .catch(error => {
-                console.error(`[${EXTENSION_NAME}] Error:`, error);
-                params.notification = { text: `Connection error: ${error.message}`, type: 'error' };
-            });
-            
+            // Server selection is handled by Python
+            queueJob(params, 'single');
             return params;
         };
         
         window.stablequeue_send_bulk = function(params) {
-            // Use StableQueue tab server selection for context menu
-            fetch('/stablequeue/context_menu_queue', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    context_data: params,
-                    server_alias: '', // Will be handled by Python 
-                    job_type: 'bulk'
-                })
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.success) {
-                    params.notification = { text: data.message, type: 'success' };
-                } else {
-                    params.notification = { text: `Error: ${data.message || 'Unknown error'}`, type: 'error' };
-                }
-            })
-            .catch(error => {
-                console.error(`[${EXTENSION_NAME}] Error:`, error);
-                params.notification = { text: `Connection error: ${error.message}`, type: 'error' };
-            });
-            
+            queueJob(params, 'bulk');
             return params;
         };
         
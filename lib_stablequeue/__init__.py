@@ -0,0 +1,2 @@
+# StableQueue Forge Extension - support library
+# Forge-independent helpers used by scripts/stablequeue.py
@@ -0,0 +1,85 @@
+"""
+Non-blocking hub client for the extension's FastAPI routes
+
+Route handlers run on Forge's event loop, where a blocking requests.post
+stalls every other API call. With the optional httpx package installed,
+submissions from those routes go out over one shared httpx.AsyncClient per
+hub, using HTTP/2 (many requests multiplexed over one connection) when h2 is
+installed too. Without httpx, Backend runs the blocking client in an executor
+instead.
+"""
+
+import importlib.util
+import json
+import threading
+
+from lib_stablequeue import hub_client, log
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+HTTP2 = httpx is not None and importlib.util.find_spec("h2") is not None
+
+
+class AsyncHubClient:
+    """httpx counterpart of HubClient.post_json for one hub
+
+    Shares the blocking client's URL, credentials, timeouts and learned
+    capabilities; compression is only used once the blocking client has seen
+    the hub accept it.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.config = client.config
+        connect_timeout, read_timeout = client.timeout
+        self.session = httpx.AsyncClient(
+            base_url=client.server_url,
+            headers={"X-API-Key": client.api_key, "X-API-Secret": client.api_secret},
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=client.pool_size, max_keepalive_connections=client.pool_size),
+            http2=HTTP2,
+        )
+
+    async def post_json(self, path, payload, headers=None):
+        with log.step("serialize"):
+            body = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+        headers = {"Content-Type": "application/json", **(headers or {})}
+
+        method = self.client.compression
+        if method == "zstd" and hub_client.zstandard is None:
+            method = "gzip"
+        if (method != "none" and len(body) >= self.client.compression_threshold
+                and self.client.capabilities.get(f"compression_{method}")):
+            body, headers["Content-Encoding"] = hub_client.compress(body, method)
+
+        return await self.session.post(f"/{path.lstrip('/')}", content=body, headers=headers)
+
+    async def aclose(self):
+        await self.session.aclose()
+
+
+# One async client per hub URL; Forge serves its API from a single event loop
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(client):
+    """Return the shared async client for a blocking HubClient, rebuilding it if its settings changed
+
+    The replaced client is left for the garbage collector: closing it needs
+    the event loop, and requests may still be in flight on it.
+    """
+    with _clients_lock:
+        async_client = _clients.get(client.server_url)
+        if async_client is None or async_client.config != client.config:
+            async_client = AsyncHubClient(client)
+            _clients[client.server_url] = async_client
+        return async_client
+
+
+def is_connection_error(error):
+    """True for failures where the request most likely never reached the hub"""
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
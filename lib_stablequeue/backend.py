@@ -0,0 +1,1127 @@
+"""
+Shared StableQueue backend
+
+One Backend sits behind every StableQueueScript instance, the StableQueue tab
+and the API routes. Constructing it does no I/O: the hub client, server list
+cache and outbox (with its journal and worker threads) are created on first
+use.
+"""
+
+import asyncio
+import contextvars
+import functools
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from lib_stablequeue import async_client, blobs, bulk, delta, downloads, hub_client, idempotency, journal, log, metrics, outbox, ratelimit, resilience, routing, server_cache, streaming, sweep, tracker
+
+DEFAULT_API_WORKERS = 4
+DEFAULT_MAX_BATCH_JOBS = 1000
+
+# A retried request whose original hasn't been answered; if that one fails, the job is not queued
+IN_FLIGHT_MESSAGE = "Identical request is still being submitted, not confirmed yet"
+
+
+def expand_batch(data):
+    """Jobs of a /stablequeue/queue_batch request body
+
+    Either {"jobs": [{"context_data": {...}, "server_alias": ..., "job_type": ...}, ...]}
+    or {"template": {...}, "variations": [{...}, ...], "server_alias": ..., "job_type": ...},
+    where each variation overrides fields of the template for one job.
+    """
+    if "template" in data:
+        template = data.get("template") or {}
+        return [
+            {"context_data": {**template, **(variation or {})},
+             "server_alias": data.get("server_alias", ""),
+             "job_type": data.get("job_type", "single")}
+            for variation in data.get("variations") or [{}]
+        ]
+    return [job for job in data.get("jobs") or [] if isinstance(job, dict)]
+
+
+class Backend:
+    """Lazily initialised hub client, server cache, outbox and submission logic
+
+    get_setting(key, default) reads the current extension settings; in Forge
+    this is shared.opts.data.get, in benchmarks a plain dict's get.
+    """
+
+    def __init__(self, get_setting, default_server_url, data_dir):
+        self.setting = get_setting
+        self.default_server_url = default_server_url
+        self.data_dir = data_dir
+        self._server_cache = None
+        self._outbox = None
+        self._tracker = None
+        self._downloader = None
+        self._blob_store = None
+        self._router = None
+        self._api_executor = None
+        self._dedup_cache = None
+        self._click_cache = None
+        self._limiters = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+        self.configure_logging()
+
+        metrics.REGISTRY.gauge("stablequeue_outstanding_jobs", "Submitted jobs not yet finished on the hub",
+                               lambda: self._tracker.outstanding() if self._tracker else 0)
+        metrics.REGISTRY.gauge("stablequeue_outbox_pending", "Outbox entries waiting to be submitted",
+                               lambda: self._outbox.pending_count() if self._outbox else 0)
+        metrics.REGISTRY.gauge("stablequeue_circuit_open", "1 while submissions to a server are paused",
+                               lambda: {(("server", url),): int(breaker.state == resilience.OPEN) for url, breaker in list(self._breakers.items())})
+        metrics.REGISTRY.gauge("stablequeue_rate_limit", "Current submission rate limit (requests per second)",
+                               lambda: {(("server", url),): limiter.rate for url, limiter in list(self._limiters.items()) if limiter.enabled})
+
+    def client(self, server_url=None, api_key=None, api_secret=None):
+        """Return the shared, pooled hub client configured from settings"""
+        return hub_client.get_client(
+            server_url or self.setting("stablequeue_url", self.default_server_url),
+            api_key if api_key is not None else self.setting("stablequeue_api_key", ""),
+            api_secret if api_secret is not None else self.setting("stablequeue_api_secret", ""),
+            pool_size=int(self.setting("stablequeue_pool_size", hub_client.DEFAULT_POOL_SIZE)),
+            connect_timeout=float(self.setting("stablequeue_connect_timeout", hub_client.DEFAULT_CONNECT_TIMEOUT)),
+            read_timeout=float(self.setting("stablequeue_read_timeout", hub_client.DEFAULT_READ_TIMEOUT)),
+            compression=self.setting("stablequeue_compression", hub_client.DEFAULT_COMPRESSION),
+            compression_threshold=int(self.setting("stablequeue_compression_threshold", hub_client.DEFAULT_COMPRESSION_THRESHOLD)),
+        )
+
+    def has_credentials(self):
+        return bool(self.setting("stablequeue_api_key", "") and self.setting("stablequeue_api_secret", ""))
+
+    @property
+    def server_cache(self):
+        """Process-wide server list cache, created on first use"""
+        with self._lock:
+            if self._server_cache is None:
+                ttl = float(self.setting("stablequeue_servers_ttl", server_cache.DEFAULT_TTL))
+                self._server_cache = server_cache.ServerAliasCache(self.request_servers, ttl=ttl)
+            return self._server_cache
+
+    def configure_logging(self):
+        """Apply the logging and tracing settings"""
+        trace_path = None
+        if self.setting("stablequeue_trace", False):
+            trace_path = self.setting("stablequeue_trace_path", "") or os.path.join(self.data_dir, "traces.jsonl")
+        log.configure(
+            level=self.setting("stablequeue_log_level", log.DEFAULT_LEVEL),
+            rate_limit=int(self.setting("stablequeue_log_rate_limit", log.DEFAULT_RATE_LIMIT)),
+            trace_path=trace_path,
+            trace_max_bytes=int(float(self.setting("stablequeue_trace_max_mb", log.DEFAULT_TRACE_MAX_MB)) * 1024 * 1024),
+        )
+
+    def request_servers(self):
+        """Fetch the server list from StableQueue (used by the server cache)"""
+        if not self.has_credentials():
+            raise ValueError("API credentials not configured")
+
+        response = self.client().get("/api/v1/servers")
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to fetch servers: {response.status_code} - {response.text}")
+        return response.json()
+
+    def journal_path(self):
+        return self.setting("stablequeue_journal_path", "") or os.path.join(self.data_dir, "outbox.sqlite3")
+
+    def resume_outbox(self):
+        """Replay a previous run's journal at startup instead of waiting for the next submission
+
+        Opening the outbox reads the journal and starts its workers, so it
+        runs on a background thread to keep startup from waiting on SQLite.
+        """
+        if self._outbox is not None or not self.setting("stablequeue_outbox_journal", True):
+            return None
+        if not os.path.exists(self.journal_path()):
+            return None
+        thread = threading.Thread(target=lambda: self.outbox, name="stablequeue-outbox-resume", daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def outbox(self):
+        """Process-wide submission outbox, created (and its journal replayed) on first use"""
+        with self._lock:
+            if self._outbox is None:
+                workers = int(self.setting("stablequeue_outbox_workers", outbox.DEFAULT_WORKERS))
+
+                outbox_journal = None
+                if self.setting("stablequeue_outbox_journal", True):
+                    try:
+                        outbox_journal = journal.Journal(
+                            self.journal_path(),
+                            synchronous=self.setting("stablequeue_journal_sync", journal.DEFAULT_SYNCHRONOUS),
+                            batch_size=int(self.setting("stablequeue_journal_batch_size", journal.DEFAULT_BATCH_SIZE)),
+                            commit_interval=float(self.setting("stablequeue_journal_commit_interval", journal.DEFAULT_COMMIT_INTERVAL)),
+                        )
+                    except Exception as e:
+                        log.warning("Could not open outbox journal, submissions will not survive restarts: %s", e)
+
+                self._outbox = outbox.Outbox(self.submit_outbox_entry, workers=workers, journal=outbox_journal, probe_fn=self.probe_hub)
+            return self._outbox
+
+    @property
+    def tracker(self):
+        """Process-wide job tracker; its poller thread starts with the first tracked job"""
+        with self._lock:
+            if self._tracker is None:
+                self._tracker = tracker.JobTracker(
+                    self.client,
+                    batch_size=int(self.setting("stablequeue_status_batch_size", tracker.DEFAULT_BATCH_SIZE)),
+                    min_interval=float(self.setting("stablequeue_status_min_interval", tracker.DEFAULT_MIN_INTERVAL)),
+                    max_interval=float(self.setting("stablequeue_status_max_interval", tracker.DEFAULT_MAX_INTERVAL)),
+                    max_misses=int(self.setting("stablequeue_status_max_misses", tracker.DEFAULT_MAX_MISSES)),
+                    max_age=float(self.setting("stablequeue_status_max_age", tracker.DEFAULT_MAX_AGE)),
+                )
+                self._tracker.add_listener(self.on_job_update)
+            return self._tracker
+
+    @property
+    def downloader(self):
+        """Process-wide result downloader, created on first use"""
+        with self._lock:
+            if self._downloader is None:
+                self._downloader = downloads.ResultDownloader(
+                    self.client,
+                    self.setting("stablequeue_download_dir", "") or os.path.join("outputs", "stablequeue"),
+                    max_concurrent=int(self.setting("stablequeue_download_concurrency", downloads.DEFAULT_MAX_CONCURRENT)),
+                )
+            return self._downloader
+
+    @property
+    def blob_store(self):
+        """Process-wide content-addressed image store, created on first use"""
+        with self._lock:
+            if self._blob_store is None:
+                self._blob_store = blobs.BlobStore(
+                    self.client,
+                    cache_size=int(self.setting("stablequeue_blob_cache_size", blobs.DEFAULT_CACHE_SIZE)),
+                )
+            return self._blob_store
+
+    @property
+    def router(self):
+        """Process-wide router for the "auto" target alias, created on first use"""
+        server_cache = self.server_cache
+        with self._lock:
+            if self._router is None:
+                self._router = routing.Router(
+                    server_cache,
+                    swap_penalty=float(self.setting("stablequeue_route_swap_penalty", routing.DEFAULT_SWAP_PENALTY)),
+                )
+            return self._router
+
+    @property
+    def api_executor(self):
+        """Threads for blocking work requested from the API routes, created on first use
+
+        Kept apart from the event loop's default executor so queued hub calls
+        can't starve Forge's own API handlers.
+        """
+        with self._lock:
+            if self._api_executor is None:
+                self._api_executor = ThreadPoolExecutor(
+                    max_workers=int(self.setting("stablequeue_api_workers", DEFAULT_API_WORKERS)),
+                    thread_name_prefix="stablequeue-api",
+                )
+            return self._api_executor
+
+    async def run_blocking(self, fn, *args, **kwargs):
+        """Run fn in api_executor without blocking the event loop
+
+        fn runs in a copy of the caller's context, so its trace steps land in the caller's span.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.api_executor, functools.partial(contextvars.copy_context().run, fn, *args, **kwargs))
+
+    @property
+    def dedup_cache(self):
+        """Idempotency keys in flight or recently accepted"""
+        config = (float(self.setting("stablequeue_dedup_ttl", idempotency.DEFAULT_TTL)), idempotency.DEFAULT_CACHE_SIZE)
+        with self._lock:
+            if self._dedup_cache is None or self._dedup_cache.config != config:
+                self._dedup_cache = idempotency.DedupCache(*config)
+            return self._dedup_cache
+
+    def is_repeat_click(self, params, server_alias, extra=None):
+        """True if identical params (and extra) were queued for server_alias within the repeat window (a double-click)
+
+        A retry of the same click carries its nonce and is left to the idempotency key.
+        """
+        window = float(self.setting("stablequeue_repeat_window", idempotency.DEFAULT_REPEAT_WINDOW))
+        if window <= 0:
+            return False
+        with self._lock:
+            if self._click_cache is None or self._click_cache.ttl != window:
+                self._click_cache = idempotency.DedupCache(window, idempotency.DEFAULT_CACHE_SIZE)
+            clicks = self._click_cache
+        nonce = params.get(idempotency.NONCE_FIELD) if isinstance(params, dict) else None
+        if nonce and clicks.state(f"nonce:{nonce}") is not None:
+            return False
+        if clicks.claim(f"{server_alias}:{idempotency.fingerprint(params)}:{idempotency.fingerprint(extra)}"):
+            if nonce:
+                clicks.claim(f"nonce:{nonce}")
+            return False
+        metrics.inc("stablequeue_duplicates_total", stage="click")
+        log.info("Ignoring repeated submission of identical parameters for %s", server_alias)
+        return True
+
+    def claim_key(self, path, idempotency_key):
+        """Claim a request's idempotency key, raising idempotency.Duplicate if it is taken
+
+        Raises idempotency.InFlight instead while the request holding the key
+        is still unanswered: it may yet fail, so the repeat isn't known to be queued.
+        """
+        if not self.dedup_cache.claim(idempotency_key):
+            metrics.inc("stablequeue_duplicates_total", stage="request")
+            metrics.inc("stablequeue_submissions_total", endpoint=path, status="duplicate")
+            if self.dedup_cache.state(idempotency_key) == idempotency.DONE:
+                raise idempotency.Duplicate(f"Request {idempotency_key} is already queued")
+            # Also when the original was released in the meantime: nothing has queued it
+            raise idempotency.InFlight(f"Request {idempotency_key} is still being submitted")
+
+    def settle_key(self, idempotency_key, response):
+        """Keep an accepted request's key; release it otherwise so the request can be sent again"""
+        if response is not None and 200 <= response.status_code < 300:
+            self.dedup_cache.done(idempotency_key)
+        else:
+            self.dedup_cache.release(idempotency_key)
+
+    def route(self, params, count=1):
+        """Resolve an "auto" target alias for count jobs, returning params with a real alias
+
+        Always called off the event loop, so it may wait for the first server
+        list fetch (e.g. for journaled jobs replayed right after startup).
+        """
+        if params.get("target_server_alias") != routing.AUTO_ALIAS:
+            return params
+        self.server_cache.ensure()
+        alias = self.router.choose(params.get("checkpoint_name", ""), count)
+        if alias is None:
+            raise RuntimeError("No StableQueue server available for automatic routing")
+        return {**params, "target_server_alias": alias}
+
+    def rate_limiter(self, client):
+        """Rate limiter for one hub, rebuilt only when its settings change"""
+        limiter = ratelimit.RateLimiter(
+            mode=self.setting("stablequeue_rate_limit_mode", ratelimit.DEFAULT_MODE),
+            job_delay=float(self.setting("stablequeue_job_delay", 5)),
+            max_rate=float(self.setting("stablequeue_rate_limit_max", ratelimit.DEFAULT_MAX_RATE)),
+        )
+        with self._lock:
+            current = self._limiters.get(client.server_url)
+            if current is not None and current.config == limiter.config:
+                return current
+            self._limiters[client.server_url] = limiter
+            return limiter
+
+    def circuit_breaker(self, client):
+        """Circuit breaker (with its cached health probe) for one hub"""
+        server_url = client.server_url
+        config = (
+            int(self.setting("stablequeue_breaker_threshold", resilience.DEFAULT_FAILURE_THRESHOLD)),
+            float(self.setting("stablequeue_breaker_reset", resilience.DEFAULT_RESET_TIMEOUT)),
+        )
+        with self._lock:
+            breaker = self._breakers.get(server_url)
+            if breaker is None or breaker.config != config:
+                health_check = resilience.HealthCheck(
+                    lambda: self.request_status(server_url),
+                    ttl=float(self.setting("stablequeue_health_ttl", resilience.DEFAULT_HEALTH_TTL)),
+                )
+                breaker = resilience.CircuitBreaker(*config, health_check=health_check)
+                self._breakers[server_url] = breaker
+            return breaker
+
+    def post_job(self, client, path, payload, send=None, idempotency_key=None):
+        """Send one submission request through the hub's circuit breaker and rate limiter
+
+        send(path, payload) defaults to client.post_json. Connection failures
+        and 429/502/503/504 responses are retried with exponential backoff and
+        jitter. Raises resilience.CircuitOpen without touching the network
+        while the hub is known to be down.
+
+        An idempotency_key is sent as a header (with the default send) and
+        raises idempotency.Duplicate, without sending, while the same key is
+        in flight or was accepted within the dedup TTL.
+        """
+        if idempotency_key is not None:
+            self.claim_key(path, idempotency_key)
+            if send is None:
+                send = functools.partial(client.post_json, headers={idempotency.HEADER: idempotency_key})
+            response = None
+            try:
+                response = self.post_job(client, path, payload, send)
+                return response
+            finally:
+                self.settle_key(idempotency_key, response)
+
+        send = send or client.post_json
+        breaker = self.circuit_breaker(client)
+        limiter = self.rate_limiter(client)
+        attempts = max(1, int(self.setting("stablequeue_retry_attempts", resilience.DEFAULT_RETRY_ATTEMPTS)))
+
+        for attempt in range(attempts):
+            if not breaker.allow():
+                metrics.inc("stablequeue_submissions_total", endpoint=path, status="circuit_open")
+                raise resilience.CircuitOpen(f"StableQueue server {client.server_url} is unreachable")
+
+            with log.step("rate_limit"):
+                limiter.acquire()
+            started = time.monotonic()
+            try:
+                with metrics.timer("stablequeue_submission_seconds", endpoint=path), log.step("http"):
+                    response = send(path, payload)
+            except requests.exceptions.ConnectionError:
+                # Most likely never reached the hub, so it is safe to send again
+                if not self.record_failed_send(path, breaker, "connection_error", attempt + 1 < attempts):
+                    raise
+                time.sleep(resilience.backoff_delay(attempt))
+                continue
+            except requests.exceptions.Timeout:
+                # The hub may have accepted the job; don't risk queueing it twice
+                self.record_failed_send(path, breaker, "timeout", False)
+                raise
+
+            if self.record_response(path, response, time.monotonic() - started, breaker, limiter, attempt + 1 < attempts):
+                # A Retry-After header is waited out by the rate limiter
+                time.sleep(resilience.backoff_delay(attempt))
+                continue
+            return response
+
+    async def post_job_async(self, client, path, payload, idempotency_key=None):
+        """post_job for the event loop: the same breaker, rate limit, retries and dedup, but never blocking
+
+        Needs the optional httpx package (see async_client).
+        """
+        if idempotency_key is not None:
+            self.claim_key(path, idempotency_key)
+            response = None
+            try:
+                response = await self.post_job_async_attempts(client, path, payload, {idempotency.HEADER: idempotency_key})
+                return response
+            finally:
+                self.settle_key(idempotency_key, response)
+        return await self.post_job_async_attempts(client, path, payload)
+
+    async def post_job_async_attempts(self, client, path, payload, headers=None):
+        session = async_client.get_client(client)
+        breaker = self.circuit_breaker(client)
+        limiter = self.rate_limiter(client)
+        attempts = max(1, int(self.setting("stablequeue_retry_attempts", resilience.DEFAULT_RETRY_ATTEMPTS)))
+
+        for attempt in range(attempts):
+            # allow() may run the hub health probe, which blocks
+            if not await self.run_blocking(breaker.allow):
+                metrics.inc("stablequeue_submissions_total", endpoint=path, status="circuit_open")
+                raise resilience.CircuitOpen(f"StableQueue server {client.server_url} is unreachable")
+
+            with log.step("rate_limit"):
+                wait = limiter.reserve()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            started = time.monotonic()
+            try:
+                with metrics.timer("stablequeue_submission_seconds", endpoint=path), log.step("http"):
+                    response = await session.post_json(path, payload, headers=headers)
+            except async_client.httpx.TransportError as e:
+                if async_client.is_connection_error(e):
+                    if not self.record_failed_send(path, breaker, "connection_error", attempt + 1 < attempts):
+                        raise
+                    await asyncio.sleep(resilience.backoff_delay(attempt))
+                    continue
+                self.record_failed_send(path, breaker, "timeout" if isinstance(e, async_client.httpx.TimeoutException) else "error", False)
+                raise
+
+            if self.record_response(path, response, time.monotonic() - started, breaker, limiter, attempt + 1 < attempts):
+                await asyncio.sleep(resilience.backoff_delay(attempt))
+                continue
+            return response
+
+    def record_failed_send(self, path, breaker, reason, may_retry):
+        """Book-keeping for a request that got no response; returns whether to retry it"""
+        metrics.inc("stablequeue_submissions_total", endpoint=path, status=reason)
+        breaker.record_failure()
+        if may_retry:
+            metrics.inc("stablequeue_retries_total", reason=reason)
+        return may_retry
+
+    def record_response(self, path, response, latency, breaker, limiter, may_retry):
+        """Book-keeping for one hub response; returns whether to retry the request"""
+        metrics.inc("stablequeue_submissions_total", endpoint=path, status=response.status_code)
+        limiter.observe(response.status_code, latency, response.headers.get("Retry-After"))
+        if response.status_code in resilience.RETRY_STATUSES and may_retry:
+            metrics.inc("stablequeue_retries_total", reason=response.status_code)
+            if response.status_code != 429:
+                breaker.record_failure()
+            return True
+
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return False
+
+    def prepare_payload(self, payload):
+        """Final payload tweaks before it goes on the wire"""
+        if self.setting("stablequeue_blob_dedup", True):
+            payload = self.blob_store.rewrite(payload)
+        return payload
+
+    def on_job_update(self, job):
+        """Tracker listener: pull finished images back into the local outputs folder"""
+        if self._router is not None:
+            self._router.observe(job)
+        if job["status"] in downloads.COMPLETED_STATES and self.setting("stablequeue_download_results", True):
+            self.downloader.enqueue_job(job)
+
+    def track_response(self, data, server_alias):
+        """Start tracking every job ID found in a submission response"""
+        if not self.setting("stablequeue_track_jobs", True) or not isinstance(data, dict):
+            return
+        job_ids = [tracker.job_id_of(data)]
+        job_ids += [str(job_id) for job_id in data.get("job_ids", [])]
+        job_ids += [tracker.job_id_of(job) for job in data.get("jobs", []) if isinstance(job, dict)]
+        for job_id in job_ids:
+            if job_id:
+                self.tracker.track(job_id, server_alias)
+
+    def request_status(self, server_url=None):
+        """Return True if the StableQueue hub answers its /status endpoint"""
+        try:
+            return self.client(server_url).get("/status", timeout=(2, 2)).status_code < 500
+        except Exception:
+            return False
+
+    def probe_hub(self):
+        """Cached hub health probe; also opens or closes the hub's circuit to match"""
+        breaker = self.circuit_breaker(self.client())
+        healthy = breaker.health_check()
+        if healthy:
+            breaker.record_success()
+        else:
+            breaker.trip()
+        return healthy
+
+    def submit_outbox_entry(self, entry):
+        """Outbox worker callback: submit one entry to the hub, returning (success, message)"""
+        with log.span("submission", handle=entry.handle, kind=entry.kind, server_alias=entry.server_alias) as span:
+            job = entry.job
+            # Credentials are read at submit time so they are never written to the journal
+            credentials = (
+                job["server_url"],
+                self.setting("stablequeue_api_key", ""),
+                self.setting("stablequeue_api_secret", ""),
+            )
+
+            if entry.kind == "bulk":
+                params = job["params"]
+                bulk_quantity = job["bulk_quantity"]
+                seed_mode = job.get("seed_mode", sweep.DEFAULT_SEED_MODE)
+                base_seed = params.get("seed", -1)
+
+                # A replay after the hub went away mid-job resumes where it stopped
+                offset = job.get("offset", 0)
+                try:
+                    # The hub's bulk endpoint only knows incremental and unseeded random seeds
+                    if job.get("sweep") or seed_mode == "strided" or (seed_mode == "random" and base_seed != -1):
+                        plan = sweep.build_plan(
+                            bulk_quantity, base_seed, seed_mode,
+                            stride=job.get("seed_stride", 1),
+                            axes=sweep.parse_axes(job.get("sweep", ""), params.get("prompt", "")),
+                        )
+                        total_jobs = len(plan)
+                        success_count = self.submit_plan(params, plan, *credentials, offset=offset)
+                    else:
+                        total_jobs = bulk_quantity
+                        success_count = self.submit_bulk_to_stablequeue(params, bulk_quantity, *credentials, offset=offset)
+                except bulk.Interrupted as e:
+                    # Failing the entry lets the outbox park it, with this progress journaled
+                    job["offset"] = e.offset
+                    job["queued"] = job.get("queued", 0) + e.queued
+                    span.set(jobs=total_jobs, queued=job["queued"])
+                    return False, f"StableQueue server went away after {job['queued']}/{total_jobs} bulk jobs on {entry.server_alias}"
+                success_count += job.get("queued", 0)
+
+                metrics.observe("stablequeue_bulk_jobs", total_jobs)
+                span.set(jobs=total_jobs, queued=success_count)
+                if success_count > 0:
+                    return True, f"{success_count}/{total_jobs} bulk jobs queued on {entry.server_alias}"
+                return False, f"Failed to queue bulk jobs on {entry.server_alias}"
+
+            try:
+                success = self.submit_to_stablequeue(job["params"], *credentials)
+            except idempotency.InFlight:
+                return False, f"Job is already being submitted to {entry.server_alias}, not confirmed yet"
+            span.set(jobs=1, queued=int(success))
+            if success:
+                return True, f"Job queued successfully on {entry.server_alias}"
+            return False, f"Failed to queue job on {entry.server_alias}"
+
+    def build_payload(self, params):
+        """Format payload according to StableQueue v2 API specification"""
+        return {
+            "app_type": "forge",
+            "target_server_alias": params.get("target_server_alias", "default"),
+            "generation_params": {
+                "positive_prompt": params.get("prompt", ""),
+                "negative_prompt": params.get("negative_prompt", ""),
+                "width": params.get("width", 512),
+                "height": params.get("height", 512),
+                "steps": params.get("steps", 20),
+                "cfg_scale": params.get("cfg_scale", 7.0),
+                "sampler_name": params.get("sampler_name", "Euler"),
+                "seed": params.get("seed", -1),
+                "batch_size": params.get("batch_size", 1),
+                "n_iter": params.get("n_iter", 1),
+                "restore_faces": params.get("restore_faces", False),
+                "checkpoint_name": params.get("checkpoint_name", ""),
+                "enable_hr": params.get("enable_hr", False),
+                "hr_scale": params.get("hr_scale", 2.0),
+                "hr_upscaler": params.get("hr_upscaler", "Latent"),
+                "denoising_strength": params.get("denoising_strength", 0.7),
+                # Images and extension args are only sent when present
+                **{key: params[key] for key in ("init_images", "mask", "alwayson_scripts") if params.get(key)},
+            },
+            "source_info": "forge_extension_v1.0.0"
+        }
+
+    def submit_to_stablequeue(self, params, server_url, api_key, api_secret):
+        """Submit job to StableQueue server using v2 API
+
+        Raises idempotency.InFlight if the same request is already being sent.
+        """
+        try:
+            with metrics.timer("stablequeue_payload_build_seconds", kind="single"), log.step("build"):
+                payload = self.prepare_payload(self.build_payload(self.route(params)))
+        except Exception as e:
+            log.error("✗ Error submitting job: %s", e)
+            return False
+
+        return self.submit_payload(self.client(server_url, api_key, api_secret), payload, params.get(idempotency.NONCE_FIELD))
+
+    def submit_payload(self, client, payload, nonce=None):
+        """POST one built payload to /api/v2/generate, returning whether the hub accepted it
+
+        Raises idempotency.InFlight if the same request is already being sent.
+        """
+        try:
+            url = client.url("/api/v2/generate")
+
+            log.debug("Submitting to %s", url)
+            log.debug("Target server: %s", payload['target_server_alias'])
+
+            response = self.post_job(client, "/api/v2/generate", payload, idempotency_key=idempotency.make_key(payload, nonce))
+
+            if response.status_code == 202:  # StableQueue v2 returns 202 Accepted
+                with log.step("response"):
+                    result = response.json()
+                    job_id = tracker.job_id_of(result) or 'unknown'
+                    log.info("✓ Job queued with ID: %s", job_id)
+                    self.track_response(result, payload['target_server_alias'])
+                return True
+            else:
+                log.error("✗ Failed to queue: %s - %s", response.status_code, response.text)
+                return False
+
+        except idempotency.InFlight:
+            log.info("Job is already being submitted, not sending it again")
+            raise
+        except idempotency.Duplicate:
+            log.info("Job already queued, not sending it again")
+            return True
+        except requests.exceptions.Timeout:
+            log.error("✗ Timeout connecting to StableQueue server")
+            return False
+        except Exception as e:
+            log.error("✗ Error submitting job: %s", e)
+            return False
+
+    async def submit_to_stablequeue_async(self, params, server_url, api_key, api_secret):
+        """submit_to_stablequeue for the event loop; payload building (and blob uploads) run in api_executor
+
+        Raises idempotency.InFlight if the same request is already being sent.
+        """
+        try:
+            def build():
+                with metrics.timer("stablequeue_payload_build_seconds", kind="single"), log.step("build"):
+                    return self.prepare_payload(self.build_payload(self.route(params)))
+
+            payload = await self.run_blocking(build)
+            client = self.client(server_url, api_key, api_secret)
+            response = await self.post_job_async(client, "/api/v2/generate", payload,
+                                                 idempotency_key=idempotency.make_key(payload, params.get(idempotency.NONCE_FIELD)))
+
+            if response.status_code == 202:
+                with log.step("response"):
+                    result = response.json()
+                    log.info("✓ Job queued with ID: %s", tracker.job_id_of(result) or 'unknown')
+                    self.track_response(result, payload['target_server_alias'])
+                return True
+            log.error("✗ Failed to queue: %s - %s", response.status_code, response.text)
+            return False
+
+        except idempotency.InFlight:
+            log.info("Job is already being submitted, not sending it again")
+            raise
+        except idempotency.Duplicate:
+            log.info("Job already queued, not sending it again")
+            return True
+        except async_client.httpx.TimeoutException:
+            log.error("✗ Timeout connecting to StableQueue server")
+            return False
+        except Exception as e:
+            log.error("✗ Error submitting job: %s", e)
+            return False
+
+    def submit_bulk_to_stablequeue(self, params, bulk_quantity, server_url, api_key, api_secret, offset=0):
+        """Submit a bulk job via /api/v2/generate/bulk, chunking very large quantities
+
+        Falls back to client-side fan-out of single jobs if the hub has no bulk
+        endpoint (404). Returns the number of jobs queued. Starts at job offset;
+        raises bulk.Interrupted if the hub goes away between chunks.
+        """
+        client = self.client(server_url, api_key, api_secret)
+        base_seed = params.get('seed', -1)
+        chunk_size = int(self.setting("stablequeue_bulk_chunk_size", bulk.DEFAULT_BULK_CHUNK_SIZE))
+
+        queued = 0
+        for start, count in bulk.chunk_quantities(bulk_quantity, chunk_size, offset):
+            if client.capabilities.get("bulk_endpoint") is False:
+                return queued + self.fan_out_bulk(params, start, bulk_quantity - start, server_url, api_key, api_secret)
+
+            chunk_params = params.copy()
+            if base_seed != -1:
+                chunk_params['seed'] = base_seed + start
+
+            try:
+                chunk_params = self.route(chunk_params, count)
+            except RuntimeError as e:
+                log.error("✗ %s", e)
+                break
+
+            with metrics.timer("stablequeue_payload_build_seconds", kind="bulk"), log.step("build"):
+                payload = self.prepare_payload({
+                    **self.build_payload(chunk_params),
+                    "bulk_quantity": count,
+                    "seed_variation": "incremental" if base_seed != -1 else "random",
+                    "job_delay": self.setting("stablequeue_job_delay", 5),
+                })
+
+            try:
+                response = self.post_job(client, "/api/v2/generate/bulk", payload,
+                                         idempotency_key=idempotency.make_key(payload, params.get(idempotency.NONCE_FIELD), start))
+            except idempotency.InFlight:
+                # Not counted: the request holding the key may still fail
+                log.info("Bulk job %d is already being submitted, not sending it again", start)
+                continue
+            except idempotency.Duplicate:
+                queued += count
+                continue
+            except (resilience.CircuitOpen, requests.exceptions.RequestException) as e:
+                log.error("✗ StableQueue server went away at bulk job %d: %s", start, e)
+                raise bulk.Interrupted(start, queued) from e
+            except Exception as e:
+                log.error("✗ Error submitting bulk chunk of %d job(s): %s", count, e)
+                continue
+
+            if response.status_code == 404:
+                log.info("Bulk endpoint not available, falling back to individual submissions")
+                client.capabilities["bulk_endpoint"] = False
+                return queued + self.fan_out_bulk(params, start, bulk_quantity - start, server_url, api_key, api_secret)
+
+            if response.status_code in [200, 201, 202]:
+                client.capabilities["bulk_endpoint"] = True
+                result = response.json()
+                total_jobs = result.get('total_jobs', count)
+                self.track_response(result, payload['target_server_alias'])
+                log.info("✓ Bulk chunk queued: %s job(s)", total_jobs)
+                queued += total_jobs
+            else:
+                log.error("✗ Failed to queue bulk chunk: %s - %s", response.status_code, response.text)
+
+        return queued
+
+    def fan_out_bulk(self, params, start, count, server_url, api_key, api_secret):
+        """Submit bulk jobs start..start+count as individual jobs, returning the success count"""
+        # Build one job per bulk entry, varying the seed for each job
+        nonce = params.get(idempotency.NONCE_FIELD)
+        jobs = []
+        for i in range(start, start + count):
+            bulk_params = params.copy()
+            if bulk_params.get('seed', -1) != -1:
+                bulk_params['seed'] = bulk_params['seed'] + i
+            if nonce:
+                # Unseeded jobs are identical, so each needs its own key
+                bulk_params[idempotency.NONCE_FIELD] = idempotency.derive_nonce(nonce, i)
+            jobs.append(bulk_params)
+
+        # Submit with bounded concurrency; results keep job order
+        max_in_flight = int(self.setting("stablequeue_max_in_flight", bulk.DEFAULT_MAX_IN_FLIGHT))
+        results = bulk.submit_concurrently(
+            lambda job: self.submit_to_stablequeue(job, server_url, api_key, api_secret),
+            jobs,
+            max_in_flight=max_in_flight
+        )
+        return sum(1 for success in results if success)
+
+    def submit_plan(self, params, plan, server_url, api_key, api_secret, offset=0):
+        """Submit every job of a sweep.JobPlan, returning the success count
+        
+        Very large plans are streamed as NDJSON; otherwise the template-plus-delta
+        bulk format is used when the hub accepts it, and failing both each job
+        is submitted on its own. Starts at job offset (a resumed plan is never
+        streamed); raises bulk.Interrupted if the hub goes away between chunks.
+        """
+        client = self.client(server_url, api_key, api_secret)
+        stream_threshold = int(self.setting("stablequeue_stream_threshold", streaming.DEFAULT_STREAM_THRESHOLD))
+        if not offset and len(plan) >= stream_threshold and client.capabilities.get("stream_submit") is not False:
+            queued = self.submit_plan_stream(client, params, plan)
+            if queued is not None:
+                return queued
+
+        if self.setting("stablequeue_delta_bulk", True) and client.capabilities.get("delta_bulk") is not False:
+            queued = self.submit_plan_deltas(client, params, plan, offset)
+            if queued is not None:
+                return queued
+
+        nonce = params.get(idempotency.NONCE_FIELD)
+        jobs = itertools.islice(plan.iter_params(params), offset, None)
+        if nonce:
+            jobs = ({**job, idempotency.NONCE_FIELD: idempotency.derive_nonce(nonce, i)} for i, job in enumerate(jobs, offset))
+        max_in_flight = int(self.setting("stablequeue_max_in_flight", bulk.DEFAULT_MAX_IN_FLIGHT))
+        results = bulk.submit_concurrently(
+            lambda job: self.submit_to_stablequeue(job, server_url, api_key, api_secret),
+            jobs,
+            max_in_flight=max_in_flight
+        )
+        return sum(1 for success in results if success)
+
+    def submit_plan_stream(self, client, params, plan):
+        """Stream a plan to /api/v2/generate/stream as NDJSON; None if the hub doesn't support it
+
+        Until a stream has been accepted, a connection that fails before any
+        response (typically a proxy that rejects chunked uploads) also counts
+        as unsupported, so the sweep falls back to delta bulk chunks instead of
+        being lost.
+        """
+        probing = not client.capabilities.get("stream_submit")
+
+        def send(path, header):
+            try:
+                return streaming.stream_jobs(
+                    client, path, header, delta.iter_plan_deltas(plan),
+                    chunk_bytes=int(self.setting("stablequeue_stream_chunk_bytes", streaming.DEFAULT_CHUNK_BYTES)),
+                    max_pending=int(self.setting("stablequeue_stream_max_pending", streaming.DEFAULT_MAX_PENDING_CHUNKS)),
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+                # Raised as something post_job doesn't retry or count against the breaker
+                if probing:
+                    raise streaming.StreamRejected(str(e)) from e
+                raise
+
+        try:
+            with metrics.timer("stablequeue_payload_build_seconds", kind="stream"), log.step("build"):
+                header = delta.template(self.prepare_payload(self.build_payload(self.route(params, len(plan)))))
+            response = self.post_job(client, "/api/v2/generate/stream", header, send=send)
+        except streaming.StreamRejected as e:
+            log.info("Streaming upload failed before the server answered (%s), sending bulk chunks instead", e)
+            client.capabilities["stream_submit"] = False
+            return None
+        except Exception as e:
+            log.error("✗ Error streaming %d job(s): %s", len(plan), e)
+            return 0
+
+        if response.status_code in [200, 201, 202]:
+            client.capabilities["stream_submit"] = True
+            result = response.json()
+            self.track_response(result, header["target_server_alias"])
+            return result.get('total_jobs', len(plan))
+
+        if response.status_code in [404, 405, 411, 415, 501] and probing:
+            log.info("Server does not accept streamed jobs (%s), sending bulk chunks instead", response.status_code)
+            client.capabilities["stream_submit"] = False
+            return None
+
+        log.error("✗ Failed to stream jobs: %s - %s", response.status_code, response.text)
+        return 0
+
+    def submit_plan_deltas(self, client, params, plan, offset=0):
+        """Send a plan from job offset as template-plus-delta bulk chunks; None if the hub doesn't support it"""
+        with metrics.timer("stablequeue_payload_build_seconds", kind="delta"), log.step("build"):
+            batch = delta.template(self.prepare_payload(self.build_payload(params)))
+        chunk_size = int(self.setting("stablequeue_bulk_chunk_size", bulk.DEFAULT_BULK_CHUNK_SIZE))
+
+        queued = 0
+        for start, count in bulk.chunk_quantities(len(plan), chunk_size, offset):
+            with metrics.timer("stablequeue_payload_build_seconds", kind="delta"), log.step("build"):
+                batch["axes"], batch["columns"] = delta.plan_columns(plan, start, start + count)
+            try:
+                batch["target_server_alias"] = self.route(params, count).get("target_server_alias", "default")
+                response = self.post_job(client, "/api/v2/generate/bulk", batch,
+                                         idempotency_key=idempotency.make_key(batch, params.get(idempotency.NONCE_FIELD), start))
+            except idempotency.InFlight:
+                # Not counted: the request holding the key may still fail
+                log.info("Bulk job %d is already being submitted, not sending it again", start)
+                continue
+            except idempotency.Duplicate:
+                queued += count
+                continue
+            except (resilience.CircuitOpen, requests.exceptions.RequestException) as e:
+                log.error("✗ StableQueue server went away at bulk job %d: %s", start, e)
+                raise bulk.Interrupted(start, queued) from e
+            except Exception as e:
+                log.error("✗ Error submitting bulk chunk of %d job(s): %s", count, e)
+                continue
+
+            if response.status_code in [200, 201, 202]:
+                client.capabilities["delta_bulk"] = True
+                result = response.json()
+                queued += result.get('total_jobs', count)
+                self.track_response(result, batch["target_server_alias"])
+            elif response.status_code in [400, 404, 405, 415, 422] and not client.capabilities.get("delta_bulk"):
+                log.info("Server does not accept template+delta bulk jobs, submitting individually")
+                client.capabilities["delta_bulk"] = False
+                return None
+            else:
+                log.error("✗ Failed to queue bulk chunk: %s - %s", response.status_code, response.text)
+
+        return queued
+
+    def submit_batch(self, params_list, server_url, api_key, api_secret):
+        """Submit unrelated jobs together, returning one success flag per job in order
+
+        Jobs for the same server go out as template-plus-delta bulk requests
+        when the hub accepts them; the rest are submitted individually. A job
+        whose identical request is still being sent gets None: not confirmed yet.
+        """
+        client = self.client(server_url, api_key, api_secret)
+        results = [False] * len(params_list)
+        nonces = [params.get(idempotency.NONCE_FIELD) for params in params_list]
+        payloads = {}
+        for index, params in enumerate(params_list):
+            try:
+                with metrics.timer("stablequeue_payload_build_seconds", kind="batch"), log.step("build"):
+                    payloads[index] = self.prepare_payload(self.build_payload(self.route(params)))
+            except Exception as e:
+                log.error("✗ Error building job %d of batch: %s", index + 1, e)
+
+        groups = {}
+        for index, payload in payloads.items():
+            groups.setdefault(payload["target_server_alias"], []).append(index)
+
+        individual = []
+        for indexes in groups.values():
+            if len(indexes) > 1 and self.setting("stablequeue_delta_bulk", True) and client.capabilities.get("delta_bulk") is not False:
+                nonce = "|".join(nonces[index] for index in indexes) if all(nonces[index] for index in indexes) else None
+                queued = self.submit_delta_batch(client, [payloads[index] for index in indexes], nonce)
+                if queued is not None:
+                    for index, success in zip(indexes, queued):
+                        results[index] = success
+                    continue
+            individual.extend(indexes)
+
+        def submit_one(index):
+            try:
+                return self.submit_payload(client, payloads[index], nonces[index])
+            except idempotency.InFlight:
+                return None
+
+        if individual:
+            max_in_flight = int(self.setting("stablequeue_max_in_flight", bulk.DEFAULT_MAX_IN_FLIGHT))
+            outcomes = bulk.submit_concurrently(submit_one, individual, max_in_flight=max_in_flight)
+            for index, success in zip(individual, outcomes):
+                results[index] = success
+        return results
+
+    def submit_delta_batch(self, client, payloads, nonce=None):
+        """Send built payloads for one server as delta bulk chunks
+
+        Returns a success flag per payload (None while the same batch is already
+        being sent), or None if the hub doesn't accept the format.
+        """
+        chunk_size = int(self.setting("stablequeue_bulk_chunk_size", bulk.DEFAULT_BULK_CHUNK_SIZE))
+        results = []
+        for start, count in bulk.chunk_quantities(len(payloads), chunk_size):
+            with metrics.timer("stablequeue_payload_build_seconds", kind="delta"), log.step("build"):
+                batch = delta.encode(payloads[start:start + count])
+            try:
+                response = self.post_job(client, "/api/v2/generate/bulk", batch,
+                                         idempotency_key=idempotency.make_key(batch, nonce, start))
+            except idempotency.InFlight:
+                results += [None] * count
+                continue
+            except idempotency.Duplicate:
+                results += [True] * count
+                continue
+            except Exception as e:
+                log.error("✗ Error submitting batch of %d job(s): %s", count, e)
+                results += [False] * count
+                continue
+
+            if response.status_code in [200, 201, 202]:
+                client.capabilities["delta_bulk"] = True
+                self.track_response(response.json(), batch["target_server_alias"])
+                results += [True] * count
+            elif response.status_code in [400, 404, 405, 415, 422] and not client.capabilities.get("delta_bulk"):
+                log.info("Server does not accept template+delta bulk jobs, submitting individually")
+                client.capabilities["delta_bulk"] = False
+                return None
+            else:
+                log.error("✗ Failed to queue batch: %s - %s", response.status_code, response.text)
+                results += [False] * count
+        return results
+
+    def queue_batch_from_javascript(self, jobs):
+        """Queue several JavaScript jobs in one go, returning per-job results in request order
+
+        Each job is {"context_data": params, "server_alias": ..., "job_type": ...}
+        (see expand_batch).
+        """
+        try:
+            server_url = self.setting("stablequeue_url", self.default_server_url)
+            api_key = self.setting("stablequeue_api_key", "")
+            api_secret = self.setting("stablequeue_api_secret", "")
+
+            if not jobs:
+                return {"success": False, "queued": 0, "message": "No jobs in batch", "results": []}
+            if not all([server_url, api_key, api_secret]):
+                message = "StableQueue credentials not configured in Settings"
+                return {"success": False, "queued": 0, "message": message, "results": [{"success": False, "message": message}] * len(jobs)}
+
+            # While the hub is known to be down, hand the jobs to the outbox instead of failing them
+            if not self.circuit_breaker(self.client(server_url, api_key, api_secret)).allow():
+                results = []
+                for job in jobs:
+                    handle = self.outbox.enqueue("single", job.get("server_alias", ""), {"params": self.with_nonce(job.get("context_data") or {}), "server_url": server_url})
+                    results.append({"success": True, "message": f"StableQueue server unreachable, job {handle} will be submitted when it returns"})
+                return {"success": True, "queued": 0, "message": f"StableQueue server unreachable, {len(jobs)} job(s) will be submitted when it returns", "results": results}
+
+            params_list = [self.with_nonce(job.get("context_data") or {}) for job in jobs]
+            repeats = [self.is_repeat_click(params, job.get("server_alias", "")) for job, params in zip(jobs, params_list)]
+            fresh = [index for index, repeat in enumerate(repeats) if not repeat]
+
+            with log.span("javascript_batch", jobs=len(jobs)) as span:
+                outcomes = self.submit_batch([params_list[index] for index in fresh], server_url, api_key, api_secret)
+                span.set(queued=outcomes.count(True), repeats=len(jobs) - len(fresh))
+            submitted = dict(zip(fresh, outcomes))
+
+            results = []
+            for index, job in enumerate(jobs):
+                if repeats[index]:
+                    results.append({"success": True, "message": "Identical job was just queued, ignoring the repeat"})
+                elif submitted[index] is None:
+                    results.append({"success": False, "pending": True, "message": IN_FLIGHT_MESSAGE})
+                elif submitted[index]:
+                    server_alias = job.get("server_alias") or params_list[index].get("target_server_alias", "")
+                    results.append({"success": True, "message": f"{job.get('job_type', 'single').title()} job queued successfully on {server_alias}"})
+                else:
+                    results.append({"success": False, "message": "Failed to queue job in StableQueue"})
+            queued = outcomes.count(True) + sum(repeats)
+            return {"success": queued == len(jobs), "queued": queued, "message": f"{queued}/{len(jobs)} job(s) queued", "results": results}
+
+        except Exception as e:
+            log.error("Error in queue_batch_from_javascript: %s", e)
+            message = f"Error: {str(e)}"
+            return {"success": False, "queued": 0, "message": message, "results": [{"success": False, "message": message}] * len(jobs or [])}
+
+    def with_nonce(self, params):
+        """params carrying a click nonce; callers that retry send the nonce they were given"""
+        if not isinstance(params, dict) or params.get(idempotency.NONCE_FIELD):
+            return params
+        return {**params, idempotency.NONCE_FIELD: idempotency.new_nonce()}
+
+    async def queue_job_from_javascript_async(self, payload_data, server_alias, job_type="single"):
+        """queue_job_from_javascript for the API routes, without blocking Forge's event loop
+
+        Submits over the shared httpx client when httpx is installed, otherwise
+        runs the blocking path in api_executor.
+        """
+        if async_client.httpx is None:
+            return await self.run_blocking(self.queue_job_from_javascript, payload_data, server_alias, job_type)
+
+        try:
+            server_url = self.setting("stablequeue_url", self.default_server_url)
+            api_key = self.setting("stablequeue_api_key", "")
+            api_secret = self.setting("stablequeue_api_secret", "")
+
+            if not all([server_url, api_key, api_secret]):
+                return {"success": False, "message": "StableQueue credentials not configured in Settings"}
+
+            params = self.with_nonce(payload_data)
+            if self.is_repeat_click(params, server_alias):
+                return {"success": True, "message": "Identical job was just queued, ignoring the repeat"}
+
+            breaker = self.circuit_breaker(self.client(server_url, api_key, api_secret))
+            if not await self.run_blocking(breaker.allow):
+                handle = await self.run_blocking(self.outbox.enqueue, "single", server_alias, {"params": params, "server_url": server_url})
+                return {"success": True, "message": f"StableQueue server unreachable, job {handle} will be submitted when it returns"}
+
+            with log.span("javascript_submission", job_type=job_type, server_alias=server_alias) as span:
+                try:
+                    success = await self.submit_to_stablequeue_async(params, server_url, api_key, api_secret)
+                except idempotency.InFlight:
+                    return {"success": False, "pending": True, "message": IN_FLIGHT_MESSAGE}
+                span.set(queued=int(success))
+
+            if success:
+                return {"success": True, "message": f"{job_type.title()} job queued successfully on {server_alias}"}
+            return {"success": False, "message": "Failed to queue job in StableQueue"}
+
+        except Exception as e:
+            log.error("Error in queue_job_from_javascript_async: %s", e)
+            return {"success": False, "message": f"Error: {str(e)}"}
+
+    def queue_job_from_javascript(self, payload_data, server_alias, job_type="single"):
+        """Queue job from JavaScript frontend"""
+        try:
+            # Get StableQueue settings
+            server_url = self.setting("stablequeue_url", self.default_server_url)
+            api_key = self.setting("stablequeue_api_key", "")
+            api_secret = self.setting("stablequeue_api_secret", "")
+
+            if not all([server_url, api_key, api_secret]):
+                return {"success": False, "message": "StableQueue credentials not configured in Settings"}
+
+            log.debug("Processing JavaScript job: %s for server %s", job_type, server_alias)
+
+            # For context menu data, use payload directly
+            if isinstance(payload_data, dict) and 'prompt' in payload_data:
+                # This looks like complete generation parameters
+                params = payload_data
+            else:
+                # This might be incomplete - for now just pass through
+                params = payload_data
+
+            # The nonce is kept through outbox replays, so they reuse the same idempotency key
+            params = self.with_nonce(params)
+            if self.is_repeat_click(params, server_alias):
+                return {"success": True, "message": "Identical job was just queued, ignoring the repeat"}
+
+            # While the hub is known to be down, hand the job to the outbox instead of failing it
+            if not self.circuit_breaker(self.client(server_url, api_key, api_secret)).allow():
+                handle = self.outbox.enqueue("single", server_alias, {"params": params, "server_url": server_url})
+                return {"success": True, "message": f"StableQueue server unreachable, job {handle} will be submitted when it returns"}
+
+            # Submit to StableQueue
+            with log.span("javascript_submission", job_type=job_type, server_alias=server_alias) as span:
+                try:
+                    success = self.submit_to_stablequeue(params, server_url, api_key, api_secret)
+                except idempotency.InFlight:
+                    return {"success": False, "pending": True, "message": IN_FLIGHT_MESSAGE}
+                span.set(queued=int(success))
+
+            if success:
+                return {"success": True, "message": f"{job_type.title()} job queued successfully on {server_alias}"}
+            else:
+                return {"success": False, "message": "Failed to queue job in StableQueue"}
+
+        except Exception as e:
+            log.error("Error in queue_job_from_javascript: %s", e)
+            return {"success": False, "message": f"Error: {str(e)}"}
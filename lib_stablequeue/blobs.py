@@ -0,0 +1,158 @@
+"""
+Content-addressed upload and dedup of images embedded in job payloads
+
+Large base64 images (img2img init images and masks, ControlNet inputs) are
+hashed once, uploaded to the hub's blob store only if it doesn't have them
+yet, and replaced in the payload by a "blob:sha256:<hex>" reference.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from lib_stablequeue import log
+
+DEFAULT_CACHE_SIZE = 256
+# The digest cache keeps its images alive, so it only covers the images of the current run
+DEFAULT_DIGEST_CACHE_SIZE = 16
+# Seconds images are sent inline after a blob upload failed for another reason than a missing blob store
+DEFAULT_FAILURE_BACKOFF = 60.0
+MIN_BLOB_SIZE = 4096
+BLOB_PREFIX = "blob:sha256:"
+
+_BASE64_HEAD = re.compile(r"^[A-Za-z0-9+/=\r\n]{64}")
+
+
+def looks_like_image(value):
+    """True for strings that are large enough and look like (data-URL) base64"""
+    return (
+        isinstance(value, str)
+        and len(value) >= MIN_BLOB_SIZE
+        and (value.startswith("data:") or _BASE64_HEAD.match(value) is not None)
+    )
+
+
+class LRU:
+    """Small thread-unsafe LRU mapping; BlobStore guards it with its lock"""
+
+    def __init__(self, size):
+        self.size = max(1, int(size))
+        self.items = OrderedDict()
+
+    def get(self, key):
+        value = self.items.get(key)
+        if value is not None:
+            self.items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.size:
+            self.items.popitem(last=False)
+
+
+class BlobStore:
+    """Replaces embedded images with hub blob references
+
+    client_fn() returns the hub client. Digests are cached under the image
+    string's id(), next to a reference to the string so the id can't be
+    reused while the entry lives; bulk jobs share one image object, so it is
+    hashed once per run. The set of blobs known to be on the hub is an LRU as
+    well. After an upload fails (other than for a missing blob store), images
+    go inline for failure_backoff seconds rather than retrying on every payload.
+    """
+
+    def __init__(self, client_fn, cache_size=DEFAULT_CACHE_SIZE, digest_cache_size=DEFAULT_DIGEST_CACHE_SIZE,
+                 failure_backoff=DEFAULT_FAILURE_BACKOFF):
+        self.client_fn = client_fn
+        self.digests = LRU(digest_cache_size)
+        self.uploaded = LRU(cache_size)
+        self.failure_backoff = failure_backoff
+        self.failed_until = {}
+        self.lock = threading.Lock()
+        self.upload_locks = {}
+        self.stats = {"hashed": 0, "uploaded": 0, "reused": 0}
+
+    def digest(self, image):
+        with self.lock:
+            entry = self.digests.get(id(image))
+        if entry is not None and entry[0] is image:
+            return entry[1]
+        digest = hashlib.sha256(image.encode("utf-8")).hexdigest()
+        with self.lock:
+            self.digests.put(id(image), (image, digest))
+            self.stats["hashed"] += 1
+        return digest
+
+    def rewrite(self, payload):
+        """Return a copy of payload with embedded images replaced by blob references
+
+        Returns payload unchanged if the hub has no blob store.
+        """
+        client = self.client_fn()
+        if client.capabilities.get("blobs") is False:
+            return payload
+        with self.lock:
+            if time.monotonic() < self.failed_until.get(client.server_url, 0):
+                return payload
+        try:
+            return self._walk(client, payload)
+        except BlobsUnsupported:
+            return payload
+        except Exception as e:
+            log.warning("Blob upload failed, sending images inline for %gs: %s", self.failure_backoff, e)
+            with self.lock:
+                self.failed_until[client.server_url] = time.monotonic() + self.failure_backoff
+            return payload
+
+    def _walk(self, client, value):
+        if isinstance(value, dict):
+            return {key: self._walk(client, item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._walk(client, item) for item in value]
+        if looks_like_image(value):
+            return BLOB_PREFIX + self._ensure_uploaded(client, value)
+        return value
+
+    def _ensure_uploaded(self, client, image):
+        digest = self.digest(image)
+        with self.lock:
+            if self.uploaded.get(digest):
+                self.stats["reused"] += 1
+                return digest
+            upload_lock = self.upload_locks.setdefault(digest, threading.Lock())
+
+        # One upload per digest even when bulk jobs race for it
+        with upload_lock:
+            try:
+                with self.lock:
+                    if self.uploaded.get(digest):
+                        self.stats["reused"] += 1
+                        return digest
+
+                response = client.session.head(client.url(f"/api/v2/blobs/{digest}"), timeout=client.timeout)
+                if response.status_code != 200:
+                    response = client.post(f"/api/v2/blobs/{digest}", data=image.encode("utf-8"),
+                                           headers={"Content-Type": "text/plain"})
+                    if response.status_code in (404, 405, 501):
+                        client.capabilities["blobs"] = False
+                        raise BlobsUnsupported()
+                    if response.status_code not in (200, 201, 204):
+                        raise RuntimeError(f"Blob upload failed: {response.status_code} - {response.text}")
+                    with self.lock:
+                        self.stats["uploaded"] += 1
+
+                client.capabilities["blobs"] = True
+                with self.lock:
+                    self.uploaded.put(digest, True)
+                return digest
+            finally:
+                with self.lock:
+                    self.upload_locks.pop(digest, None)
+
+
+class BlobsUnsupported(Exception):
+    """The hub has no blob store; images must stay inline"""
@@ -0,0 +1,63 @@
+"""
+Bounded-concurrency bulk submission
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from lib_stablequeue import log
+
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_BULK_CHUNK_SIZE = 100
+
+
+class Interrupted(Exception):
+    """A chunked submission stopped because the hub went away
+
+    offset is the index of the first job not sent; queued counts the jobs the
+    hub accepted before that.
+    """
+
+    def __init__(self, offset, queued):
+        super().__init__(f"Interrupted at job {offset} after {queued} queued")
+        self.offset = offset
+        self.queued = queued
+
+
+def submit_concurrently(submit_fn, jobs, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+    """Call submit_fn for every job with at most max_in_flight calls running
+
+    jobs may be any iterable, including a generator; it is consumed lazily, so
+    only about max_in_flight jobs exist at a time. Returns the per-job results
+    in the same order as jobs. An exception raised by submit_fn is recorded as
+    a False result for that job only.
+    """
+    def run(job):
+        try:
+            return submit_fn(job)
+        except Exception as e:
+            log.error("✗ Bulk job failed: %s", e)
+            return False
+
+    workers = max(1, int(max_in_flight))
+    if workers == 1:
+        return [run(job) for job in jobs]
+
+    results = []
+    window = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stablequeue-bulk") as executor:
+        for job in jobs:
+            # Wait for the oldest job before pulling more from the producer
+            if len(window) >= workers * 2:
+                results.append(window.popleft().result())
+            window.append(executor.submit(run, job))
+        while window:
+            results.append(window.popleft().result())
+    return results
+
+
+def chunk_quantities(total, chunk_size=DEFAULT_BULK_CHUNK_SIZE, offset=0):
+    """Split jobs offset..total into (start_index, count) chunks of at most chunk_size"""
+    total = int(total)
+    chunk_size = max(1, int(chunk_size))
+    return [(start, min(chunk_size, total - start)) for start in range(int(offset), total, chunk_size)]
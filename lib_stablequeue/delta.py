@@ -0,0 +1,122 @@
+"""
+Template-plus-delta wire format for bulk jobs
+
+A bulk request carries the shared generation_params once as a template,
+minus fields equal to the hub's defaults, followed by the per-job changes.
+Changes are either one small dict per job ("jobs"), or, for sweep plans,
+column-wise: a list per field, with swept values given as indexes into
+"axes":
+
+    {"app_type": "forge", "target_server_alias": "...", "source_info": "...",
+     "payload_format": "template_delta",
+     "template": {"positive_prompt": "...", "steps": 30},
+     "jobs": [{"seed": 1}, {"seed": 2, "cfg_scale": 5.0}]}
+
+    {..., "axes": {"cfg_scale": [5.0, 7.0]},
+     "columns": {"seed": [1, 2, 1, 2], "cfg_scale": [0, 0, 1, 1]}}
+"""
+
+PAYLOAD_FORMAT = "template_delta"
+
+# Defaults the hub applies to generation_params (mirrors build_payload)
+HUB_DEFAULTS = {
+    "negative_prompt": "",
+    "width": 512,
+    "height": 512,
+    "steps": 20,
+    "cfg_scale": 7.0,
+    "sampler_name": "Euler",
+    "seed": -1,
+    "batch_size": 1,
+    "n_iter": 1,
+    "restore_faces": False,
+    "checkpoint_name": "",
+    "enable_hr": False,
+    "hr_scale": 2.0,
+    "hr_upscaler": "Latent",
+    "denoising_strength": 0.7,
+}
+
+# Extension param names that are renamed in generation_params
+WIRE_NAMES = {"prompt": "positive_prompt"}
+
+
+def template(payload, keys=None):
+    """Turn a full single-job payload into a delta batch with no per-job changes yet
+
+    keys limits the template to those generation_params; see encode().
+    """
+    generation_params = payload.get("generation_params", {})
+    batch = {key: value for key, value in payload.items() if key != "generation_params"}
+    batch["payload_format"] = PAYLOAD_FORMAT
+    batch["template"] = {
+        key: value for key, value in generation_params.items()
+        if (keys is None or key in keys) and (key not in HUB_DEFAULTS or HUB_DEFAULTS[key] != value)
+    }
+    return batch
+
+
+def diff(template_params, generation_params):
+    """Return the fields of generation_params that differ from the template (with defaults)"""
+    return {
+        key: value for key, value in generation_params.items()
+        if template_params.get(key, HUB_DEFAULTS.get(key)) != value
+    }
+
+
+def encode(payloads):
+    """Encode full single-job payloads (sharing app, target and source) as one delta batch
+
+    Only fields every job has go into the template: a job can't drop a
+    template field, so e.g. one job's init_images must not become everyone's.
+    """
+    payloads = list(payloads)
+    if not payloads:
+        return None
+    shared_keys = set(payloads[0].get("generation_params", {}))
+    for payload in payloads[1:]:
+        shared_keys &= set(payload.get("generation_params", {}))
+    batch = template(payloads[0], shared_keys)
+    base = batch["template"]
+    batch["jobs"] = [diff(base, payload.get("generation_params", {})) for payload in payloads]
+    return batch
+
+
+def decode(batch):
+    """Expand a delta batch back into full generation_params dicts (hub side / benchmarks)"""
+    base = {**HUB_DEFAULTS, **batch.get("template", {})}
+    jobs = [{**base, **job} for job in batch.get("jobs", [])]
+
+    columns = batch.get("columns") or {}
+    axes = batch.get("axes") or {}
+    if columns:
+        names = list(columns)
+        values = [
+            [axes[name][code] for code in columns[name]] if name in axes else columns[name]
+            for name in names
+        ]
+        jobs += [{**base, **dict(zip(names, row))} for row in zip(*values)]
+    return jobs
+
+
+def plan_columns(plan, start=0, stop=None):
+    """Return ("axes", "columns") for a sweep.JobPlan slice, straight from its arrays"""
+    stop = len(plan) if stop is None else min(stop, len(plan))
+    axes = {WIRE_NAMES.get(name, name): values for name, values in plan.axes.items()}
+    columns = {"seed": plan.seeds[start:stop].tolist()}
+    for name, codes in plan.codes.items():
+        columns[WIRE_NAMES.get(name, name)] = codes[start:stop].tolist()
+    return axes, columns
+
+
+def iter_plan_deltas(plan, slice_size=4096):
+    """Yield one delta dict per job of a sweep.JobPlan, converting a slice at a time"""
+    names = [WIRE_NAMES.get(name, name) for name in plan.axes]
+    for start in range(0, len(plan), slice_size):
+        stop = min(start + slice_size, len(plan))
+        seeds = plan.seeds[start:stop].tolist()
+        columns = [[plan.axes[axis][code] for code in plan.codes[axis][start:stop].tolist()] for axis in plan.axes]
+        for row in zip(seeds, *columns):
+            job = {"seed": row[0]}
+            job.update(zip(names, row[1:]))
+            yield job
@@ -0,0 +1,168 @@
+"""
+Parallel, streaming download of finished job images into a local folder
+
+Image bytes are streamed to a .part file in chunks, so memory use does not
+grow with image or batch size. Interrupted downloads resume with an HTTP
+Range request, and files already on disk with the expected SHA-256 are
+skipped. Hub credentials only go to URLs under the hub's own address;
+images hosted elsewhere (a CDN, presigned S3 links) are fetched without them.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+import requests
+
+from lib_stablequeue import log
+
+DEFAULT_MAX_CONCURRENT = 4
+CHUNK_SIZE = 1024 * 1024
+MAX_REDIRECTS = 5
+
+_UNSAFE_FILENAME = re.compile(r"[^A-Za-z0-9._-]")
+
+COMPLETED_STATES = {"completed", "complete", "success"}
+
+
+def image_refs(job):
+    """Return [(source, expected_sha256)] for the result images of a tracked job dict
+
+    The hub may report images as URLs, hub-relative paths or bare filenames
+    (served from /outputs/), either as strings or dicts with url/filename/sha256.
+    """
+    data = job.get("data") or {}
+    details = data.get("result_details") or {}
+    images = data.get("images") or data.get("result_images") or details.get("images") or []
+
+    refs = []
+    for image in images:
+        if isinstance(image, str):
+            refs.append((image, None))
+        elif isinstance(image, dict):
+            source = image.get("url") or image.get("path") or image.get("filename")
+            if source:
+                refs.append((source, image.get("sha256")))
+    return refs
+
+
+def safe_filename(name):
+    """name with anything but letters, digits, '.', '_' and '-' replaced, so it can't leave its folder"""
+    return _UNSAFE_FILENAME.sub("_", name).lstrip(".") or "_"
+
+
+def is_hub_url(client, url):
+    """True if url is on the hub's scheme, host and port, under its base path"""
+    base, target = urlsplit(client.server_url), urlsplit(url)
+    if (target.scheme.lower(), target.netloc.lower()) != (base.scheme.lower(), base.netloc.lower()):
+        return False
+    return (target.path.rstrip("/") + "/").startswith(base.path.rstrip("/") + "/")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultDownloader:
+    """Downloads result images with at most max_concurrent transfers at once
+
+    client_fn() returns the hub client whose pooled session is used.
+    """
+
+    def __init__(self, client_fn, output_dir, max_concurrent=DEFAULT_MAX_CONCURRENT):
+        self.client_fn = client_fn
+        self.output_dir = output_dir
+        self.executor = ThreadPoolExecutor(max_workers=max(1, int(max_concurrent)), thread_name_prefix="stablequeue-download")
+        self.lock = threading.Lock()
+        self.in_progress = set()
+        self.stats = {"downloaded": 0, "skipped": 0, "resumed": 0, "failed": 0}
+
+    def enqueue_job(self, job):
+        """Schedule downloads for every result image of a finished job"""
+        return [self.enqueue(job["job_id"], source, sha256) for source, sha256 in image_refs(job)]
+
+    def enqueue(self, job_id, source, expected_sha256=None):
+        """Schedule one image download; returns a Future resolving to the local path (or None)"""
+        # Both parts come from the hub, so neither may contain a path
+        target = os.path.join(self.output_dir, safe_filename(f"{job_id}_{os.path.basename(source.split('?', 1)[0])}"))
+        with self.lock:
+            if target in self.in_progress:
+                return None
+            self.in_progress.add(target)
+        return self.executor.submit(self._download, source, target, expected_sha256)
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def _url(self, client, source):
+        if source.startswith(("http://", "https://")):
+            return source
+        if source.startswith("/"):
+            return client.url(source)
+        return client.url(f"/outputs/{source}")
+
+    def _get(self, client, url, headers):
+        """Streaming GET that sends hub credentials only to the hub, redirects included"""
+        for _ in range(MAX_REDIRECTS + 1):
+            if not is_hub_url(client, url):
+                return requests.get(url, headers=headers, stream=True, timeout=client.timeout)
+            response = client.session.get(url, headers=headers, stream=True, timeout=client.timeout, allow_redirects=False)
+            if not response.is_redirect:
+                return response
+            url = urljoin(url, response.headers["Location"])
+            response.close()
+        raise RuntimeError("Too many redirects")
+
+    def _download(self, source, target, expected_sha256):
+        try:
+            if os.path.exists(target) and (expected_sha256 is None or file_sha256(target) == expected_sha256):
+                self._count("skipped")
+                return target
+
+            os.makedirs(self.output_dir, exist_ok=True)
+            client = self.client_fn()
+            part = target + ".part"
+            offset = os.path.getsize(part) if os.path.exists(part) else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+            with self._get(client, self._url(client, source), headers) as response:
+                if response.status_code == 416:
+                    # Server says the .part already holds everything
+                    response.close()
+                elif response.status_code == 206 and offset:
+                    self._count("resumed")
+                    self._write(response, part, "ab")
+                elif response.status_code == 200:
+                    self._write(response, part, "wb")
+                else:
+                    raise RuntimeError(f"HTTP {response.status_code}")
+
+            if expected_sha256 and file_sha256(part) != expected_sha256:
+                os.remove(part)
+                raise RuntimeError("SHA-256 mismatch")
+
+            os.replace(part, target)
+            self._count("downloaded")
+            return target
+
+        except Exception as e:
+            log.error("✗ Failed to download %s: %s", source, e)
+            self._count("failed")
+            return None
+        finally:
+            with self.lock:
+                self.in_progress.discard(target)
+
+    def _write(self, response, part, mode):
+        with open(part, mode) as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if chunk:
+                    f.write(chunk)
@@ -0,0 +1,152 @@
+"""
+Pooled, keep-alive HTTP client shared by every StableQueue hub call
+"""
+
+import gzip
+import json
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from lib_stablequeue import log
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 10
+DEFAULT_COMPRESSION = "none"
+DEFAULT_COMPRESSION_THRESHOLD = 64 * 1024
+COMPRESSION_METHODS = ("none", "gzip", "zstd")
+
+# Statuses a hub returns when it can't read a compressed body
+COMPRESSION_REJECTED = (400, 411, 415)
+
+
+def compress(body, method):
+    """Compress a request body, returning (data, content_encoding)
+
+    zstd requires the optional zstandard package; callers fall back to gzip.
+    """
+    if method == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(body), "zstd"
+    return gzip.compress(body, compresslevel=5), "gzip"
+
+
+class HubClient:
+    """HTTP client bound to one StableQueue hub URL
+
+    Holds a single requests.Session so TCP (and TLS) connections are reused
+    across jobs. Auth headers are built once when the client is created.
+    """
+
+    def __init__(self, server_url, api_key, api_secret, pool_size=DEFAULT_POOL_SIZE,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                 compression=DEFAULT_COMPRESSION, compression_threshold=DEFAULT_COMPRESSION_THRESHOLD):
+        self.server_url = server_url.rstrip('/')
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.compression = compression if compression in COMPRESSION_METHODS else DEFAULT_COMPRESSION
+        self.compression_threshold = compression_threshold
+
+        # Features learned from the hub's responses, e.g. {"bulk_endpoint": False}
+        self.capabilities = {}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "X-API-Key": api_key,
+            "X-API-Secret": api_secret,
+        })
+
+    @property
+    def config(self):
+        """Tuple identifying the settings this client was built from"""
+        return (self.api_key, self.api_secret, self.pool_size, self.timeout,
+                self.compression, self.compression_threshold)
+
+    def url(self, path):
+        return f"{self.server_url}/{path.lstrip('/')}"
+
+    def get(self, path, timeout=None, **kwargs):
+        return self.session.get(self.url(path), timeout=timeout or self.timeout, **kwargs)
+
+    def post(self, path, timeout=None, **kwargs):
+        return self.session.post(self.url(path), timeout=timeout or self.timeout, **kwargs)
+
+    def post_json(self, path, payload, timeout=None, **kwargs):
+        """POST a JSON payload, compressing it when large and the hub accepts it
+
+        Whether the hub accepts a Content-Encoding is learned from the first
+        compressed request and remembered in capabilities.
+        """
+        # default=str keeps odd extension args from failing the whole submission
+        with log.step("serialize"):
+            body = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+        headers = {"Content-Type": "application/json", **kwargs.pop("headers", {})}
+
+        method = self.compression
+        if method == "zstd" and zstandard is None:
+            method = "gzip"
+        capability = f"compression_{method}"
+        if method != "none" and len(body) >= self.compression_threshold and self.capabilities.get(capability) is not False:
+            data, encoding = compress(body, method)
+            response = self.post(path, data=data, headers={**headers, "Content-Encoding": encoding}, timeout=timeout, **kwargs)
+            if response.status_code not in COMPRESSION_REJECTED:
+                self.capabilities[capability] = True
+                return response
+            if self.capabilities.get(capability):
+                # Compression worked before, so this rejection is about the payload itself
+                return response
+            log.info("Server rejected %s request body, sending uncompressed from now on", encoding)
+            self.capabilities[capability] = False
+
+        return self.post(path, data=body, headers=headers, timeout=timeout, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+# One client per hub URL, shared by all code paths
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(server_url, api_key, api_secret, pool_size=DEFAULT_POOL_SIZE,
+               connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+               compression=DEFAULT_COMPRESSION, compression_threshold=DEFAULT_COMPRESSION_THRESHOLD):
+    """Return the shared client for server_url, rebuilding it if its settings changed"""
+    key = server_url.rstrip('/')
+    if compression not in COMPRESSION_METHODS:
+        compression = DEFAULT_COMPRESSION
+    config = (api_key, api_secret, pool_size, (connect_timeout, read_timeout), compression, compression_threshold)
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is not None and client.config == config:
+            return client
+
+        if client is not None:
+            client.close()
+
+        client = HubClient(key, api_key, api_secret, pool_size=pool_size,
+                           connect_timeout=connect_timeout, read_timeout=read_timeout,
+                           compression=compression, compression_threshold=compression_threshold)
+        _clients[key] = client
+        return client
+
+
+def close_all():
+    """Close every pooled client (used on shutdown and in benchmarks)"""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -0,0 +1,125 @@
+"""
+Idempotency keys and duplicate-submission suppression
+
+Every click gets a nonce that travels with its jobs (through the outbox
+journal too). A request's key is a hash of its normalized payload plus that
+nonce, so resending the same request (a retried fetch, an outbox replay)
+produces the same key. That covers two cases:
+
+- Locally, a bounded TTL cache drops a request whose key is already in flight
+  or was accepted recently. Only the latter counts as queued: an in-flight
+  original may still fail, so its repeat is reported as not confirmed yet.
+- The key is forwarded as an Idempotency-Key header so the hub can drop
+  repeats it has already queued, e.g. after a timed-out post that actually
+  succeeded.
+
+Double-clicks carry different nonces; they are caught by fingerprinting the
+clicked parameters and dropping an identical click within a short window.
+"""
+
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+HEADER = "Idempotency-Key"
+
+# Where a click's nonce is carried in params; never sent to the hub as a parameter
+NONCE_FIELD = "idempotency_nonce"
+
+DEFAULT_TTL = 600.0
+DEFAULT_REPEAT_WINDOW = 2.0
+DEFAULT_CACHE_SIZE = 4096
+
+IN_FLIGHT = "in-flight"
+DONE = "done"
+
+
+class Duplicate(Exception):
+    """Raised instead of sending a request whose key is in flight or was accepted recently"""
+
+
+class InFlight(Duplicate):
+    """Duplicate of a request that hasn't been answered yet, so it isn't known to be queued"""
+
+
+def new_nonce():
+    return uuid.uuid4().hex
+
+
+def fingerprint(value):
+    """Stable hash of a JSON-like value, ignoring key order and any nonce"""
+    if isinstance(value, dict) and NONCE_FIELD in value:
+        value = {key: item for key, item in value.items() if key != NONCE_FIELD}
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def make_key(payload, nonce, part=None):
+    """Idempotency key for one request: its payload plus the click nonce (and part, for split jobs)"""
+    if not nonce:
+        return None
+    seed = f"{fingerprint(payload)}:{nonce}" if part is None else f"{fingerprint(payload)}:{nonce}:{part}"
+    return hashlib.sha256(seed.encode("utf-8")).hexdigest()[:32]
+
+
+def derive_nonce(nonce, part):
+    """Nonce for one of several jobs expanded from a click, so identical expansions keep distinct keys"""
+    return f"{nonce}:{part}" if nonce else None
+
+
+class DedupCache:
+    """Bounded mapping of keys to (state, expiry), oldest evicted first"""
+
+    def __init__(self, ttl=DEFAULT_TTL, size=DEFAULT_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = max(1, int(size))
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @property
+    def config(self):
+        return (self.ttl, self.size)
+
+    def _expire(self, now):
+        while self.entries:
+            key, (_, expires) = next(iter(self.entries.items()))
+            if expires > now and len(self.entries) <= self.size:
+                break
+            del self.entries[key]
+
+    def claim(self, key):
+        """Mark key in flight; False if it is already in flight or recently done"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > now:
+                return False
+            self.entries.pop(key, None)
+            self.entries[key] = (IN_FLIGHT, now + self.ttl)
+            self._expire(now)
+            return True
+
+    def state(self, key):
+        """IN_FLIGHT or DONE for a key claimed within ttl, else None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            return entry[0]
+
+    def done(self, key):
+        """Remember key as accepted for ttl seconds"""
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (DONE, time.monotonic() + self.ttl)
+
+    def release(self, key):
+        """Forget key, e.g. after a failed request, so it may be sent again"""
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def __len__(self):
+        return len(self.entries)
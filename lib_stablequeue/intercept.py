@@ -0,0 +1,135 @@
+"""
+Capture of the next Generate click, before Forge does any model work
+
+In intercept mode the queue buttons arm a one-shot token instead of queueing
+UI values straight away. The token travels to Generate in the script's args;
+the generation carrying it is handed to a handler with the full
+StableDiffusionProcessing and, if the handler queues it, answered with its
+Processed stub. Forge's process_images never runs for it, so no checkpoint is
+loaded and nothing is sampled on the local GPU.
+
+Every other generation takes the fast path: one truthiness check on the
+(normally empty) pending dict.
+"""
+
+import base64
+import io
+import threading
+import time
+import uuid
+
+from lib_stablequeue import log
+
+MODES = ("immediate", "intercept")
+DEFAULT_MODE = "immediate"
+
+# Arms nobody followed up with a Generate click stop costing a lookup after this
+DEFAULT_TOKEN_TTL = 600.0
+
+# Marks a process_images that is already our wrapper, so reloads don't stack wrappers
+WRAPPED_ATTR = "__stablequeue_original__"
+
+
+def encode_image(image):
+    """PIL image (or array convertible to one) as base64 PNG"""
+    if not hasattr(image, "save"):
+        from PIL import Image
+        image = Image.fromarray(image)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def json_safe(value):
+    """Copy of a captured parameter with images base64-encoded and other odd objects stringified
+
+    Outbox entries are journaled as JSON, so nothing captured from a
+    StableDiffusionProcessing may be left as a PIL image or numpy array.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(key): json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    if hasattr(value, "save") and hasattr(value, "mode"):
+        return encode_image(value)
+    if getattr(value, "ndim", 0) in (2, 3):
+        try:
+            return encode_image(value)
+        except Exception:
+            pass
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+class Interceptor:
+    """One-shot tokens armed by the queue buttons and consumed by Generate
+
+    handler(p, intent) returns a Processed to answer the generation with, or
+    None to let it run locally after all.
+    """
+
+    def __init__(self, handler, token_ttl=DEFAULT_TOKEN_TTL):
+        self.handler = handler
+        self.token_ttl = token_ttl
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def arm(self, replaces=None, **intent):
+        """Arm a token for the next Generate click, dropping the one it replaces"""
+        token = f"stablequeue-{uuid.uuid4().hex}"
+        with self.lock:
+            self.pending.pop(replaces, None)
+            self.pending[token] = (time.monotonic(), intent)
+        return token
+
+    def disarm(self, token):
+        with self.lock:
+            self.pending.pop(token, None)
+
+    def take(self, script_args):
+        """Pop the intent whose token is among script_args, expiring stale arms on the way"""
+        now = time.monotonic()
+        with self.lock:
+            for token in [t for t, (armed_at, _) in self.pending.items() if now - armed_at > self.token_ttl]:
+                del self.pending[token]
+            for value in script_args or ():
+                if isinstance(value, str) and value in self.pending:
+                    return self.pending.pop(value)[1]
+        return None
+
+    def wrap(self, process_images):
+        """Wrap processing.process_images so armed generations are captured first"""
+        original = getattr(process_images, WRAPPED_ATTR, process_images)
+
+        def stablequeue_process_images(p, *args, **kwargs):
+            if self.pending:
+                intent = self.take(getattr(p, "script_args", None))
+                if intent is not None:
+                    try:
+                        processed = self.handler(p, intent)
+                    except Exception as e:
+                        log.error("Error capturing generation: %s", e, exc_info=True)
+                        processed = None
+                    if processed is not None:
+                        return processed
+            return original(p, *args, **kwargs)
+
+        setattr(stablequeue_process_images, WRAPPED_ATTR, original)
+        return stablequeue_process_images
+
+    def install(self, processing_module, *importers):
+        """Route process_images through wrap(), in processing_module and in modules that imported it by name
+
+        Forge's img2img does "from modules.processing import process_images"
+        before extensions load, so patching processing alone misses that tab.
+        """
+        wrapped = self.wrap(processing_module.process_images)
+        original = getattr(wrapped, WRAPPED_ATTR)
+        processing_module.process_images = wrapped
+        for module in importers:
+            bound = getattr(module, "process_images", None)
+            if bound is not None and getattr(bound, WRAPPED_ATTR, bound) is original:
+                module.process_images = wrapped
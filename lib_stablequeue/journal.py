@@ -0,0 +1,116 @@
+"""
+Crash-safe on-disk journal for outbox entries
+
+Pending submissions are written to SQLite in WAL mode so they survive Forge
+restarts and hub outages. Writes are batched by a single writer thread; the
+SQLite synchronous level controls how often the journal is fsynced.
+"""
+
+import json
+import queue
+import sqlite3
+import threading
+
+from lib_stablequeue import log
+
+DEFAULT_SYNCHRONOUS = "NORMAL"
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_COMMIT_INTERVAL = 0.05
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL")
+
+_FLUSH = object()
+
+
+class Journal:
+    """Append-only journal of pending outbox entries backed by SQLite
+
+    put() and remove() only enqueue the write; the writer thread commits up to
+    batch_size operations per transaction, waiting at most commit_interval
+    seconds for a batch to fill.
+    """
+
+    def __init__(self, path, synchronous=DEFAULT_SYNCHRONOUS, batch_size=DEFAULT_BATCH_SIZE,
+                 commit_interval=DEFAULT_COMMIT_INTERVAL):
+        synchronous = str(synchronous).upper()
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"synchronous must be one of {SYNCHRONOUS_MODES}, got {synchronous!r}")
+
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self.commit_interval = max(0.0, float(commit_interval))
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA synchronous={synchronous}")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                handle TEXT UNIQUE NOT NULL,
+                kind TEXT NOT NULL,
+                server_alias TEXT NOT NULL,
+                job TEXT NOT NULL,
+                created REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+        self.ops = queue.Queue()
+        self.writer = threading.Thread(target=self._writer, name="stablequeue-journal", daemon=True)
+        self.writer.start()
+
+    def load_pending(self):
+        """Return the journaled rows in submission order as dicts"""
+        self.flush()
+        rows = self.conn.execute(
+            "SELECT handle, kind, server_alias, job, created FROM outbox ORDER BY seq"
+        ).fetchall()
+        return [
+            {"handle": handle, "kind": kind, "server_alias": alias, "job": json.loads(job), "created": created}
+            for handle, kind, alias, job, created in rows
+        ]
+
+    def put(self, handle, kind, server_alias, job, created):
+        self.ops.put(("put", (handle, kind, server_alias, json.dumps(job), created)))
+
+    def update(self, handle, job):
+        """Rewrite an entry's job in place, keeping its position"""
+        self.ops.put(("update", (json.dumps(job), handle)))
+
+    def remove(self, handle):
+        self.ops.put(("remove", (handle,)))
+
+    def flush(self):
+        """Block until every write queued so far is committed"""
+        done = threading.Event()
+        self.ops.put((_FLUSH, done))
+        done.wait()
+
+    def _writer(self):
+        while True:
+            batch = [self.ops.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self.ops.get(timeout=self.commit_interval) if self.commit_interval else self.ops.get_nowait())
+            except queue.Empty:
+                pass
+
+            waiters = []
+            try:
+                with self.conn:
+                    for op, args in batch:
+                        if op is _FLUSH:
+                            waiters.append(args)
+                        elif op == "put":
+                            self.conn.execute(
+                                "INSERT OR REPLACE INTO outbox (handle, kind, server_alias, job, created) VALUES (?, ?, ?, ?, ?)",
+                                args
+                            )
+                        elif op == "update":
+                            self.conn.execute("UPDATE outbox SET job = ? WHERE handle = ?", args)
+                        elif op == "remove":
+                            self.conn.execute("DELETE FROM outbox WHERE handle = ?", args)
+            except Exception as e:
+                log.error("Error writing outbox journal: %s", e)
+            finally:
+                for done in waiters:
+                    done.set()
@@ -0,0 +1,239 @@
+"""
+Leveled, rate-limited logging and per-submission trace spans
+
+Messages are handed to a background thread for printing, so a submission
+never waits on Forge's console. Each call site may log at most rate_limit
+messages per RATE_WINDOW; the rest are counted and reported with the next
+message that gets through.
+
+Trace spans time the stages of a submission (step("serialize"),
+step("http"), ...) and are written as JSON lines to a rotating file by
+another background thread. With tracing off, span() and step() do nothing.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+DEFAULT_LEVEL = "INFO"
+DEFAULT_RATE_LIMIT = 20
+RATE_WINDOW = 10.0
+DEFAULT_TRACE_MAX_MB = 10
+TRACE_BACKUPS = 3
+
+logger = logging.getLogger("stablequeue")
+# Forge configures the root logger; keep our lines from being printed twice
+logger.propagate = False
+trace_logger = logging.getLogger("stablequeue.trace")
+trace_logger.propagate = False
+trace_logger.setLevel(logging.INFO)
+
+debug = logger.debug
+info = logger.info
+warning = logger.warning
+error = logger.error
+
+
+class BackgroundHandler(logging.handlers.QueueHandler):
+    """Queues records for target, which a daemon thread (started on first use) writes"""
+
+    def __init__(self, target):
+        super().__init__(queue.SimpleQueue())
+        self.target = target
+        self.listener = None
+        self.listener_lock = threading.Lock()
+
+    def prepare(self, record):
+        # Formatting happens on the listener thread, not the caller's
+        return record
+
+    def enqueue(self, record):
+        if self.listener is None:
+            with self.listener_lock:
+                if self.listener is None:
+                    self.listener = logging.handlers.QueueListener(self.queue, self.target)
+                    self.listener.start()
+        self.queue.put_nowait(record)
+
+    def close(self):
+        with self.listener_lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+        self.target.close()
+        super().close()
+
+
+class RateLimitFilter(logging.Filter):
+    """Let at most limit records per call site through each window"""
+
+    def __init__(self, limit=DEFAULT_RATE_LIMIT, window=RATE_WINDOW):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.sites = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if self.limit <= 0:
+            return True
+        site = (record.pathname, record.lineno)
+        with self.lock:
+            started, count, dropped = self.sites.get(site, (record.created, 0, 0))
+            if record.created - started >= self.window:
+                if dropped:
+                    record.suppressed = dropped
+                started, count, dropped = record.created, 0, 0
+            count += 1
+            if count > self.limit:
+                self.sites[site] = (started, count, dropped + 1)
+                return False
+            self.sites[site] = (started, count, dropped)
+            return True
+
+
+class ConsoleFormatter(logging.Formatter):
+    def format(self, record):
+        message = "[StableQueue] " + super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            message += f" ({suppressed} similar message(s) suppressed)"
+        return message
+
+
+class SpanFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg.to_dict(), default=str, separators=(",", ":"))
+
+
+rate_filter = RateLimitFilter()
+logger.addFilter(rate_filter)
+logger.setLevel(DEFAULT_LEVEL)
+_console = logging.StreamHandler(sys.stdout)
+_console.setFormatter(ConsoleFormatter("%(message)s"))
+logger.addHandler(BackgroundHandler(_console))
+
+_trace_handler = None
+_trace_config = None
+_tracing = False
+# A context variable rather than a thread local, so spans also follow asyncio tasks
+_current = contextvars.ContextVar("stablequeue_span", default=None)
+
+
+class Span:
+    """Timing of one traced operation; steps are aggregated by name"""
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.started = time.time()
+        self.start_counter = time.perf_counter()
+        self.duration = None
+        self.steps = {}
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    @contextmanager
+    def step(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            total, count = self.steps.get(name, (0.0, 0))
+            self.steps[name] = (total + elapsed, count + 1)
+
+    def to_dict(self):
+        return {
+            "span": self.name,
+            "ts": self.started,
+            "duration": self.duration,
+            "steps": {name: {"seconds": round(total, 6), "count": count} for name, (total, count) in self.steps.items()},
+            **self.fields,
+        }
+
+
+class NoopSpan:
+    def set(self, **fields):
+        pass
+
+    def step(self, name):
+        return NOOP_STEP
+
+
+NOOP_SPAN = NoopSpan()
+NOOP_STEP = nullcontext()
+
+
+@contextmanager
+def span(name, **fields):
+    """Trace the with-block as one span, current for step() calls in this thread or task"""
+    if not _tracing:
+        yield NOOP_SPAN
+        return
+    current = Span(name, fields)
+    token = _current.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.fields["error"] = str(e)
+        raise
+    finally:
+        _current.reset(token)
+        current.duration = round(time.perf_counter() - current.start_counter, 6)
+        trace_logger.info(current)
+
+
+def step(name):
+    """Time a stage of the current span; does nothing outside a span"""
+    if not _tracing:
+        return NOOP_STEP
+    current = _current.get()
+    return current.step(name) if current is not None else NOOP_STEP
+
+
+def configure(level=DEFAULT_LEVEL, rate_limit=DEFAULT_RATE_LIMIT, trace_path=None, trace_max_bytes=DEFAULT_TRACE_MAX_MB * 1024 * 1024):
+    """Apply logging settings; trace_path=None turns tracing off"""
+    global _trace_handler, _trace_config, _tracing
+    logger.setLevel(level if level in LEVELS else DEFAULT_LEVEL)
+    rate_filter.limit = int(rate_limit)
+
+    config = (trace_path, trace_max_bytes) if trace_path else None
+    if config == _trace_config:
+        return
+    _tracing = False
+    if _trace_handler is not None:
+        trace_logger.removeHandler(_trace_handler)
+        _trace_handler.close()
+        _trace_handler = None
+    _trace_config = config
+    if config is None:
+        return
+
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(trace_path)), exist_ok=True)
+        target = logging.handlers.RotatingFileHandler(trace_path, maxBytes=trace_max_bytes, backupCount=TRACE_BACKUPS,
+                                                      encoding="utf-8", delay=True)
+    except OSError as e:
+        error("Could not open trace file %s: %s", trace_path, e)
+        return
+    target.setFormatter(SpanFormatter())
+    _trace_handler = BackgroundHandler(target)
+    trace_logger.addHandler(_trace_handler)
+    _tracing = True
+
+
+@atexit.register
+def _flush():
+    for handler in logger.handlers + trace_logger.handlers:
+        handler.close()
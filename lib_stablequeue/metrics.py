@@ -0,0 +1,185 @@
+"""
+In-process metrics with Prometheus text exposition
+
+Counters and histograms are sharded per thread: the submit hot path only
+touches a dict owned by the calling thread, so recording takes no lock.
+Scrapes sum the shards, and gauges are read from callbacks at scrape time.
+Shards of finished threads (short-lived bulk executors, for instance) are
+folded into a base accumulator, so the shard list only holds live threads.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, for request and payload-building latency
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Job counts, for bulk run sizes
+SIZE_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 100000)
+
+
+def _labels_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _merge(counters, histograms, shard_counters, shard_histograms):
+    """Add one shard's counters and histograms into counters and histograms"""
+    for key, value in shard_counters.items():
+        counters[key] = counters.get(key, 0) + value
+    for key, (buckets, counts, total) in shard_histograms.items():
+        merged = histograms.setdefault(key, [buckets, [0] * len(counts), 0.0])
+        merged[1] = [a + b for a, b in zip(merged[1], counts)]
+        merged[2] += total
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Named counters, histograms and gauges
+
+    Metric names are registered with describe(); recording to an
+    undescribed name still works and is exported as untyped.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        # [(owning thread, (counters, histograms))]; dead threads' data lives in _base
+        self._shards = []
+        self._base = ({}, {})
+        self._lock = threading.Lock()
+        self._meta = {}
+        self._gauges = {}
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = ({}, {})
+            with self._lock:
+                self._fold_dead_shards()
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+            return shard
+
+    def _fold_dead_shards(self):
+        """Merge the shards of finished threads into _base; caller holds _lock"""
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                # The owner is gone, so nothing writes to this shard any more
+                _merge(*self._base, *shard)
+        self._shards = live
+
+    def describe(self, name, kind, help_text, buckets=None):
+        self._meta[name] = (kind, help_text, buckets)
+
+    def inc(self, name, amount=1, **labels):
+        """Add amount to a counter"""
+        counters = self._shard()[0]
+        key = (name, _labels_key(labels))
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """Record one value in a histogram"""
+        histograms = self._shard()[1]
+        key = (name, _labels_key(labels))
+        histogram = histograms.get(key)
+        if histogram is None:
+            buckets = (self._meta.get(name) or (None, None, None))[2] or LATENCY_BUCKETS
+            # [bucket bounds, per-bucket counts (last is +Inf), sum]
+            histogram = histograms[key] = [buckets, [0] * (len(buckets) + 1), 0.0]
+        histogram[1][bisect.bisect_left(histogram[0], value)] += 1
+        histogram[2] += value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of a with-block in a histogram"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def gauge(self, name, help_text, fn):
+        """Export fn() at scrape time
+
+        fn returns a number, None to skip the gauge, or a dict mapping label
+        tuples like (("server", alias),) to numbers.
+        """
+        self._meta[name] = ("gauge", help_text, None)
+        self._gauges[name] = fn
+
+    def collect(self):
+        """Sum all shards into ({(name, labels): total}, {(name, labels): [buckets, counts, sum]})"""
+        counters, histograms = {}, {}
+        with self._lock:
+            self._fold_dead_shards()
+            _merge(counters, histograms, *self._base)
+            shards = [shard for _, shard in self._shards]
+        for shard_counters, shard_histograms in shards:
+            # dict.copy() is atomic, so owners can keep writing during a scrape
+            _merge(counters, histograms, shard_counters.copy(), shard_histograms.copy())
+        return counters, histograms
+
+    def render(self):
+        """Prometheus text exposition of every metric"""
+        counters, histograms = self.collect()
+        samples = {}
+        for (name, key), value in counters.items():
+            samples.setdefault(name, []).append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        for (name, key), (buckets, counts, total) in histograms.items():
+            lines = samples.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(list(buckets) + [float("inf")], counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(key)} {cumulative}")
+        for name, fn in list(self._gauges.items()):
+            try:
+                value = fn()
+            except Exception:
+                continue
+            if value is None:
+                continue
+            values = value.items() if isinstance(value, dict) else [((), value)]
+            samples[name] = [f"{name}{_format_labels(_labels_key(dict(key)))} {_format_value(v)}" for key, v in values]
+
+        output = []
+        for name in sorted(samples):
+            kind, help_text, _ = self._meta.get(name, ("untyped", "", None))
+            if help_text:
+                output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(samples[name])
+        return "\n".join(output) + "\n"
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+
+REGISTRY.describe("stablequeue_submissions_total", "counter", "Submission requests sent to the hub, by endpoint and response status")
+REGISTRY.describe("stablequeue_submission_seconds", "histogram", "Time spent on the network per submission request", LATENCY_BUCKETS)
+REGISTRY.describe("stablequeue_payload_build_seconds", "histogram", "Time spent building submission payloads", LATENCY_BUCKETS)
+REGISTRY.describe("stablequeue_retries_total", "counter", "Submission requests retried, by reason")
+REGISTRY.describe("stablequeue_bulk_jobs", "histogram", "Jobs per bulk run", SIZE_BUCKETS)
+REGISTRY.describe("stablequeue_server_cache_total", "counter", "Server list cache reads, by result (hit, stale or miss)")
@@ -0,0 +1,226 @@
+"""
+In-process submission outbox
+
+Gradio click handlers enqueue a job and get a local handle back immediately;
+background workers drain the queue and talk to the hub. With a journal
+attached, pending entries survive restarts and are parked while the hub is
+unreachable, then replayed in order once it answers again.
+"""
+
+import itertools
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from lib_stablequeue import log
+
+DEFAULT_WORKERS = 2
+DEFAULT_REPLAY_INTERVAL = 10
+MAX_TRACKED_ENTRIES = 500
+
+PENDING = "pending"
+SUBMITTING = "submitting"
+WAITING = "waiting for hub"
+QUEUED = "queued"
+FAILED = "failed"
+
+_sequence = itertools.count()
+
+
+class OutboxEntry:
+    """One job waiting in (or already drained from) the outbox"""
+
+    def __init__(self, kind, server_alias, job, handle=None, created=None):
+        self.handle = handle or uuid.uuid4().hex[:12]
+        self.seq = next(_sequence)
+        self.kind = kind
+        self.server_alias = server_alias
+        self.job = job
+        self.status = PENDING
+        self.message = "Waiting to be submitted"
+        self.created = created or time.time()
+        self.finished = None
+
+    def to_dict(self):
+        return {
+            "handle": self.handle,
+            "kind": self.kind,
+            "server_alias": self.server_alias,
+            "status": self.status,
+            "message": self.message,
+            "created": self.created,
+            "finished": self.finished,
+        }
+
+
+class Outbox:
+    """Queue of pending submissions drained by background worker threads
+
+    submit_fn(entry) performs the network I/O and returns (success, message).
+    probe_fn() returns whether the hub is reachable; when a submission fails
+    and the probe says the hub is down, the entry is kept in the journal and
+    replayed later instead of being dropped. Progress submit_fn records in
+    entry.job (e.g. how much of a bulk job was sent) is journaled with it.
+
+    Parked and recovered entries are replayed by a single thread, one at a
+    time in submission order; jobs enqueued meanwhile wait behind them.
+    """
+
+    def __init__(self, submit_fn, workers=DEFAULT_WORKERS, journal=None, probe_fn=None,
+                 replay_interval=DEFAULT_REPLAY_INTERVAL):
+        self.submit_fn = submit_fn
+        self.workers = max(1, int(workers))
+        self.journal = journal
+        self.probe_fn = probe_fn
+        self.replay_interval = replay_interval
+        self.queue = queue.Queue()
+        self.entries = OrderedDict()
+        self.parked = []
+        self.lock = threading.Lock()
+        self.threads = []
+        self.replay_thread = None
+
+        if journal is not None:
+            self._recover()
+
+    def enqueue(self, kind, server_alias, job):
+        """Add a job to the outbox and return its handle without blocking"""
+        entry = OutboxEntry(kind, server_alias, job)
+        if self.journal is not None:
+            self.journal.put(entry.handle, kind, server_alias, job, entry.created)
+        with self.lock:
+            self.entries[entry.handle] = entry
+            self._trim()
+            # Keep submission order while earlier entries wait for the hub or are replayed
+            if self.replay_thread is not None:
+                self._park(entry, self.parked[-1].status if self.parked else PENDING)
+                return entry.handle
+        self._ensure_workers()
+        self.queue.put(entry)
+        return entry.handle
+
+    def status(self, handle):
+        """Return the state of one entry as a dict, or None if unknown"""
+        with self.lock:
+            entry = self.entries.get(handle)
+            return entry.to_dict() if entry else None
+
+    def recent(self, limit=10):
+        """Return the most recently enqueued entries, newest first"""
+        with self.lock:
+            entries = list(self.entries.values())[-limit:]
+        return [entry.to_dict() for entry in reversed(entries)]
+
+    def pending_count(self):
+        with self.lock:
+            return sum(1 for entry in self.entries.values() if entry.status in (PENDING, SUBMITTING, WAITING))
+
+    def _recover(self):
+        # Replay entries left in the journal by a previous run, oldest first
+        recovered = self.journal.load_pending()
+        with self.lock:
+            for row in recovered:
+                entry = OutboxEntry(row["kind"], row["server_alias"], row["job"], handle=row["handle"], created=row["created"])
+                self.entries[entry.handle] = entry
+                self._park(entry, PENDING)
+        if recovered:
+            log.info("Replaying %d journaled submission(s)", len(recovered))
+
+    def _trim(self):
+        # Forget the oldest finished entries once we track too many
+        while len(self.entries) > MAX_TRACKED_ENTRIES:
+            oldest = next((h for h, e in self.entries.items() if e.status in (QUEUED, FAILED)), None)
+            if oldest is None:
+                break
+            del self.entries[oldest]
+
+    def _park(self, entry, status=WAITING):
+        # Caller holds self.lock. WAITING entries wait for the hub; PENDING
+        # ones (recovered, or queued behind a replay) are submitted right away
+        entry.status = status
+        entry.message = "StableQueue server unreachable, will retry automatically" if status == WAITING else "Waiting to be submitted"
+        self.parked.append(entry)
+        if self.replay_thread is None:
+            self.replay_thread = threading.Thread(target=self._replay, args=(status == WAITING,),
+                                                  name="stablequeue-outbox-replay", daemon=True)
+            self.replay_thread.start()
+
+    def _reachable(self):
+        if self.probe_fn is None:
+            return True
+        try:
+            return self.probe_fn()
+        except Exception:
+            return False
+
+    def _replay(self, wait):
+        # Submits parked entries itself rather than handing them to the
+        # workers, so a replay can't reorder them across threads
+        while True:
+            if wait:
+                time.sleep(self.replay_interval)
+                if not self._reachable():
+                    continue
+
+            with self.lock:
+                parked = sorted(self.parked, key=lambda entry: entry.seq)
+                self.parked = []
+                if not parked:
+                    self.replay_thread = None
+                    return
+            if wait:
+                log.info("StableQueue server reachable again, replaying %d submission(s)", len(parked))
+
+            wait = False
+            for index, entry in enumerate(parked):
+                self._process(entry)
+                if entry.status == WAITING:
+                    # The hub went away again; everything after this entry waits with it
+                    with self.lock:
+                        for rest in parked[index + 1:]:
+                            self._park(rest)
+                    wait = True
+                    break
+
+    def _ensure_workers(self):
+        with self.lock:
+            self.threads = [t for t in self.threads if t.is_alive()]
+            for i in range(len(self.threads), self.workers):
+                thread = threading.Thread(target=self._worker, name=f"stablequeue-outbox-{i}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def _finish(self, entry, status, message):
+        entry.status = status
+        entry.message = message
+        entry.finished = time.time()
+        if self.journal is not None:
+            self.journal.remove(entry.handle)
+
+    def _process(self, entry):
+        try:
+            entry.status = SUBMITTING
+            entry.message = "Submitting to StableQueue"
+            success, message = self.submit_fn(entry)
+            if success:
+                self._finish(entry, QUEUED, message)
+            elif self.probe_fn is not None and not self.probe_fn():
+                if self.journal is not None:
+                    self.journal.update(entry.handle, entry.job)
+                with self.lock:
+                    self._park(entry)
+            else:
+                self._finish(entry, FAILED, message)
+        except Exception as e:
+            log.error("Error in outbox worker: %s", e)
+            self._finish(entry, FAILED, f"Error: {str(e)}")
+
+    def _worker(self):
+        while True:
+            entry = self.queue.get()
+            try:
+                self._process(entry)
+            finally:
+                self.queue.task_done()
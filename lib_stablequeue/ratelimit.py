@@ -0,0 +1,156 @@
+"""
+Client-side rate limiting for hub submissions
+
+"fixed" spaces requests by the Delay Between Jobs setting with a token bucket.
+"adaptive" starts at a maximum rate and follows AIMD: it halves the rate when
+the hub answers 429/503 or its latency climbs, and adds back a little with
+every healthy response. Both modes pause for as long as a Retry-After header
+asks.
+"""
+
+import email.utils
+import threading
+import time
+
+MODES = ("off", "fixed", "adaptive")
+DEFAULT_MODE = "adaptive"
+DEFAULT_MAX_RATE = 10.0
+DEFAULT_MIN_RATE = 0.1
+
+# Statuses meaning the hub wants us to slow down
+OVERLOAD_STATUSES = (429, 503)
+
+# Adaptive tuning: multiplicative decrease, additive increase per second of
+# healthy traffic, and how far latency may climb above its baseline
+DECREASE_FACTOR = 0.5
+LATENCY_DECREASE_FACTOR = 0.8
+INCREASE_PER_SECOND = 1.0
+LATENCY_FACTOR = 2.0
+LATENCY_SMOOTHING = 0.2
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or 0"""
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+    return max(0.0, when - (now if now is not None else time.time()))
+
+
+class RateLimiter:
+    """Thread-safe token bucket whose rate adapts to hub feedback
+
+    Call acquire() (or, from async code, sleep for reserve()) before each submission request and observe() with the
+    outcome afterwards. In fixed mode the rate is 1/job_delay and never
+    changes; a job_delay of 0 (or mode "off") disables limiting.
+    """
+
+    def __init__(self, mode=DEFAULT_MODE, job_delay=0, max_rate=DEFAULT_MAX_RATE, min_rate=DEFAULT_MIN_RATE):
+        self.mode = mode if mode in MODES else DEFAULT_MODE
+        self.min_rate = max(0.001, float(min_rate))
+        if self.mode == "fixed":
+            job_delay = float(job_delay)
+            self.max_rate = 1.0 / job_delay if job_delay > 0 else 0.0
+        else:
+            self.max_rate = max(self.min_rate, float(max_rate))
+        self.rate = self.max_rate
+
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.latency = None
+        self.baseline = None
+        self.last_decrease = float("-inf")
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.mode != "off" and self.max_rate > 0
+
+    @property
+    def config(self):
+        return (self.mode, self.max_rate)
+
+    def _refill(self, now):
+        # Burst up to one second's worth of requests (at least one)
+        burst = max(1.0, self.rate)
+        self.tokens = min(burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """Take the next slot in line, returning the seconds to wait before using it"""
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Tokens may go negative: each caller reserves its own slot in line
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(0.0, wait, self.paused_until - now)
+
+    def acquire(self):
+        """Block until the next request may be sent; returns the seconds waited"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def observe(self, status_code, latency, retry_after=None):
+        """Feed back the outcome of one request"""
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            pause = parse_retry_after(retry_after)
+            if pause:
+                self.paused_until = max(self.paused_until, now + pause)
+
+            if self.mode != "adaptive":
+                return
+
+            if status_code in OVERLOAD_STATUSES:
+                self._decrease(now, DECREASE_FACTOR)
+                return
+            if status_code >= 500:
+                return
+
+            self.latency = latency if self.latency is None else (
+                self.latency + (latency - self.latency) * LATENCY_SMOOTHING)
+            if self.baseline is None or self.latency < self.baseline:
+                self.baseline = self.latency
+            else:
+                # Let the baseline follow a hub that is permanently slower
+                self.baseline += (self.latency - self.baseline) * 0.01
+
+            if self.latency > self.baseline * LATENCY_FACTOR and self.latency - self.baseline > 0.05:
+                self._decrease(now, LATENCY_DECREASE_FACTOR)
+            elif self.rate < self.max_rate:
+                # Additive increase, spread over the requests sent in a second
+                self.rate = min(self.max_rate, self.rate + INCREASE_PER_SECOND / self.rate)
+
+    def _decrease(self, now, factor):
+        # Back off at most once per current request interval so one burst of
+        # rejections doesn't collapse the rate to the floor
+        if now - self.last_decrease < 1.0 / self.rate:
+            return
+        self._refill(now)
+        self.rate = max(self.min_rate, self.rate * factor)
+        self.tokens = min(self.tokens, 0.0)
+        self.last_decrease = now
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "rate": round(self.rate, 3) if self.enabled else None,
+                "latency": round(self.latency, 4) if self.latency is not None else None,
+                "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 3),
+            }
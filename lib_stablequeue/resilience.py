@@ -0,0 +1,129 @@
+"""
+Circuit breaker, cached health probe and retry backoff for hub submissions
+
+While a hub is known to be down its circuit is open and submissions fail in
+microseconds instead of each waiting out the connect timeout. After
+reset_timeout the cached /status probe decides whether to let traffic through
+again; the first failure after that reopens the circuit.
+"""
+
+import random
+import threading
+import time
+
+from lib_stablequeue import log
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+DEFAULT_HEALTH_TTL = 5.0
+DEFAULT_RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+
+# Responses worth retrying: the hub (or a proxy in front of it) is briefly overloaded
+RETRY_STATUSES = (429, 502, 503, 504)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of sending a request to a hub whose circuit is open"""
+
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """Exponential backoff with full jitter for retry number attempt (0-based)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class HealthCheck:
+    """Caches the result of probe_fn() for ttl seconds
+
+    Concurrent callers share one probe rather than each hitting the hub.
+    """
+
+    def __init__(self, probe_fn, ttl=DEFAULT_HEALTH_TTL):
+        self.probe_fn = probe_fn
+        self.ttl = ttl
+        self.healthy = None
+        self.checked_at = float("-inf")
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            if time.monotonic() - self.checked_at > self.ttl:
+                try:
+                    self.healthy = bool(self.probe_fn())
+                except Exception:
+                    self.healthy = False
+                self.checked_at = time.monotonic()
+            return self.healthy
+
+    def invalidate(self):
+        with self.lock:
+            self.checked_at = float("-inf")
+
+
+class CircuitBreaker:
+    """Per-hub circuit breaker
+
+    failure_threshold consecutive failures open the circuit. Once
+    reset_timeout has passed, health_check() (if given) must pass before
+    requests are let through half-open.
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT,
+                 health_check=None):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self.health_check = health_check
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = float("-inf")
+        self.lock = threading.Lock()
+
+    @property
+    def config(self):
+        return (self.failure_threshold, self.reset_timeout)
+
+    def allow(self):
+        """Whether a request may be sent now"""
+        with self.lock:
+            if self.state != OPEN:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+
+        if self.health_check is not None and not self.health_check():
+            with self.lock:
+                self.opened_at = time.monotonic()
+            return False
+
+        with self.lock:
+            if self.state == OPEN:
+                self.state = HALF_OPEN
+                log.info("StableQueue server answering again, resuming submissions")
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                log.warning("✗ StableQueue server unreachable, pausing submissions for %gs", self.reset_timeout)
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+        if self.health_check is not None:
+            self.health_check.invalidate()
+
+    def trip(self):
+        """Open the circuit immediately, e.g. after a failed health probe"""
+        with self.lock:
+            if self.state != OPEN:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
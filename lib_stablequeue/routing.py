@@ -0,0 +1,122 @@
+"""
+Load-aware routing for the "auto" target server alias
+
+Each job (or bulk chunk) goes to the server with the lowest expected wait:
+its queue depth from /api/v1/servers plus the jobs routed to it since that
+list was fetched, times the job duration observed on that server. Sending a
+job to a server that last ran a different checkpoint costs a swap penalty, so
+a checkpoint stays on the same remote worker unless another is clearly idle.
+"""
+
+import threading
+import time
+
+AUTO_ALIAS = "auto"
+DEFAULT_SWAP_PENALTY = 30.0
+# Assumed job duration until a server has completed something for us
+DEFAULT_JOB_SECONDS = 20.0
+DURATION_SMOOTHING = 0.3
+
+# Server list fields understood by the router; hubs report different names
+DEPTH_FIELDS = ("queue_depth", "queue_length", "queued_jobs", "pending_jobs", "queue_size")
+SLOT_FIELDS = ("workers", "slots", "concurrency")
+CHECKPOINT_FIELDS = ("current_checkpoint", "loaded_checkpoint", "checkpoint", "model")
+UNAVAILABLE_STATES = {"offline", "down", "error", "unreachable", "unavailable", "disabled"}
+COMPLETED_STATES = {"completed", "complete", "success"}
+
+
+def _first_number(server, fields, default):
+    for field in fields:
+        value = server.get(field)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return value
+    return default
+
+
+def is_available(server):
+    """Whether a server entry from /api/v1/servers can take jobs"""
+    if server.get("enabled") is False:
+        return False
+    return str(server.get("status", "")).lower() not in UNAVAILABLE_STATES
+
+
+class Router:
+    """Picks the least-loaded server alias and learns job durations per server
+
+    server_cache is the backend's ServerAliasCache; its list is read without
+    waiting on the network.
+    """
+
+    def __init__(self, server_cache, swap_penalty=DEFAULT_SWAP_PENALTY):
+        self.server_cache = server_cache
+        self.swap_penalty = swap_penalty
+        self.durations = {}
+        self.routed = {}
+        self.checkpoints = {}
+        self.last_completion = {}
+        self.lock = threading.Lock()
+
+    def _routed_since_fetch(self, alias):
+        # Caller holds self.lock; jobs sent after the list was fetched aren't in its depth yet
+        fetched_at = self.server_cache.fetched_at
+        return sum(count for routed_at, count in self.routed.get(alias, []) if routed_at > fetched_at)
+
+    def expected_wait(self, server, checkpoint=""):
+        """Seconds a new job would wait on server, including any checkpoint swap"""
+        alias = server["alias"]
+        with self.lock:
+            depth = _first_number(server, DEPTH_FIELDS, 0) + self._routed_since_fetch(alias)
+            duration = self.durations.get(alias, DEFAULT_JOB_SECONDS)
+            loaded = self.checkpoints.get(alias)
+        slots = max(1, _first_number(server, SLOT_FIELDS, 1))
+        if loaded is None:
+            loaded = next((server[field] for field in CHECKPOINT_FIELDS if server.get(field)), None)
+
+        wait = depth * duration / slots
+        if checkpoint and loaded and loaded != checkpoint:
+            wait += self.swap_penalty
+        return wait
+
+    def choose(self, checkpoint="", count=1):
+        """Return the alias to send count jobs to, or None if no server is available"""
+        servers = [server for server in self.server_cache.get() if server.get("alias") and is_available(server)]
+        if not servers:
+            return None
+
+        # min() keeps the hub's order on ties, so an idle list routes to its first server
+        alias = min(servers, key=lambda server: self.expected_wait(server, checkpoint))["alias"]
+        with self.lock:
+            fetched_at = self.server_cache.fetched_at
+            history = [entry for entry in self.routed.get(alias, []) if entry[0] > fetched_at]
+            history.append((time.monotonic(), count))
+            self.routed[alias] = history
+            if checkpoint:
+                self.checkpoints[alias] = checkpoint
+        return alias
+
+    def observe(self, job):
+        """Tracker listener: learn how long jobs take on each server
+
+        A job's duration is the time since the previous completion on the same
+        server, or since it was submitted if that is shorter, which approximates
+        the service time while the server is busy.
+        """
+        alias = job.get("server_alias")
+        if not alias or job.get("status") not in COMPLETED_STATES:
+            return
+        finished = job["updated"]
+        with self.lock:
+            duration = finished - max(job["submitted"], self.last_completion.get(alias, float("-inf")))
+            self.last_completion[alias] = finished
+            if duration <= 0:
+                return
+            previous = self.durations.get(alias)
+            self.durations[alias] = duration if previous is None else previous + (duration - previous) * DURATION_SMOOTHING
+
+    def stats(self):
+        """Expected wait per available server, for display"""
+        return {
+            server["alias"]: round(self.expected_wait(server), 1)
+            for server in self.server_cache.get()
+            if server.get("alias") and is_available(server)
+        }
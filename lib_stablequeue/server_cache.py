@@ -0,0 +1,85 @@
+"""
+Process-wide TTL cache for the hub's server list (/api/v1/servers)
+
+Reads never touch the network: stale data is served while a background
+thread refreshes it. Only an explicit refresh() (or ensure(), before the
+first successful fetch) waits for the hub.
+"""
+
+import threading
+import time
+
+from lib_stablequeue import log, metrics
+
+DEFAULT_TTL = 60
+
+
+class ServerAliasCache:
+    """Thread-safe, stale-while-revalidate cache of server entries
+
+    fetch_fn() returns the list of server dicts from the hub, or raises.
+    """
+
+    def __init__(self, fetch_fn, ttl=DEFAULT_TTL):
+        self.fetch_fn = fetch_fn
+        self.ttl = ttl
+        self.servers = None
+        self.fetched_at = float("-inf")
+        self.last_error = None
+        self.refreshing = False
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Return cached server dicts, scheduling a background refresh when stale"""
+        with self.lock:
+            stale = time.monotonic() - self.fetched_at > self.ttl
+            metrics.inc("stablequeue_server_cache_total", result="miss" if self.servers is None else "stale" if stale else "hit")
+            if stale and not self.refreshing:
+                self.refreshing = True
+                threading.Thread(target=self._background_refresh, name="stablequeue-servers", daemon=True).start()
+            return list(self.servers or [])
+
+    def aliases(self):
+        return [server["alias"] for server in self.get()]
+
+    def ensure(self):
+        """Like get(), but fetches now if the list has never been loaded
+
+        Blocks on the network, so only for worker threads and event handlers,
+        never for UI builds. After a failed fetch it waits one TTL before
+        blocking again.
+        """
+        with self.lock:
+            missing = self.servers is None and time.monotonic() - self.fetched_at > self.ttl
+        if missing:
+            self.refresh()
+        return self.get()
+
+    def refresh(self):
+        """Fetch the server list now, returning True on success"""
+        try:
+            servers = self.fetch_fn()
+        except Exception as e:
+            with self.lock:
+                # Back off for one TTL so a dead hub isn't hammered by UI builds
+                self.fetched_at = time.monotonic()
+                self.last_error = str(e)
+            log.error("Error fetching servers: %s", e)
+            return False
+
+        with self.lock:
+            self.servers = list(servers)
+            self.fetched_at = time.monotonic()
+            self.last_error = None
+        return True
+
+    def invalidate(self):
+        with self.lock:
+            self.fetched_at = float("-inf")
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        finally:
+            with self.lock:
+                self.refreshing = False
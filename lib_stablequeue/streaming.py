@@ -0,0 +1,89 @@
+"""
+Streaming NDJSON submission for very large sweeps
+
+The request body is produced on the fly: a header line (the delta template)
+followed by one JSON line per job, grouped into chunks of about chunk_bytes
+and sent with chunked transfer encoding. A producer thread encodes ahead into
+a bounded queue; when the hub or the network slows down the queue fills and
+the producer pauses, so client memory stays flat however many jobs are sent.
+"""
+
+import json
+import queue
+import threading
+
+DEFAULT_STREAM_THRESHOLD = 10000
+DEFAULT_CHUNK_BYTES = 64 * 1024
+DEFAULT_MAX_PENDING_CHUNKS = 4
+
+_DONE = object()
+
+
+class StreamRejected(Exception):
+    """The connection failed before the hub answered a streamed request, e.g. a proxy without chunked uploads"""
+
+
+def ndjson_chunks(header, jobs, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Yield bytes chunks of NDJSON: the header line, then one line per job"""
+    encoder = json.JSONEncoder(separators=(",", ":"), default=str)
+    buffer = [encoder.encode(header).encode("utf-8") + b"\n"]
+    size = len(buffer[0])
+    for job in jobs:
+        line = encoder.encode(job).encode("utf-8") + b"\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+class BoundedProducer:
+    """Iterate a chunk generator on a background thread, at most max_pending chunks ahead
+
+    Iterating the producer yields the chunks in order and re-raises any error
+    from the generator.
+    """
+
+    def __init__(self, chunks, max_pending=DEFAULT_MAX_PENDING_CHUNKS):
+        self.chunks = chunks
+        self.queue = queue.Queue(maxsize=max(1, int(max_pending)))
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._produce, name="stablequeue-stream", daemon=True)
+        self.thread.start()
+
+    def _produce(self):
+        try:
+            for chunk in self.chunks:
+                # put() blocks while the consumer (the socket) is behind
+                while not self.stopped.is_set():
+                    try:
+                        self.queue.put(chunk, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if self.stopped.is_set():
+                    return
+            self.queue.put(_DONE)
+        except Exception as e:
+            self.queue.put(e)
+
+    def __iter__(self):
+        try:
+            while True:
+                item = self.queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.stopped.set()
+
+
+def stream_jobs(client, path, header, jobs, chunk_bytes=DEFAULT_CHUNK_BYTES,
+                max_pending=DEFAULT_MAX_PENDING_CHUNKS):
+    """POST header + jobs as a chunked NDJSON body and return the response"""
+    body = BoundedProducer(ndjson_chunks(header, jobs, chunk_bytes), max_pending)
+    return client.post(path, data=iter(body), headers={"Content-Type": "application/x-ndjson"})
@@ -0,0 +1,137 @@
+"""
+Vectorized seed plans and parameter sweeps for bulk queueing
+
+A plan is built column-wise with NumPy: one int64 seed column plus one
+integer code column per swept axis (steps, cfg_scale, sampler_name,
+checkpoint_name, prompt, ...). Per-job dicts are only materialized lazily
+when the plan is fed to a submission path.
+"""
+
+import itertools
+import re
+
+import numpy as np
+
+SEED_MODES = ("sequential", "random", "strided")
+DEFAULT_SEED_MODE = "sequential"
+MAX_SEED = 2 ** 32 - 1
+
+# Axes that hold numbers; anything else is swept as strings
+NUMERIC_AXES = {"steps": int, "cfg_scale": float, "width": int, "height": int,
+                "denoising_strength": float, "hr_scale": float, "batch_size": int, "n_iter": int}
+
+# Parameters Backend.build_payload sends; sweeping anything else would queue identical jobs
+AXES = ("prompt", "negative_prompt", "sampler_name", "checkpoint_name", "hr_upscaler", *NUMERIC_AXES)
+
+_WILDCARD = re.compile(r"\{([^{}]*\|[^{}]*)\}")
+
+
+def seed_plan(count, base_seed=-1, mode=DEFAULT_SEED_MODE, stride=1, rng_seed=None):
+    """Return an int64 array of count seeds
+
+    sequential: base_seed, base_seed + 1, ...
+    strided:    base_seed, base_seed + stride, ...
+    random:     drawn from an RNG seeded with rng_seed (or base_seed), so the
+                same settings always reproduce the same seeds
+    A base_seed of -1 starts sequential/strided plans at a random seed.
+    """
+    if mode not in SEED_MODES:
+        raise ValueError(f"seed mode must be one of {SEED_MODES}, got {mode!r}")
+
+    if mode == "random":
+        if rng_seed is None and base_seed != -1:
+            rng_seed = base_seed
+        return np.random.default_rng(rng_seed).integers(0, MAX_SEED, size=count, dtype=np.int64)
+
+    if base_seed == -1:
+        base_seed = int(np.random.default_rng(rng_seed).integers(0, MAX_SEED))
+    step = stride if mode == "strided" else 1
+    return (base_seed + np.arange(count, dtype=np.int64) * step) % (MAX_SEED + 1)
+
+
+def expand_wildcards(prompt):
+    """Expand {a|b|c} groups in a prompt into every combination, in order"""
+    parts = _WILDCARD.split(prompt)
+    literals, groups = parts[0::2], parts[1::2]
+    if not groups:
+        return [prompt]
+    options = [group.split("|") for group in groups]
+    return [
+        "".join(literal + option for literal, option in zip(literals, choice)) + literals[-1]
+        for choice in itertools.product(*options)
+    ]
+
+
+def parse_axes(spec, prompt=""):
+    """Parse a sweep spec like "steps=20|30; cfg_scale=5|7.5; sampler_name=Euler|DPM++ 2M"
+
+    The bare entry "wildcards" sweeps over every expansion of {a|b} groups in prompt.
+    Returns an ordered {axis: [values]} dict; raises ValueError for names not in AXES.
+    """
+    axes = {}
+    for entry in (spec or "").split(";"):
+        entry = entry.strip()
+        if not entry:
+            continue
+        if entry == "wildcards":
+            axes["prompt"] = expand_wildcards(prompt)
+            continue
+        if "=" not in entry:
+            raise ValueError(f"Invalid sweep entry {entry!r}, expected name=value|value")
+        name, values = (part.strip() for part in entry.split("=", 1))
+        if name not in AXES:
+            raise ValueError(f"Unknown sweep parameter {name!r}, expected one of {', '.join(AXES)} or wildcards")
+        cast = NUMERIC_AXES.get(name, str)
+        axes[name] = [cast(value.strip()) for value in values.split("|") if value.strip()]
+    return axes
+
+
+class JobPlan:
+    """Columnar job plan: seeds plus integer codes into each axis' value list"""
+
+    def __init__(self, seeds, codes, axes):
+        self.seeds = seeds
+        self.codes = codes
+        self.axes = axes
+
+    def __len__(self):
+        return len(self.seeds)
+
+    def column(self, name):
+        """Return the values of one column as an array"""
+        if name == "seed":
+            return self.seeds
+        return np.asarray(self.axes[name])[self.codes[name]]
+
+    def iter_params(self, base_params, start=0, stop=None):
+        """Yield one params dict per planned job (base_params overridden by the plan)"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        names = list(self.axes)
+        seeds = self.seeds[start:stop].tolist()
+        columns = [[self.axes[name][code] for code in self.codes[name][start:stop].tolist()] for name in names]
+        for row in zip(seeds, *columns):
+            params = base_params.copy()
+            params["seed"] = row[0]
+            params.update(zip(names, row[1:]))
+            yield params
+
+
+def build_plan(count, base_seed=-1, seed_mode=DEFAULT_SEED_MODE, stride=1, rng_seed=None, axes=None):
+    """Build a plan of count seeds for every combination of the axes' values
+
+    The same seeds are reused for every combination, so grid cells compare
+    like for like. Total jobs = count * product of axis sizes.
+    """
+    axes = {name: list(values) for name, values in (axes or {}).items() if values}
+    seeds = seed_plan(count, base_seed, seed_mode, stride, rng_seed)
+    sizes = [len(values) for values in axes.values()]
+    combos = int(np.prod(sizes)) if sizes else 1
+
+    codes = {}
+    if axes:
+        # Grid indices, one row per axis, each combination repeated count times
+        grid = np.indices(sizes, dtype=np.int32).reshape(len(sizes), combos)
+        grid = np.repeat(grid, count, axis=1)
+        codes = dict(zip(axes, grid))
+
+    return JobPlan(np.tile(seeds, combos), codes, axes)
@@ -0,0 +1,245 @@
+"""
+Tracking of submitted jobs with one background, batching status poller
+
+Job IDs returned by the hub are kept in memory. Where the hub supports it,
+status is fetched for many jobs in one request; otherwise each job is polled
+on its own with an interval that backs off while its status is unchanged.
+Jobs the hub keeps not knowing about, or that never finish, are eventually
+marked lost so they stop being polled and can be evicted.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from lib_stablequeue import log
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MIN_INTERVAL = 2.0
+DEFAULT_MAX_INTERVAL = 60.0
+BACKOFF_FACTOR = 1.5
+MAX_FINISHED_JOBS = 5000
+
+# Consecutive polls a job may be missing from the hub's answer (or 404) before it is given up
+DEFAULT_MAX_MISSES = 10
+# Seconds after submission that an unfinished job is given up anyway
+DEFAULT_MAX_AGE = 24 * 3600.0
+
+LOST = "lost"
+
+TERMINAL_STATES = {"completed", "complete", "success", "failed", "error", "cancelled", "canceled", LOST}
+
+
+def job_id_of(data):
+    """Return the job ID from a hub job or submission response dict"""
+    for key in ("mobilesd_job_id", "stablequeue_job_id", "job_id", "id"):
+        if data.get(key):
+            return str(data[key])
+    return None
+
+
+class TrackedJob:
+    def __init__(self, job_id, server_alias, min_interval):
+        self.job_id = job_id
+        self.server_alias = server_alias
+        self.status = "submitted"
+        self.data = {}
+        self.submitted = time.time()
+        self.updated = self.submitted
+        self.interval = min_interval
+        self.next_poll = time.monotonic() + min_interval
+        self.misses = 0
+
+    @property
+    def finished(self):
+        return self.status in TERMINAL_STATES
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "server_alias": self.server_alias,
+            "status": self.status,
+            "submitted": self.submitted,
+            "updated": self.updated,
+            "data": self.data,
+        }
+
+
+class JobTracker:
+    """In-process registry of submitted jobs and their last known state
+
+    client_fn() returns the hub client to poll with. A job is marked lost after
+    max_misses consecutive polls without an answer for it, or once it is
+    max_age seconds old without finishing (0 disables either limit).
+    """
+
+    def __init__(self, client_fn, batch_size=DEFAULT_BATCH_SIZE, min_interval=DEFAULT_MIN_INTERVAL,
+                 max_interval=DEFAULT_MAX_INTERVAL, max_misses=DEFAULT_MAX_MISSES, max_age=DEFAULT_MAX_AGE):
+        self.client_fn = client_fn
+        self.batch_size = max(1, int(batch_size))
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.max_misses = max(0, int(max_misses))
+        self.max_age = max(0.0, float(max_age))
+        self.jobs_by_id = OrderedDict()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.poller = None
+        self.listeners = []
+
+    def track(self, job_id, server_alias=None):
+        """Start tracking a submitted job"""
+        if not job_id:
+            return
+        with self.lock:
+            if job_id not in self.jobs_by_id:
+                self.jobs_by_id[job_id] = TrackedJob(job_id, server_alias, self.min_interval)
+                self._trim()
+            if self.poller is None:
+                self.poller = threading.Thread(target=self._poll_loop, name="stablequeue-tracker", daemon=True)
+                self.poller.start()
+        self.wakeup.set()
+
+    def add_listener(self, callback):
+        """Call callback(job_dict) whenever a job's status changes"""
+        self.listeners.append(callback)
+
+    def get(self, job_id):
+        """Return the last known state of a job as a dict, or None"""
+        with self.lock:
+            job = self.jobs_by_id.get(job_id)
+            return job.to_dict() if job else None
+
+    def jobs(self, include_finished=True):
+        with self.lock:
+            return [job.to_dict() for job in self.jobs_by_id.values() if include_finished or not job.finished]
+
+    def outstanding(self):
+        with self.lock:
+            return sum(1 for job in self.jobs_by_id.values() if not job.finished)
+
+    def summary(self):
+        """Return a {status: count} mapping over all tracked jobs"""
+        counts = {}
+        with self.lock:
+            for job in self.jobs_by_id.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def _trim(self):
+        # Caller holds self.lock; drop the oldest finished jobs first
+        finished = [job_id for job_id, job in self.jobs_by_id.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs_by_id[job_id]
+
+    def _due(self):
+        # Pull in jobs due shortly so they share a batch request
+        now = time.monotonic() + self.min_interval / 2
+        with self.lock:
+            pending = [job for job in self.jobs_by_id.values() if not job.finished]
+        due = [job for job in pending if job.next_poll <= now]
+        next_poll = min((job.next_poll for job in pending), default=None)
+        return due, next_poll
+
+    def _poll_loop(self):
+        while True:
+            due, next_poll = self._due()
+            if due:
+                try:
+                    self._poll(due)
+                except Exception as e:
+                    log.error("Error polling job status: %s", e)
+                    for job in due:
+                        self._schedule(job, changed=False)
+                continue
+
+            timeout = None if next_poll is None else max(0.0, next_poll - time.monotonic())
+            self.wakeup.wait(timeout)
+            self.wakeup.clear()
+
+    def _poll(self, due):
+        if self.max_age:
+            cutoff = time.time() - self.max_age
+            for job in [job for job in due if job.submitted < cutoff]:
+                self._lose(job, "never finished")
+            due = [job for job in due if not job.finished]
+            if not due:
+                return
+
+        client = self.client_fn()
+        if client.capabilities.get("batch_status") is not False:
+            for start in range(0, len(due), self.batch_size):
+                batch = due[start:start + self.batch_size]
+                if not self._poll_batch(client, batch):
+                    break
+            else:
+                return
+
+        # Per-job fallback; intervals back off so long-running jobs cost little
+        for job in due:
+            response = client.get(f"/api/v2/jobs/{job.job_id}/status")
+            if response.status_code == 200:
+                data = response.json()
+                self._update(job, data.get("job", data))
+            elif response.status_code == 404:
+                self._miss(job)
+            else:
+                self._schedule(job, changed=False)
+
+    def _poll_batch(self, client, batch):
+        """Fetch status for a batch of jobs in one request; False if unsupported"""
+        response = client.post("/api/v2/jobs/status", json={"job_ids": [job.job_id for job in batch]})
+        if response.status_code in (404, 405):
+            client.capabilities["batch_status"] = False
+            return False
+        if response.status_code != 200:
+            for job in batch:
+                self._schedule(job, changed=False)
+            return True
+
+        client.capabilities["batch_status"] = True
+        data = response.json()
+        results = data.get("jobs", []) if isinstance(data, dict) else data
+        by_id = {job_id_of(result): result for result in results if isinstance(result, dict)}
+        for job in batch:
+            if job.job_id in by_id:
+                self._update(job, by_id[job.job_id])
+            else:
+                self._miss(job)
+        return True
+
+    def _update(self, job, data):
+        status = str(data.get("status", job.status)).lower()
+        changed = status != job.status
+        job.data = data
+        job.misses = 0
+        if changed:
+            self._set_status(job, status)
+        self._schedule(job, changed)
+
+    def _miss(self, job):
+        # The hub answered but doesn't know the job (any more)
+        job.misses += 1
+        if self.max_misses and job.misses >= self.max_misses:
+            self._lose(job, f"unknown to the hub for {job.misses} polls")
+        else:
+            self._schedule(job, changed=False)
+
+    def _lose(self, job, reason):
+        log.warning("Giving up on job %s: %s", job.job_id, reason)
+        self._set_status(job, LOST)
+        with self.lock:
+            self._trim()
+
+    def _set_status(self, job, status):
+        job.status = status
+        job.updated = time.time()
+        for callback in self.listeners:
+            try:
+                callback(job.to_dict())
+            except Exception as e:
+                log.error("Error in job status listener: %s", e)
+
+    def _schedule(self, job, changed):
+        job.interval = self.min_interval if changed else min(self.max_interval, job.interval * BACKOFF_FACTOR)
+        job.next_poll = time.monotonic() + job.interval
@@ -1,46 +1,134 @@
-# Add at the very beginning after imports
-print("=" * 50)
-print("[StableQueue] Python extension is loading...")
-print("[StableQueue] Extension file path:", __file__)
-print("=" * 50)
-
 import json
 import modules.scripts as scripts
 import gradio as gr
-import requests
 import os
+import threading
 import time
 import uuid
 from modules import shared
 from modules.ui_components import FormRow, FormGroup, ToolButton
 from modules import script_callbacks
+from modules import processing
 from modules.processing import StableDiffusionProcessing, Processed
-
-print("[StableQueue] All imports successful")
+from lib_stablequeue import backend, blobs, bulk, downloads, hub_client, idempotency, intercept, journal, log, metrics, outbox, ratelimit, resilience, routing, server_cache, streaming, sweep, tracker
 
 VERSION = "1.0.0"
 EXTENSION_NAME = "StableQueue Extension"
 DEFAULT_SERVER_URL = "http://192.168.73.124:8083"
-
-print(f"[StableQueue] Extension initialized - Version {VERSION}")
+EXTENSION_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 
 # Global flag to track if API is set up
 api_setup_completed = False
 
+# Shared backend behind every script instance, the tab and the API routes
+stablequeue_backend = None
+stablequeue_backend_lock = threading.Lock()
+
+def get_backend():
+    """Return the shared backend, creating it on first use (no I/O)"""
+    global stablequeue_backend
+    with stablequeue_backend_lock:
+        if stablequeue_backend is None:
+            stablequeue_backend = backend.Backend(shared.opts.data.get, DEFAULT_SERVER_URL, EXTENSION_DIR)
+        return stablequeue_backend
+
+def outbox_job(kind, params, server_url, sweep_text=""):
+    """Outbox job for a single or bulk submission; bulk settings are read now, at click time
+
+    The click's nonce is stored with the job, so a replay after a restart
+    reuses the same idempotency keys.
+    """
+    params = {**params, idempotency.NONCE_FIELD: idempotency.new_nonce()}
+    if kind != "bulk":
+        return {"params": params, "server_url": server_url}
+    return {
+        "params": params,
+        "bulk_quantity": int(shared.opts.data.get("stablequeue_bulk_quantity", 10)),
+        "server_url": server_url,
+        "sweep": sweep_text,
+        "seed_mode": shared.opts.data.get("stablequeue_seed_mode", sweep.DEFAULT_SEED_MODE),
+        "seed_stride": int(shared.opts.data.get("stablequeue_seed_stride", 1)),
+    }
+
+
+def capture_generation(p, intent):
+    """Interceptor handler: queue an armed Generate click and answer it with an empty Processed"""
+    server_url = shared.opts.data.get("stablequeue_url", DEFAULT_SERVER_URL)
+    kind = intent["kind"]
+    server_alias = intent["server_alias"]
+
+    with log.span("generate_capture", kind=kind, server_alias=server_alias) as span:
+        script = next((s for s in getattr(p.scripts, "alwayson_scripts", None) or [] if isinstance(s, StableQueueScript)), None)
+        with span.step("extract"):
+            params = intercept.json_safe((script or StableQueueScript()).extract_complete_parameters(p))
+        params["target_server_alias"] = server_alias
+
+        with span.step("enqueue"):
+            handle = get_backend().outbox.enqueue(kind, server_alias, outbox_job(kind, params, server_url, intent.get("sweep", "")))
+        span.set(handle=handle)
+
+    log.info("✓ Generation captured as %s job %s for %s, skipping local generation", kind, handle, server_alias)
+    message = f"Job queued in StableQueue ({kind}) as {handle} on {server_alias} - local generation skipped"
+    return Processed(
+        p,
+        images_list=[],
+        seed=p.seed,
+        info=message,
+        subseed=p.subseed,
+        all_prompts=[p.prompt],
+        all_seeds=[p.seed],
+        all_subseeds=[p.subseed],
+        infotexts=[message],
+    )
+
+
+# Armed Generate clicks are captured in front of Forge's process_images; img2img
+# imported it by name, so its copy is replaced too
+try:
+    from modules import img2img as img2img_module
+except ImportError:
+    img2img_module = None
+
+interceptor = intercept.Interceptor(capture_generation)
+if hasattr(processing, "process_images"):
+    interceptor.install(processing, *[module for module in (img2img_module,) if module is not None])
+
+
+def server_choices(servers_list):
+    """Dropdown choices for a server list, offering automatic routing when there is a choice to make"""
+    if not servers_list:
+        return ["Configure API key in settings"]
+    return servers_list + [routing.AUTO_ALIAS] if len(servers_list) > 1 else servers_list
+
+
+def render_outbox_status(entries, job_summary=None):
+    """Render recent outbox entries (and tracked remote job counts) as HTML for the status display"""
+    if not entries:
+        return "<span>No jobs submitted yet</span>"
+    
+    colors = {outbox.PENDING: "gray", outbox.SUBMITTING: "orange", outbox.WAITING: "orange", outbox.QUEUED: "green", outbox.FAILED: "red"}
+    rows = [
+        f"<div style='color:{colors.get(e['status'], 'gray')}'>[{e['handle']}] {e['kind']} → {e['server_alias']}: {e['status']} - {e['message']}</div>"
+        for e in entries
+    ]
+    if job_summary:
+        counts = ", ".join(f"{count} {status}" for status, count in sorted(job_summary.items()))
+        rows.append(f"<div>Remote jobs: {counts}</div>")
+    return "".join(rows)
+
 class StableQueueScript(scripts.Script):
     def __init__(self):
         self.last_params_content = ""
         self.monitoring_thread = None
         self.monitoring_active = False
         self.params_file_path = "params.txt"
-        self.servers_list = []
-        
-        # Initialize servers list if API key is available
-        server_url = shared.opts.data.get("stablequeue_url", DEFAULT_SERVER_URL)
-        api_key = shared.opts.data.get("stablequeue_api_key", "")
-        api_secret = shared.opts.data.get("stablequeue_api_secret", "")
-        if api_key and api_secret:
-            self.fetch_servers()
+        # No I/O here: Forge builds several instances, all sharing one backend
+        self.backend = get_backend()
+    
+    @property
+    def servers_list(self):
+        """Cached server aliases; never waits on the network"""
+        return self.backend.server_cache.aliases()
         
     def title(self):
         return "StableQueue"
@@ -51,268 +139,199 @@ class StableQueueScript(scripts.Script):
     def ui(self, is_img2img):
         """Create Gradio UI components for StableQueue integration"""
         
-        # Refresh servers list on UI load
-        if not self.servers_list:
-            self.fetch_servers()
+        # Use whatever the shared cache holds; UI builds never wait on the network
+        servers_list = self.servers_list
         
-        with gr.Accordion("StableQueue", open=False):
-            with gr.Row():
-                # Server selection dropdown
-                server_dropdown = gr.Dropdown(
-                    label="Target Server",
-                    choices=self.servers_list if self.servers_list else ["Configure API key in settings"],
-                    value=self.servers_list[0] if self.servers_list else "Configure API key in settings",
-                    elem_id=f"stablequeue_server_{'img2img' if is_img2img else 'txt2img'}"
-                )
+        # Forge builds this once at startup, usually before the server list has arrived;
+        # the enclosing Blocks lets the dropdown be refilled on every page load
+        with gr.Blocks(analytics_enabled=False) as stablequeue_block:
+            with gr.Accordion("StableQueue", open=False):
+                with gr.Row():
+                    # Server selection dropdown
+                    server_dropdown = gr.Dropdown(
+                        label="Target Server",
+                        choices=server_choices(servers_list),
+                        value=servers_list[0] if servers_list else "Configure API key in settings",
+                        elem_id=f"stablequeue_server_{'img2img' if is_img2img else 'txt2img'}"
+                    )
                 
-                # Refresh servers button
-                refresh_btn = gr.Button("🔄", scale=0, min_width=40)
+                    # Refresh servers button
+                    refresh_btn = gr.Button("🔄", scale=0, min_width=40)
             
-            with gr.Row():
-                # Queue buttons
-                queue_btn = gr.Button("Queue in StableQueue", variant="primary")
-                bulk_queue_btn = gr.Button("Bulk Queue", variant="secondary")
+                with gr.Row():
+                    # Queue buttons
+                    queue_btn = gr.Button("Queue in StableQueue", variant="primary")
+                    bulk_queue_btn = gr.Button("Bulk Queue", variant="secondary")
+                    status_btn = gr.Button("Check Status", variant="secondary")
             
-            # Status display
-            status_display = gr.HTML("")
+                # Optional X/Y/Z-style sweep applied to bulk jobs
+                sweep_spec = gr.Textbox(
+                    label="Bulk sweep (optional)",
+                    placeholder="steps=20|30; cfg_scale=5|7.5; sampler_name=Euler|DPM++ 2M; wildcards",
+                    lines=1
+                )
             
-            # Queue intent flags (hidden from user)
-            queue_intent = gr.State(False)
-            bulk_intent = gr.State(False)
-            selected_server = gr.State("")
+                # Status display
+                status_display = gr.HTML("")
             
-            # Event handlers
-            def refresh_servers():
-                if self.fetch_servers():
-                    choices = self.servers_list if self.servers_list else ["Configure API key in settings"]
-                    value = self.servers_list[0] if self.servers_list else "Configure API key in settings"
-                    return gr.Dropdown.update(choices=choices, value=value), f"<span style='color:green'>✓ Found {len(self.servers_list)} server(s)</span>"
-                else:
-                    return gr.Dropdown.update(choices=["Configure API key in settings"], value="Configure API key in settings"), "<span style='color:red'>✗ Failed to refresh servers</span>"
+                # Token armed for the next Generate click in intercept mode (hidden from user)
+                intercept_token = gr.State("")
             
-            def queue_job_now(server_alias):
-                """Queue job immediately by extracting current UI parameters"""
-                if not server_alias or server_alias == "Configure API key in settings":
-                    return False, "", "<span style='color:red'>✗ Please select a valid server</span>"
+                # Event handlers
+                def load_servers():
+                    servers_list = [server["alias"] for server in self.backend.server_cache.ensure()]
+                    return gr.Dropdown.update(
+                        choices=server_choices(servers_list),
+                        value=servers_list[0] if servers_list else "Configure API key in settings"
+                    )
+                
+                def refresh_servers():
+                    if self.fetch_servers():
+                        servers_list = self.servers_list
+                        choices = server_choices(servers_list)
+                        value = servers_list[0] if servers_list else "Configure API key in settings"
+                        return gr.Dropdown.update(choices=choices, value=value), f"<span style='color:green'>✓ Found {len(servers_list)} server(s)</span>"
+                    else:
+                        return gr.Dropdown.update(choices=["Configure API key in settings"], value="Configure API key in settings"), "<span style='color:red'>✗ Failed to refresh servers</span>"
+            
+                def arm_generate(kind, server_alias, armed_token, sweep_text=""):
+                    """Intercept mode: capture the next Generate click instead of queueing UI values now"""
+                    token = interceptor.arm(replaces=armed_token, kind=kind, server_alias=server_alias, sweep=sweep_text)
+                    label = "Bulk job" if kind == "bulk" else "Job"
+                    return token, f"<span style='color:gray'>⏳ {label} armed for {server_alias}: press Generate to queue it instead of generating locally</span>"
+            
+                def queue_job_now(server_alias, armed_token=""):
+                    """Queue job immediately by extracting current UI parameters"""
+                    if not server_alias or server_alias == "Configure API key in settings":
+                        return armed_token, "<span style='color:red'>✗ Please select a valid server</span>"
                 
-                print(f"[StableQueue] Queue button clicked for server: {server_alias}")
+                    log.debug("Queue button clicked for server: %s", server_alias)
                 
-                try:
-                    # Get StableQueue settings
-                    server_url = shared.opts.data.get("stablequeue_url", DEFAULT_SERVER_URL)
-                    api_key = shared.opts.data.get("stablequeue_api_key", "")
-                    api_secret = shared.opts.data.get("stablequeue_api_secret", "")
+                    try:
+                        # Get StableQueue settings
+                        server_url = shared.opts.data.get("stablequeue_url", DEFAULT_SERVER_URL)
+                        api_key = shared.opts.data.get("stablequeue_api_key", "")
+                        api_secret = shared.opts.data.get("stablequeue_api_secret", "")
                     
-                    if not all([server_url, api_key, api_secret]):
-                        return False, "", "<span style='color:red'>✗ StableQueue credentials not configured in settings</span>"
+                        if not all([server_url, api_key, api_secret]):
+                            return armed_token, "<span style='color:red'>✗ StableQueue credentials not configured in settings</span>"
                     
-                    # Extract current UI parameters
-                    tab_id = 'img2img' if is_img2img else 'txt2img'
-                    params = self.extract_current_ui_parameters(tab_id)
+                        if shared.opts.data.get("stablequeue_capture_mode", intercept.DEFAULT_MODE) == "intercept":
+                            return arm_generate("single", server_alias, armed_token)
                     
-                    # Set the target server alias
-                    params["target_server_alias"] = server_alias
-                    
-                    # Submit to StableQueue
-                    success = self.submit_to_stablequeue(params, server_url, api_key, api_secret)
+                        with log.span("queue_click", kind="single", server_alias=server_alias) as span:
+                            # Extract current UI parameters
+                            tab_id = 'img2img' if is_img2img else 'txt2img'
+                            with span.step("extract"):
+                                params = self.extract_current_ui_parameters(tab_id)
+                        
+                            # Set the target server alias
+                            params["target_server_alias"] = server_alias
+                        
+                            if self.backend.is_repeat_click(params, server_alias):
+                                return armed_token, "<span style='color:gray'>Identical job was just queued, ignoring the repeated click</span>"
+                        
+                            # Hand off to the outbox; workers submit in the background
+                            with span.step("enqueue"):
+                                handle = self.backend.outbox.enqueue("single", server_alias, outbox_job("single", params, server_url))
+                            span.set(handle=handle)
                     
-                    if success:
-                        return True, server_alias, f"<span style='color:green'>✓ Job queued successfully on {server_alias}</span>"
-                    else:
-                        return False, "", f"<span style='color:red'>✗ Failed to queue job on {server_alias}</span>"
+                        return armed_token, f"<span style='color:gray'>⏳ Job {handle} accepted, submitting to {server_alias} in background</span>"
                         
-                except Exception as e:
-                    print(f"[StableQueue] Error in queue_job_now: {e}")
-                    return False, "", f"<span style='color:red'>✗ Error: {str(e)}</span>"
+                    except Exception as e:
+                        log.error("Error in queue_job_now: %s", e)
+                        return armed_token, f"<span style='color:red'>✗ Error: {str(e)}</span>"
             
-            def bulk_queue_job_now(server_alias):
-                """Bulk queue job immediately by extracting current UI parameters"""
-                if not server_alias or server_alias == "Configure API key in settings":
-                    return False, "", "<span style='color:red'>✗ Please select a valid server</span>"
+                def bulk_queue_job_now(server_alias, sweep_text="", armed_token=""):
+                    """Bulk queue job immediately by extracting current UI parameters"""
+                    if not server_alias or server_alias == "Configure API key in settings":
+                        return armed_token, "<span style='color:red'>✗ Please select a valid server</span>"
                 
-                print(f"[StableQueue] Bulk queue button clicked for server: {server_alias}")
+                    log.debug("Bulk queue button clicked for server: %s", server_alias)
                 
-                try:
-                    # Get StableQueue settings
-                    server_url = shared.opts.data.get("stablequeue_url", DEFAULT_SERVER_URL)
-                    api_key = shared.opts.data.get("stablequeue_api_key", "")
-                    api_secret = shared.opts.data.get("stablequeue_api_secret", "")
-                    
-                    if not all([server_url, api_key, api_secret]):
-                        return False, "", "<span style='color:red'>✗ StableQueue credentials not configured in settings</span>"
+                    try:
+                        # Get StableQueue settings
+                        server_url = shared.opts.data.get("stablequeue_url", DEFAULT_SERVER_URL)
+                        api_key = shared.opts.data.get("stablequeue_api_key", "")
+                        api_secret = shared.opts.data.get("stablequeue_api_secret", "")
                     
-                    # Extract current UI parameters
-                    tab_id = 'img2img' if is_img2img else 'txt2img'
-                    params = self.extract_current_ui_parameters(tab_id)
+                        if not all([server_url, api_key, api_secret]):
+                            return armed_token, "<span style='color:red'>✗ StableQueue credentials not configured in settings</span>"
                     
-                    # Set the target server alias
-                    params["target_server_alias"] = server_alias
+                        sweep_text = (sweep_text or "").strip()
+                        if shared.opts.data.get("stablequeue_capture_mode", intercept.DEFAULT_MODE) == "intercept":
+                            # Validate the sweep now so typos are reported on click, not on Generate
+                            sweep.parse_axes(sweep_text, "")
+                            return arm_generate("bulk", server_alias, armed_token, sweep_text)
                     
-                    # Get bulk quantity from settings
-                    bulk_quantity = shared.opts.data.get("stablequeue_bulk_quantity", 10)
+                        with log.span("queue_click", kind="bulk", server_alias=server_alias) as span:
+                            # Extract current UI parameters
+                            tab_id = 'img2img' if is_img2img else 'txt2img'
+                            with span.step("extract"):
+                                params = self.extract_current_ui_parameters(tab_id)
                     
-                    # Submit multiple jobs
-                    success_count = 0
-                    for i in range(bulk_quantity):
-                        # Vary the seed for each job
-                        bulk_params = params.copy()
-                        if bulk_params.get('seed', -1) != -1:
-                            bulk_params['seed'] = bulk_params['seed'] + i
+                            # Set the target server alias
+                            params["target_server_alias"] = server_alias
                         
-                        success = self.submit_to_stablequeue(bulk_params, server_url, api_key, api_secret)
-                        if success:
-                            success_count += 1
+                            if self.backend.is_repeat_click(params, server_alias, sweep_text):
+                                return armed_token, "<span style='color:gray'>Identical bulk job was just queued, ignoring the repeated click</span>"
                     
-                    if success_count > 0:
-                        return True, server_alias, f"<span style='color:green'>✓ {success_count}/{bulk_quantity} bulk jobs queued on {server_alias}</span>"
-                    else:
-                        return False, "", f"<span style='color:red'>✗ Failed to queue bulk jobs on {server_alias}</span>"
+                            # Get bulk quantity (seeds per sweep combination) from settings
+                            bulk_quantity = int(shared.opts.data.get("stablequeue_bulk_quantity", 10))
+                    
+                            # Validate the sweep now so typos are reported on click
+                            axes = sweep.parse_axes(sweep_text, params.get("prompt", ""))
+                            total_jobs = bulk_quantity
+                            for values in axes.values():
+                                total_jobs *= len(values)
+                    
+                            # Hand off to the outbox; workers submit via the hub's bulk endpoint
+                            with span.step("enqueue"):
+                                handle = self.backend.outbox.enqueue("bulk", server_alias, outbox_job("bulk", params, server_url, sweep_text))
+                            span.set(handle=handle)
+                    
+                        return armed_token, f"<span style='color:gray'>⏳ Bulk job {handle} ({total_jobs} jobs) accepted, submitting to {server_alias} in background</span>"
                         
-                except Exception as e:
-                    print(f"[StableQueue] Error in bulk_queue_job_now: {e}")
-                    return False, "", f"<span style='color:red'>✗ Error: {str(e)}</span>"
-            
-            # Wire up the event handlers
-            refresh_btn.click(
-                fn=refresh_servers,
-                outputs=[server_dropdown, status_display]
-            )
+                    except Exception as e:
+                        log.error("Error in bulk_queue_job_now: %s", e)
+                        return armed_token, f"<span style='color:red'>✗ Error: {str(e)}</span>"
             
-            # Wire up queue buttons to set intent and trigger generation
-            def queue_and_generate(server_alias):
-                """Set queue intent and trigger generation in one action"""
-                # First set the intent
-                queue_intent_val, selected_server_val, status_msg = queue_job_now(server_alias)
+                # Wire up the event handlers
+                stablequeue_block.load(
+                    fn=load_servers,
+                    outputs=[server_dropdown]
+                )
                 
-                # Return the values that will be used by the next generation
-                return queue_intent_val, selected_server_val, status_msg
+                refresh_btn.click(
+                    fn=refresh_servers,
+                    outputs=[server_dropdown, status_display]
+                )
             
-            def bulk_queue_and_generate(server_alias):
-                """Set bulk queue intent and trigger generation in one action"""
-                # First set the intent
-                bulk_intent_val, selected_server_val, status_msg = bulk_queue_job_now(server_alias)
-                
-                # Return the values that will be used by the next generation
-                return bulk_intent_val, selected_server_val, status_msg
+                # Queue buttons either queue now or, in intercept mode, arm the next Generate click
+                queue_btn.click(
+                    fn=queue_job_now,
+                    inputs=[server_dropdown, intercept_token],
+                    outputs=[intercept_token, status_display]
+                )
             
-            queue_btn.click(
-                fn=queue_and_generate,
-                inputs=[server_dropdown],
-                outputs=[queue_intent, selected_server, status_display]
-            )
+                bulk_queue_btn.click(
+                    fn=bulk_queue_job_now,
+                    inputs=[server_dropdown, sweep_spec, intercept_token],
+                    outputs=[intercept_token, status_display]
+                )
             
-            bulk_queue_btn.click(
-                fn=bulk_queue_and_generate,
-                inputs=[server_dropdown], 
-                outputs=[bulk_intent, selected_server, status_display]
-            )
+                # Status polling reads local outbox state only, never the network
+                status_btn.click(
+                    fn=lambda: render_outbox_status(self.backend.outbox.recent(), self.backend.tracker.summary()),
+                    outputs=[status_display]
+                )
         
-        # Return the components in the order expected by script_args
-        return [queue_intent, bulk_intent, selected_server]
+        # The token reaches processing.process_images in p.script_args
+        return [intercept_token]
     
     def fetch_servers(self):
-        """Fetch available server aliases from StableQueue"""
-        try:
-            server_url = shared.opts.data.get("stablequeue_url", DEFAULT_SERVER_URL)
-            api_key = shared.opts.data.get("stablequeue_api_key", "")
-            api_secret = shared.opts.data.get("stablequeue_api_secret", "")
-            
-            response = requests.get(
-                f"{server_url}/api/v1/servers",
-                headers={
-                    "X-API-Key": api_key,
-                    "X-API-Secret": api_secret
-                },
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                self.servers_list = [server["alias"] for server in response.json()]
-                return True
-            else:
-                print(f"[StableQueue] Failed to fetch servers: {response.status_code} - {response.text}")
-                return False
-        except Exception as e:
-            print(f"[StableQueue] Error fetching servers: {str(e)}")
-            return False
-
-    def process(self, p: StableDiffusionProcessing, *args):
-        """
-        This hook is called with the complete StableDiffusionProcessing object
-        containing all parameters from UI and extensions.
-        
-        NOTE: Since Phase 3, queue buttons work independently and don't use this hook.
-        This hook is kept for potential future use but currently disabled.
-        """
-        try:
-            # Phase 3: Queue buttons now work independently, so this hook is not needed
-            # Just continue with normal processing for all requests
-            print(f"[StableQueue] Process hook called but bypassed - queue buttons work independently")
-            return None
-            
-            # DISABLED CODE - kept for reference:
-            # Extract our UI component values from args
-            # args order: [queue_intent, bulk_intent, selected_server]
-            if False and len(args) >= 3:  # Disabled with False and
-                queue_intent = args[0] if args[0] is not None else False
-                bulk_intent = args[1] if args[1] is not None else False
-                selected_server = args[2] if args[2] is not None else ""
-                
-                print(f"[StableQueue] Process hook - queue_intent: {queue_intent}, bulk_intent: {bulk_intent}, server: {selected_server}")
-                
-                # Check if this is a queue request
-                if queue_intent or bulk_intent:
-                    job_type = "bulk" if bulk_intent else "single"
-                    
-                    # Validate server selection
-                    if not selected_server or selected_server == "Configure API key in settings":
-                        print(f"[StableQueue] ✗ No valid server selected, allowing local generation")
-                        return None
-                    
-                    # Get StableQueue settings
-                    server_url = shared.opts.data.get("stablequeue_url", DEFAULT_SERVER_URL)
-                    api_key = shared.opts.data.get("stablequeue_api_key", "")
-                    api_secret = shared.opts.data.get("stablequeue_api_secret", "")
-                    
-                    if not all([server_url, api_key, api_secret]):
-                        print(f"[StableQueue] ✗ Credentials not configured, allowing local generation")
-                        return None
-                    
-                    print(f"[StableQueue] ✓ Intercepting generation for {job_type} queue on server: {selected_server}")
-                    
-                    # Extract complete parameters using our proven method
-                    params = self.extract_complete_parameters(p)
-                    
-                    # Submit to StableQueue
-                    success = self.submit_to_stablequeue(params, server_url, api_key, api_secret)
-                    
-                    if success:
-                        print(f"[StableQueue] ✓ {job_type.title()} job queued successfully, preventing local generation")
-                        
-                        # Prevent local generation by returning empty result
-                        return Processed(
-                            p,
-                            images_list=[],
-                            seed=p.seed,
-                            info=f"Job queued in StableQueue ({job_type}) - local generation skipped",
-                            subseed=p.subseed,
-                            all_prompts=[p.prompt],
-                            all_seeds=[p.seed],
-                            all_subseeds=[p.subseed],
-                            infotexts=[f"Job queued in StableQueue ({job_type}) on {selected_server}"]
-                        )
-                    else:
-                        print(f"[StableQueue] ✗ Failed to queue {job_type} job, allowing local generation")
-                        return None
-            
-            # No queue intent - continue with normal processing
-            return None
-                
-        except Exception as e:
-            print(f"[StableQueue] Error in process hook: {e}")
-            import traceback
-            print(f"[StableQueue] Full traceback: {traceback.format_exc()}")
-            return None  # Continue with normal processing on error
+        """Force a refresh of the shared server list cache"""
+        return self.backend.server_cache.refresh()
 
     def extract_complete_parameters(self, p: StableDiffusionProcessing):
         """Extract all parameters from the StableDiffusionProcessing object"""
@@ -348,6 +367,20 @@ class StableQueueScript(scripts.Script):
                 "denoising_strength": getattr(p, 'denoising_strength', 0.7),
             })
         
+        # img2img inputs; images are encoded when the job is captured
+        if getattr(p, 'init_images', None):
+            params.update({
+                "init_images": list(p.init_images),
+                "denoising_strength": getattr(p, 'denoising_strength', 0.75),
+                "resize_mode": getattr(p, 'resize_mode', 0),
+                "mask": getattr(p, 'image_mask', None),
+                "mask_blur": getattr(p, 'mask_blur', 4),
+                "inpainting_fill": getattr(p, 'inpainting_fill', 1),
+                "inpaint_full_res": getattr(p, 'inpaint_full_res', True),
+                "inpaint_full_res_padding": getattr(p, 'inpaint_full_res_padding', 0),
+                "inpainting_mask_invert": getattr(p, 'inpainting_mask_invert', 0),
+            })
+        
         # Model information
         if hasattr(p, 'sd_model') and p.sd_model:
             # Handle CheckpointInfo object properly
@@ -373,6 +406,9 @@ class StableQueueScript(scripts.Script):
             
             try:
                 for script in p.scripts.alwayson_scripts:
+                    # Our own args are the intercept token; the hub has no use for them
+                    if isinstance(script, StableQueueScript):
+                        continue
                     if hasattr(script, 'args_from') and hasattr(script, 'args_to'):
                         script_name = script.title().lower().replace(' ', '_')
                         script_args = p.script_args[script.args_from:script.args_to]
@@ -384,10 +420,10 @@ class StableQueueScript(scripts.Script):
                             # Generic handling for unknown extensions
                             params["alwayson_scripts"][script_name] = script_args
                             
-                print(f"[StableQueue] Captured {len(params['alwayson_scripts'])} extension(s)")
+                log.debug("Captured %s extension(s)", len(params['alwayson_scripts']))
                         
             except Exception as e:
-                print(f"[StableQueue] Warning: Could not parse script_args: {e}")
+                log.warning("Could not parse script_args: %s", e)
                 params["alwayson_scripts"] = {}
         
         return params
@@ -424,70 +460,13 @@ class StableQueueScript(scripts.Script):
             return {"units": units}
             
         except Exception as e:
-            print(f"[StableQueue] Warning: Could not parse ControlNet args: {e}")
+            log.warning("Could not parse ControlNet args: %s", e)
             return {"raw_args": args}
 
-    def submit_to_stablequeue(self, params, server_url, api_key, api_secret):
-        """Submit job to StableQueue server using v2 API"""
-        try:
-            # Format payload according to StableQueue v2 API specification
-            payload = {
-                "app_type": "forge",
-                "target_server_alias": params.get("target_server_alias", "default"),
-                "generation_params": {
-                    "positive_prompt": params.get("prompt", ""),
-                    "negative_prompt": params.get("negative_prompt", ""),
-                    "width": params.get("width", 512),
-                    "height": params.get("height", 512),
-                    "steps": params.get("steps", 20),
-                    "cfg_scale": params.get("cfg_scale", 7.0),
-                    "sampler_name": params.get("sampler_name", "Euler"),
-                    "seed": params.get("seed", -1),
-                    "batch_size": params.get("batch_size", 1),
-                    "n_iter": params.get("n_iter", 1),
-                    "restore_faces": params.get("restore_faces", False),
-                    "checkpoint_name": params.get("checkpoint_name", ""),
-                    "enable_hr": params.get("enable_hr", False),
-                    "hr_scale": params.get("hr_scale", 2.0),
-                    "hr_upscaler": params.get("hr_upscaler", "Latent"),
-                    "denoising_strength": params.get("denoising_strength", 0.7),
-                },
-                "source_info": "forge_extension_v1.0.0"
-            }
-            
-            headers = {
-                "Content-Type": "application/json",
-                "X-API-Key": api_key,
-                "X-API-Secret": api_secret
-            }
-            
-            url = f"{server_url.rstrip('/')}/api/v2/generate"
-            
-            print(f"[StableQueue] Submitting to {url}")
-            print(f"[StableQueue] Target server: {payload['target_server_alias']}")
-            
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
-            
-            if response.status_code == 202:  # StableQueue v2 returns 202 Accepted
-                result = response.json()
-                job_id = result.get('mobilesd_job_id', 'unknown')
-                print(f"[StableQueue] ✓ Job queued with ID: {job_id}")
-                return True
-            else:
-                print(f"[StableQueue] ✗ Failed to queue: {response.status_code} - {response.text}")
-                return False
-                
-        except requests.exceptions.Timeout:
-            print(f"[StableQueue] ✗ Timeout connecting to StableQueue server")
-            return False
-        except Exception as e:
-            print(f"[StableQueue] ✗ Error submitting job: {e}")
-            return False
-
     def extract_current_ui_parameters(self, tab_id):
         """Extract current UI parameters using a simplified approach"""
         try:
-            print(f"[StableQueue] Extracting parameters from {tab_id} tab")
+            log.debug("Extracting parameters from %s tab", tab_id)
             
             # Create basic parameters with default values
             # This is a simplified approach - in a real implementation, 
@@ -542,50 +521,15 @@ class StableQueueScript(scripts.Script):
                 
                 params["model_hash"] = getattr(shared.sd_model, 'sd_model_hash', '')
             
-            print(f"[StableQueue] Extracted {len(params)} parameters from {tab_id}")
-            print(f"[StableQueue] Note: Using default values - actual UI parameter extraction would require more complex implementation")
+            log.debug("Extracted %s parameters from %s", len(params), tab_id)
+            log.debug("Note: Using default values - actual UI parameter extraction would require more complex implementation")
             
             return params
             
         except Exception as e:
-            print(f"[StableQueue] Error in extract_current_ui_parameters: {e}")
-            import traceback
-            print(f"[StableQueue] Full traceback: {traceback.format_exc()}")
+            log.error("Error in extract_current_ui_parameters: %s", e, exc_info=True)
             raise
 
-    def queue_job_from_javascript(self, payload_data, server_alias, job_type="single"):
-        """Queue job from JavaScript frontend"""
-        try:
-            # Get StableQueue settings
-            server_url = shared.opts.data.get("stablequeue_server_url", DEFAULT_SERVER_URL)
-            api_key = shared.opts.data.get("stablequeue_api_key", "")
-            api_secret = shared.opts.data.get("stablequeue_api_secret", "")
-            
-            if not all([server_url, api_key, api_secret]):
-                return {"success": False, "message": "StableQueue credentials not configured in Settings"}
-            
-            print(f"[StableQueue] Processing JavaScript job: {job_type} for server {server_alias}")
-            
-            # For context menu data, use payload directly
-            if isinstance(payload_data, dict) and 'prompt' in payload_data:
-                # This looks like complete generation parameters
-                params = payload_data
-            else:
-                # This might be incomplete - for now just pass through
-                params = payload_data
-            
-            # Submit to StableQueue
-            success = self.submit_to_stablequeue(params, server_url, api_key, api_secret)
-            
-            if success:
-                return {"success": True, "message": f"{job_type.title()} job queued successfully on {server_alias}"}
-            else:
-                return {"success": False, "message": "Failed to queue job in StableQueue"}
-                
-        except Exception as e:
-            print(f"[StableQueue] Error in queue_job_from_javascript: {e}")
-            return {"success": False, "message": f"Error: {str(e)}"}
-
 # TODO: Phase 2 - Remove this global state approach entirely
 # Global state for manual queue triggers (TO BE REMOVED)
 # pending_queue_request = {
@@ -594,12 +538,6 @@ class StableQueueScript(scripts.Script):
 #     "job_type": "single"
 # }
 
-# Create global instance
-stablequeue_instance = StableQueueScript()
-
-
-
-print("[StableQueue] Extension loaded - Python AlwaysOnScript approach")
 
 # Register context menu items if enabled
 def context_menu_entries():
@@ -617,19 +555,15 @@ js_callbacks = []
 def create_stablequeue_tab():
     """Create the StableQueue tab in the main interface"""
     try:
-        print(f"[StableQueue] create_stablequeue_tab() called - Creating tab interface...")
-        
-        stablequeue_instance = StableQueueScript()
-        print(f"[StableQueue] StableQueue instance created successfully")
+        alias_cache = get_backend().server_cache
+        servers_list = alias_cache.aliases()
         
         with gr.Blocks(analytics_enabled=False) as stablequeue_interface:
-            print(f"[StableQueue] Creating gradio interface...")
-            
             with gr.Row():
                 with gr.Column():
                     server_alias = gr.Dropdown(
                         label="Target Server", 
-                        choices=stablequeue_instance.servers_list if stablequeue_instance.servers_list else ["Configure API key in settings"],
+                        choices=server_choices(servers_list),
                         interactive=True,
                         elem_id="stablequeue_server_dropdown"
                     )
@@ -648,12 +582,13 @@ def create_stablequeue_tab():
             
             # Refresh button to update server list
             def refresh_servers():
-                print(f"[StableQueue] Refresh servers button clicked")
-                if stablequeue_instance.fetch_servers():
-                    print(f"[StableQueue] Server refresh successful: {len(stablequeue_instance.servers_list)} servers")
-                    return gr.Dropdown.update(choices=stablequeue_instance.servers_list), f"<div style='color:green'>Refreshed server list. Found {len(stablequeue_instance.servers_list)} server(s).</div>"
+                log.debug("Refresh servers button clicked")
+                if alias_cache.refresh():
+                    servers_list = alias_cache.aliases()
+                    log.info("Server refresh successful: %s servers", len(servers_list))
+                    return gr.Dropdown.update(choices=server_choices(servers_list)), f"<div style='color:green'>Refreshed server list. Found {len(servers_list)} server(s).</div>"
                 else:
-                    print(f"[StableQueue] Server refresh failed")
+                    log.warning("Server refresh failed")
                     return gr.Dropdown.update(choices=["Configure API key in settings"]), "<div style='color:red'>Failed to refresh server list. Check API key in settings.</div>"
             
             refresh_btn.click(
@@ -662,6 +597,12 @@ def create_stablequeue_tab():
                 outputs=[server_alias, status_html]
             )
             
+            # The tab is built before the server list arrives; fill it in on page load
+            stablequeue_interface.load(
+                fn=lambda: gr.Dropdown.update(choices=server_choices([server["alias"] for server in alias_cache.ensure()])),
+                outputs=[server_alias]
+            )
+            
             # Information about how to use the extension
             gr.HTML("""
             <div style='margin-top: 20px; padding: 15px; background-color: rgba(0,100,200,0.1); border-radius: 8px;'>
@@ -675,19 +616,14 @@ def create_stablequeue_tab():
             </div>
             """)
         
-        print(f"[StableQueue] Gradio interface created successfully - Returning tab tuple")
         return [(stablequeue_interface, "StableQueue", "stablequeue")]
         
     except Exception as e:
-        print(f"[StableQueue] ERROR in create_stablequeue_tab: {e}")
-        import traceback
-        print(f"[StableQueue] Full traceback: {traceback.format_exc()}")
+        log.error("Error in create_stablequeue_tab: %s", e, exc_info=True)
         return []
 
 # Register the tab
-print(f"[StableQueue] Registering StableQueue tab with script_callbacks.on_ui_tabs...")
 script_callbacks.on_ui_tabs(create_stablequeue_tab)
-print(f"[StableQueue] Tab registration completed")
 
 # Register settings
 def register_stablequeue_settings():
@@ -711,13 +647,214 @@ def register_stablequeue_settings():
         10, "Bulk Job Quantity", section=section
     ))
     
+    shared.opts.add_option("stablequeue_capture_mode", shared.OptionInfo(
+        intercept.DEFAULT_MODE, "Queue buttons: queue current settings now (immediate) or capture the next Generate click (intercept)", gr.Radio, {"choices": list(intercept.MODES)}, section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_seed_mode", shared.OptionInfo(
+        sweep.DEFAULT_SEED_MODE, "Seed variation for bulk jobs", gr.Radio, {"choices": list(sweep.SEED_MODES)}, section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_seed_stride", shared.OptionInfo(
+        1, "Seed stride for strided bulk seeds", section=section
+    ))
+    
     shared.opts.add_option("stablequeue_job_delay", shared.OptionInfo(
         5, "Delay Between Jobs (seconds)", section=section
     ))
     
+    shared.opts.add_option("stablequeue_rate_limit_mode", shared.OptionInfo(
+        ratelimit.DEFAULT_MODE, "Submission rate limit (fixed uses Delay Between Jobs, adaptive follows hub load)", gr.Radio, {"choices": list(ratelimit.MODES)}, section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_rate_limit_max", shared.OptionInfo(
+        ratelimit.DEFAULT_MAX_RATE, "Adaptive rate limit ceiling (requests per second)", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_route_swap_penalty", shared.OptionInfo(
+        routing.DEFAULT_SWAP_PENALTY, "Auto routing: seconds of queue worth avoiding a checkpoint swap", section=section
+    ))
+    
+    # Failure handling
+    shared.opts.add_option("stablequeue_retry_attempts", shared.OptionInfo(
+        resilience.DEFAULT_RETRY_ATTEMPTS, "Attempts per submission on connection errors or overload responses", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_breaker_threshold", shared.OptionInfo(
+        resilience.DEFAULT_FAILURE_THRESHOLD, "Consecutive failures before pausing submissions to an unreachable server", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_breaker_reset", shared.OptionInfo(
+        resilience.DEFAULT_RESET_TIMEOUT, "Seconds to pause before checking an unreachable server again", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_health_ttl", shared.OptionInfo(
+        resilience.DEFAULT_HEALTH_TTL, "Seconds to cache the server health check", section=section
+    ))
+    
     shared.opts.add_option("enable_stablequeue_context_menu", shared.OptionInfo(
         True, "Add StableQueue options to generation context menu", section=section
     ))
+    
+    # Connection pool settings
+    shared.opts.add_option("stablequeue_pool_size", shared.OptionInfo(
+        hub_client.DEFAULT_POOL_SIZE, "Max pooled connections per StableQueue server", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_connect_timeout", shared.OptionInfo(
+        hub_client.DEFAULT_CONNECT_TIMEOUT, "Connect timeout (seconds)", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_read_timeout", shared.OptionInfo(
+        hub_client.DEFAULT_READ_TIMEOUT, "Read timeout (seconds)", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_repeat_window", shared.OptionInfo(
+        idempotency.DEFAULT_REPEAT_WINDOW, "Ignore an identical submission repeated within this many seconds (double-clicks; 0 = off)", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_dedup_ttl", shared.OptionInfo(
+        idempotency.DEFAULT_TTL, "Seconds to remember a queued request's idempotency key and drop resends", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_max_batch_jobs", shared.OptionInfo(
+        backend.DEFAULT_MAX_BATCH_JOBS, "Max jobs accepted in one /stablequeue/queue_batch request", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_api_workers", shared.OptionInfo(
+        backend.DEFAULT_API_WORKERS, "Worker threads for blocking work requested through the extension's API routes", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_delta_bulk", shared.OptionInfo(
+        True, "Send bulk sweeps as one template plus per-job changes", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_stream_threshold", shared.OptionInfo(
+        streaming.DEFAULT_STREAM_THRESHOLD, "Stream bulk sweeps of at least this many jobs as NDJSON", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_stream_chunk_bytes", shared.OptionInfo(
+        streaming.DEFAULT_CHUNK_BYTES, "Streaming chunk size (bytes)", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_stream_max_pending", shared.OptionInfo(
+        streaming.DEFAULT_MAX_PENDING_CHUNKS, "Streaming chunks encoded ahead of the network", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_compression", shared.OptionInfo(
+        hub_client.DEFAULT_COMPRESSION, "Compress large request bodies", gr.Radio, {"choices": list(hub_client.COMPRESSION_METHODS)}, section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_compression_threshold", shared.OptionInfo(
+        hub_client.DEFAULT_COMPRESSION_THRESHOLD, "Only compress request bodies larger than (bytes)", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_blob_dedup", shared.OptionInfo(
+        True, "Upload each image once and reference it by hash in job payloads", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_blob_cache_size", shared.OptionInfo(
+        blobs.DEFAULT_CACHE_SIZE, "Uploaded image cache size (entries)", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_max_in_flight", shared.OptionInfo(
+        bulk.DEFAULT_MAX_IN_FLIGHT, "Max concurrent requests for bulk jobs", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_bulk_chunk_size", shared.OptionInfo(
+        bulk.DEFAULT_BULK_CHUNK_SIZE, "Max jobs per bulk request", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_track_jobs", shared.OptionInfo(
+        True, "Track submitted jobs and poll their status", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_status_batch_size", shared.OptionInfo(
+        tracker.DEFAULT_BATCH_SIZE, "Max jobs per status poll request", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_status_min_interval", shared.OptionInfo(
+        tracker.DEFAULT_MIN_INTERVAL, "Min status poll interval per job (seconds)", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_status_max_interval", shared.OptionInfo(
+        tracker.DEFAULT_MAX_INTERVAL, "Max status poll interval per job (seconds)", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_status_max_misses", shared.OptionInfo(
+        tracker.DEFAULT_MAX_MISSES, "Stop tracking a job the hub doesn't know after this many polls (0 = never)", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_status_max_age", shared.OptionInfo(
+        tracker.DEFAULT_MAX_AGE, "Stop tracking an unfinished job after this many seconds (0 = never)", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_download_results", shared.OptionInfo(
+        True, "Download finished images into the local outputs folder", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_download_dir", shared.OptionInfo(
+        "", "Download folder for finished images (empty = outputs/stablequeue)", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_download_concurrency", shared.OptionInfo(
+        downloads.DEFAULT_MAX_CONCURRENT, "Max concurrent image downloads", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_servers_ttl", shared.OptionInfo(
+        server_cache.DEFAULT_TTL, "Server list cache lifetime (seconds)", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_outbox_workers", shared.OptionInfo(
+        outbox.DEFAULT_WORKERS, "Background submission workers", section=section
+    ))
+    
+    # Durable outbox journal settings
+    shared.opts.add_option("stablequeue_outbox_journal", shared.OptionInfo(
+        True, "Keep pending submissions in an on-disk journal and replay them after outages", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_journal_path", shared.OptionInfo(
+        "", "Outbox journal file (empty = outbox.sqlite3 in the extension folder)", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_journal_sync", shared.OptionInfo(
+        journal.DEFAULT_SYNCHRONOUS, "Outbox journal fsync policy", gr.Radio, {"choices": list(journal.SYNCHRONOUS_MODES)}, section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_journal_batch_size", shared.OptionInfo(
+        journal.DEFAULT_BATCH_SIZE, "Max journal writes per transaction", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_journal_commit_interval", shared.OptionInfo(
+        journal.DEFAULT_COMMIT_INTERVAL, "Max wait for a journal batch to fill (seconds)", section=section
+    ))
+    
+    # Logging and tracing
+    shared.opts.add_option("stablequeue_log_level", shared.OptionInfo(
+        log.DEFAULT_LEVEL, "Console log level", gr.Radio, {"choices": list(log.LEVELS)}, section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_log_rate_limit", shared.OptionInfo(
+        log.DEFAULT_RATE_LIMIT, f"Max repeats of one log message per {log.RATE_WINDOW:g} seconds (0 = unlimited)", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_trace", shared.OptionInfo(
+        False, "Write per-submission timing traces (JSON lines)", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_trace_path", shared.OptionInfo(
+        "", "Trace file (empty = traces.jsonl in the extension folder)", section=section
+    ))
+    
+    shared.opts.add_option("stablequeue_trace_max_mb", shared.OptionInfo(
+        log.DEFAULT_TRACE_MAX_MB, "Rotate the trace file at this size (MB)", section=section
+    ))
+    
+    # Apply logging changes without a restart
+    for key in ("stablequeue_log_level", "stablequeue_log_rate_limit", "stablequeue_trace",
+                "stablequeue_trace_path", "stablequeue_trace_max_mb"):
+        shared.opts.onchange(key, lambda: get_backend().configure_logging(), call=False)
 
 # Register settings callback
 script_callbacks.on_ui_settings(register_stablequeue_settings)
@@ -727,91 +864,87 @@ def setup_javascript_api(demo=None, app=None):
     """Setup API endpoints using Forge's API system"""
     global api_setup_completed
     
-    print(f"[StableQueue] setup_javascript_api called with demo={demo}, app={app}")
+    log.debug("setup_javascript_api called with demo=%s, app=%s", demo, app)
     
     if api_setup_completed:
-        print(f"[StableQueue] API already set up, skipping...")
+        log.debug("API already set up, skipping...")
         return
         
-    print(f"[StableQueue] Setting up JavaScript API endpoints...")
+    log.debug("Setting up JavaScript API endpoints...")
     
     try:
         # Try to use modules.api if available (newer Forge versions)
         try:
             from modules import api
-            print(f"[StableQueue] Found modules.api, attempting to register endpoint...")
+            log.debug("Found modules.api, attempting to register endpoint...")
             
             # Register our endpoint with the API
             def queue_job_endpoint():
                 from flask import request, jsonify
                 try:
-                    print(f"[StableQueue] queue_job_endpoint called via modules.api")
+                    log.debug("queue_job_endpoint called via modules.api")
                     
                     data = request.get_json()
                     api_payload_json = json.dumps(data.get('api_payload', {}))
                     server_alias = data.get('server_alias', '')
                     job_type = data.get('job_type', 'single')
                     
-                    print(f"[StableQueue] Processing job: server={server_alias}, type={job_type}")
+                    log.debug("Processing job: server=%s, type=%s", server_alias, job_type)
                     
-                    result = stablequeue_instance.queue_job_from_javascript(api_payload, server_alias, job_type)
+                    result = get_backend().queue_job_from_javascript(api_payload, server_alias, job_type)
                     
-                    print(f"[StableQueue] Job result: {result}")
+                    log.debug("Job result: %s", result)
                     
                     return jsonify(result)
                     
                 except Exception as e:
-                    print(f"[StableQueue] Error in queue_job_endpoint: {e}")
+                    log.error("Error in queue_job_endpoint: %s", e)
                     return jsonify({"success": False, "message": f"API Error: {str(e)}"}), 500
             
             # Try to register the endpoint
             if hasattr(api, 'app') and hasattr(api.app, 'route'):
                 api.app.route('/stablequeue/queue_job', methods=['POST'])(queue_job_endpoint)
-                print(f"[StableQueue] Successfully registered endpoint via modules.api")
+                log.info("Successfully registered endpoint via modules.api")
                 api_setup_completed = True
                 return
                 
         except ImportError:
-            print(f"[StableQueue] modules.api not available, trying FastAPI approach...")
+            log.debug("modules.api not available, trying FastAPI approach...")
         
         # Fallback to FastAPI approach
         from modules import shared
         import json
         
-        print(f"[StableQueue] Checking for FastAPI app...")
+        log.debug("Checking for FastAPI app...")
         
         # First check if we got the app passed as parameter
         if app is not None:
-            print(f"[StableQueue] Using FastAPI app passed as parameter: {type(app)}")
+            log.debug("Using FastAPI app passed as parameter: %s", type(app))
         else:
             # Try multiple ways to get the FastAPI app
-            print(f"[StableQueue] No app parameter, searching for FastAPI app...")
+            log.debug("No app parameter, searching for FastAPI app...")
             
             # Method 1: Check shared.demo.app
             if hasattr(shared, 'demo') and hasattr(shared.demo, 'app'):
                 app = shared.demo.app
-                print(f"[StableQueue] Found FastAPI app via shared.demo.app")
+                log.debug("Found FastAPI app via shared.demo.app")
             
             # Method 2: Check if there's a direct app reference
             elif hasattr(shared, 'app'):
                 app = shared.app
-                print(f"[StableQueue] Found FastAPI app via shared.app")
+                log.debug("Found FastAPI app via shared.app")
             
             # Method 3: Try to get from gradio app
             elif hasattr(shared, 'demo') and hasattr(shared.demo, 'fastapi_app'):
                 app = shared.demo.fastapi_app
-                print(f"[StableQueue] Found FastAPI app via shared.demo.fastapi_app")
+                log.debug("Found FastAPI app via shared.demo.fastapi_app")
         
         if app is None:
-            print(f"[StableQueue] Could not find FastAPI app. Available shared attributes:")
-            if hasattr(shared, 'demo'):
-                print(f"[StableQueue] shared.demo attributes: {dir(shared.demo)}")
-            else:
-                print(f"[StableQueue] shared attributes: {dir(shared)}")
+            log.warning("Could not find FastAPI app, retrying in 5 seconds")
             
             # Try one more time after a delay
             def retry_setup():
-                print(f"[StableQueue] Retrying API setup after delay...")
+                log.debug("Retrying API setup after delay...")
                 setup_javascript_api()
             
             # Schedule retry in 5 seconds
@@ -820,14 +953,14 @@ def setup_javascript_api(demo=None, app=None):
             timer.start()
             return
         
-        print(f"[StableQueue] FastAPI app found: {type(app)}")
+        log.debug("FastAPI app found: %s", type(app))
         
         # Import FastAPI components
         try:
             from fastapi import Request
-            from fastapi.responses import JSONResponse
+            from fastapi.responses import JSONResponse, PlainTextResponse
         except ImportError:
-            print(f"[StableQueue] FastAPI not available")
+            log.error("FastAPI not available")
             return
         
         # TODO: Phase 1 - REMOVED /stablequeue/trigger_queue endpoint
@@ -837,7 +970,7 @@ def setup_javascript_api(demo=None, app=None):
         @app.post("/stablequeue/context_menu_queue")
         async def context_menu_queue_api(request: Request):
             try:
-                print(f"[StableQueue] /stablequeue/context_menu_queue endpoint called")
+                log.debug("/stablequeue/context_menu_queue endpoint called")
                 
                 # Get request data
                 data = await request.json()
@@ -845,42 +978,65 @@ def setup_javascript_api(demo=None, app=None):
                 server_alias = data.get('server_alias', '')
                 job_type = data.get('job_type', 'single')
                 
-                print(f"[StableQueue] Context menu queue: type={job_type}, server={server_alias}")
+                log.debug("Context menu queue: type=%s, server=%s", job_type, server_alias)
                 
-                # Process context menu data directly
-                result = stablequeue_instance.queue_job_from_javascript(context_data, server_alias, job_type)
+                # Submitted without blocking the event loop (httpx, or a worker thread)
+                result = await get_backend().queue_job_from_javascript_async(context_data, server_alias, job_type)
                 
-                print(f"[StableQueue] Context menu result: {result}")
+                log.debug("Context menu result: %s", result)
                 
                 return JSONResponse(content=result)
                 
             except Exception as e:
-                print(f"[StableQueue] Error in context_menu_queue_api: {e}")
+                log.error("Error in context_menu_queue_api: %s", e)
+                return JSONResponse(
+                    content={"success": False, "message": f"API Error: {str(e)}"}, 
+                    status_code=500
+                )
+        
+        @app.post("/stablequeue/queue_batch")
+        async def queue_batch_api(request: Request):
+            """Queue many jobs in one request: a list of jobs, or a template plus variations"""
+            try:
+                jobs = backend.expand_batch(await request.json())
+                max_jobs = int(shared.opts.data.get("stablequeue_max_batch_jobs", backend.DEFAULT_MAX_BATCH_JOBS))
+                if len(jobs) > max_jobs:
+                    return JSONResponse(
+                        content={"success": False, "message": f"Batch of {len(jobs)} jobs exceeds the limit of {max_jobs}"},
+                        status_code=413
+                    )
+                
+                log.debug("Batch queue: %d job(s)", len(jobs))
+                
+                stablequeue = get_backend()
+                return JSONResponse(content=await stablequeue.run_blocking(stablequeue.queue_batch_from_javascript, jobs))
+                
+            except Exception as e:
+                log.error("Error in queue_batch_api: %s", e)
                 return JSONResponse(
                     content={"success": False, "message": f"API Error: {str(e)}"}, 
                     status_code=500
                 )
         
-        print(f"[StableQueue] Successfully registered /stablequeue/queue_job endpoint")
+        @app.get("/stablequeue/metrics")
+        def metrics_api():
+            # Plain def: FastAPI runs it in its threadpool, off the event loop
+            return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+        
+        log.info("Registered /stablequeue API endpoints")
         api_setup_completed = True
                     
     except Exception as e:
-        print(f"[StableQueue] Could not setup JavaScript API: {e}")
-        import traceback
-        print(f"[StableQueue] Full error trace: {traceback.format_exc()}")
-
-# Register the setup function with multiple callbacks to ensure it runs
-print(f"[StableQueue] Registering API setup callbacks...")
-script_callbacks.on_app_started(setup_javascript_api) 
-
-# Remove on_ui_started as it doesn't exist in this Forge version
-# def setup_api_on_ui_start():
-#     """Alternative setup method when UI starts"""
-#     print(f"[StableQueue] Attempting API setup on UI start...")
-#     setup_javascript_api()
-# 
-# script_callbacks.on_ui_started(setup_api_on_ui_start)
-
-# Also try immediate setup
-print(f"[StableQueue] Attempting immediate API setup...")
-setup_javascript_api() 
\ No newline at end of file
+        log.error("Could not setup JavaScript API: %s", e, exc_info=True)
+
+# Register the setup function; Forge passes the FastAPI app once it has started
+script_callbacks.on_app_started(setup_javascript_api)
+
+def resume_outbox(demo=None, app=None):
+    """Replay submissions journaled by a previous run as soon as Forge is up"""
+    try:
+        get_backend().resume_outbox()
+    except Exception as e:
+        log.error("Could not resume outbox: %s", e)
+
+script_callbacks.on_app_started(resume_outbox)
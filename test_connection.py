@@ -1,18 +1,35 @@
 #!/usr/bin/env python3
 """
-Test script to verify StableQueue extension connectivity
+Connectivity check and load generator for a StableQueue hub
+
+    python test_connection.py [--url URL] [check]
+    python test_connection.py --url http://127.0.0.1:8083 load --concurrency 16 --total 2000 \
+        --profile text --profile init_image --duration 60 --json load.json
+
+Credentials come from STABLEQUEUE_API_KEY / STABLEQUEUE_API_SECRET. The load
+test works against any hub; --fake-hub runs it against a local
+benchmarks/fake_hub.py instead.
 """
 
-import requests
+import argparse
+import base64
+import itertools
 import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
 
 # Configuration
-STABLEQUEUE_URL = "http://192.168.73.124:8083"
-import os
+STABLEQUEUE_URL = os.getenv("STABLEQUEUE_URL", "http://192.168.73.124:8083")
 
 API_KEY = os.getenv("STABLEQUEUE_API_KEY", "")
 API_SECRET = os.getenv("STABLEQUEUE_API_SECRET", "")
 
+PROFILES = ("text", "init_image", "controlnet")
+
 def test_server_status():
     """Test basic server connectivity"""
     print("Testing server status...")
@@ -164,7 +181,122 @@ def test_job_submission():
         print(f"❌ Job submission test failed: {e}")
         return False
 
-def main():
+def job_payload(profile, target_server, image_kb=512):
+    """Build a /api/v2/generate payload for one load profile"""
+    payload = {
+        "app_type": "forge",
+        "target_server_alias": target_server,
+        "generation_params": {
+            "positive_prompt": "load test prompt from extension",
+            "negative_prompt": "bad quality",
+            "width": 512,
+            "height": 512,
+            "steps": 5,
+            "cfg_scale": 7,
+            "sampler_name": "Euler",
+            "seed": -1
+        },
+        "source_info": "stablequeue_forge_extension_loadtest"
+    }
+    if profile == "text":
+        return payload
+
+    # Random bytes don't compress, like real PNGs
+    image = base64.b64encode(os.urandom(image_kb * 1024)).decode("ascii")
+    if profile == "init_image":
+        payload["generation_params"]["init_images"] = [image]
+        payload["generation_params"]["denoising_strength"] = 0.6
+    elif profile == "controlnet":
+        payload["generation_params"]["alwayson_scripts"] = {
+            "controlnet": {"args": [{
+                "enabled": True,
+                "module": "canny",
+                "model": "control_v11p_sd15_canny",
+                "image": image,
+                "weight": 1.0,
+            }]}
+        }
+    return payload
+
+
+def percentile(ordered, point):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * point / 100))]
+
+
+def run_load(url, concurrency, total, profiles, duration, target_server, image_kb=512, timeout=30):
+    """Send up to total jobs (or until duration seconds pass) with concurrency workers
+
+    Returns throughput, latency percentiles (ms) and a count per outcome:
+    the HTTP status code, or the exception name for failed requests.
+    """
+    headers = {"Content-Type": "application/json", "X-API-Key": API_KEY, "X-API-Secret": API_SECRET}
+    # Bodies are encoded once so the client's JSON cost isn't measured
+    bodies = [json.dumps(job_payload(profile, target_server, image_kb)).encode("utf-8") for profile in profiles]
+
+    sequence = itertools.count()
+    lock = threading.Lock()
+    latencies = []
+    outcomes = {}
+    sent_bytes = [0]
+    deadline = time.monotonic() + duration if duration else None
+
+    def worker():
+        session = requests.Session()
+        for i in sequence:
+            if (total and i >= total) or (deadline and time.monotonic() >= deadline):
+                break
+            body = bodies[i % len(bodies)]
+            start = time.perf_counter()
+            try:
+                response = session.post(f"{url}/api/v2/generate", data=body, headers=headers, timeout=timeout)
+                outcome = str(response.status_code)
+            except requests.exceptions.RequestException as e:
+                outcome = type(e).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+                sent_bytes[0] += len(body)
+        session.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    elapsed = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+    succeeded = sum(count for outcome, count in outcomes.items() if outcome in ("200", "201", "202"))
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "profiles": list(profiles),
+        "requests": len(latencies),
+        "succeeded": succeeded,
+        "seconds": elapsed,
+        "requests_per_s": len(latencies) / elapsed if elapsed else None,
+        "jobs_per_s": succeeded / elapsed if elapsed else None,
+        "mb_sent": sent_bytes[0] / 1e6,
+        "latency_ms": {f"p{point}": (percentile(ordered, point) or 0) * 1000 for point in (50, 95, 99)},
+        "outcomes": dict(sorted(outcomes.items())),
+    }
+
+
+def print_load_report(results):
+    latency = results["latency_ms"]
+    print(f"Requests:   {results['requests']} in {results['seconds']:.2f}s "
+          f"({results['requests_per_s']:.1f} req/s, {results['mb_sent']:.1f} MB sent)")
+    print(f"Succeeded:  {results['succeeded']} ({results['jobs_per_s']:.1f} jobs/s)")
+    print(f"Latency:    p50 {latency['p50']:.1f} ms   p95 {latency['p95']:.1f} ms   p99 {latency['p99']:.1f} ms")
+    print("Outcomes:")
+    for outcome, count in results["outcomes"].items():
+        print(f"   {outcome:<20} {count}")
+
+
+def run_checks():
     print("StableQueue Extension Connection Test")
     print("=" * 40)
     print(f"Server URL: {STABLEQUEUE_URL}")
@@ -202,5 +334,56 @@ def main():
     else:
         print("\n❌ Some tests failed. Please check the issues above.")
 
+def main():
+    global STABLEQUEUE_URL
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=STABLEQUEUE_URL, help="hub URL (default: $STABLEQUEUE_URL or %(default)s)")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("check", help="check connectivity, authentication and job submission (default)")
+    load = commands.add_parser("load", help="submit many jobs concurrently and report latency and throughput")
+    load.add_argument("--concurrency", type=int, default=8, help="parallel connections")
+    load.add_argument("--total", type=int, default=500, help="jobs to send (0 = until --duration)")
+    load.add_argument("--duration", type=float, default=0, help="stop after this many seconds (0 = until --total)")
+    load.add_argument("--profile", action="append", choices=PROFILES,
+                      help="payload profile; repeat to mix profiles round-robin (default: text)")
+    load.add_argument("--image-kb", type=int, default=512, help="size of generated init/ControlNet images")
+    load.add_argument("--server", default="", help="target server alias (default: first from /api/v1/servers)")
+    load.add_argument("--timeout", type=float, default=30, help="per-request timeout (seconds)")
+    load.add_argument("--fake-hub", action="store_true", help="ignore --url and load a local benchmarks/fake_hub.py instance")
+    load.add_argument("--json", help="write machine-readable results to this file")
+    args = parser.parse_args()
+    STABLEQUEUE_URL = args.url.rstrip("/")
+
+    if args.command != "load":
+        run_checks()
+        return
+
+    if not args.total and not args.duration:
+        parser.error("load needs --total or --duration")
+
+    if args.fake_hub:
+        from benchmarks.fake_hub import FakeHub
+        STABLEQUEUE_URL = FakeHub().start().url
+
+    target_server = args.server
+    if not target_server:
+        try:
+            servers = requests.get(f"{STABLEQUEUE_URL}/api/v1/servers",
+                                   headers={"X-API-Key": API_KEY, "X-API-Secret": API_SECRET}, timeout=5).json()
+            target_server = servers[0]["alias"]
+        except Exception as e:
+            parser.error(f"could not pick a target server ({e}); pass --server")
+
+    print(f"Load test against {STABLEQUEUE_URL} (server {target_server}), {args.concurrency} connection(s)")
+    results = run_load(STABLEQUEUE_URL, args.concurrency, args.total, args.profile or ["text"], args.duration,
+                       target_server, image_kb=args.image_kb, timeout=args.timeout)
+    print_load_report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
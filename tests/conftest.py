@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import lib_stablequeue and benchmarks from the extension folder, like Forge does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
@@ -0,0 +1,65 @@
+import base64
+import os
+
+from lib_stablequeue import blobs
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = ""
+
+
+class FailingHub:
+    """Hub client whose blob store answers every request with 500"""
+
+    server_url = "http://hub"
+    timeout = (1, 1)
+
+    def __init__(self):
+        self.capabilities = {}
+        self.requests = 0
+        self.session = self
+
+    def url(self, path):
+        return self.server_url + path
+
+    def head(self, url, timeout=None):
+        self.requests += 1
+        return Response(500)
+
+    def post(self, path, **kwargs):
+        self.requests += 1
+        return Response(500)
+
+
+def image():
+    return base64.b64encode(os.urandom(blobs.MIN_BLOB_SIZE)).decode("ascii")
+
+
+def test_failed_uploads_back_off_and_release_their_lock():
+    hub = FailingHub()
+    store = blobs.BlobStore(lambda: hub)
+    payload = {"init_images": [image()]}
+
+    assert store.rewrite(payload) is payload
+    assert store.upload_locks == {}
+    requests = hub.requests
+
+    # Within the backoff, payloads go inline without touching the hub
+    for _ in range(5):
+        rewritten = store.rewrite({"init_images": [image()]})
+        assert not rewritten["init_images"][0].startswith(blobs.BLOB_PREFIX)
+    assert hub.requests == requests
+
+
+def test_digest_cache_is_keyed_on_the_image_object():
+    store = blobs.BlobStore(lambda: None)
+    first, second = image(), image()
+
+    assert store.digest(first) == store.digest(first)
+    assert store.digest(second) != store.digest(first)
+    # An equal but distinct string is hashed again rather than trusted by hash()
+    copy = "".join(list(first))
+    assert copy is not first and store.digest(copy) == store.digest(first)
+    assert store.stats["hashed"] == 3
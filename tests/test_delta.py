@@ -0,0 +1,19 @@
+from lib_stablequeue import delta
+from lib_stablequeue.backend import Backend
+
+
+def build_payload(params):
+    return Backend(lambda key, default: default, "http://127.0.0.1", ".").build_payload(params)
+
+
+def test_mixed_batch_round_trip():
+    img2img = build_payload({"prompt": "a cat", "target_server_alias": "gpu-1", "init_images": ["aW1hZ2U="],
+                             "alwayson_scripts": {"controlnet": {"args": [{"enabled": True}]}}})
+    txt2img = build_payload({"prompt": "a dog", "target_server_alias": "gpu-1", "steps": 30})
+    payloads = [img2img, txt2img, img2img]
+
+    decoded = delta.decode(delta.encode(payloads))
+
+    assert decoded == [{**delta.HUB_DEFAULTS, **payload["generation_params"]} for payload in payloads]
+    assert "init_images" not in decoded[1]
+    assert "alwayson_scripts" not in decoded[1]
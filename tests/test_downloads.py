@@ -0,0 +1,68 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.fake_hub import FakeHub
+from lib_stablequeue import downloads, hub_client
+
+IMAGE = b"\x89PNG fake image bytes"
+
+
+class CDN:
+    """Image host on another port than the hub, recording the headers it receives"""
+
+    def __init__(self):
+        cdn = self
+        self.headers = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                cdn.headers.append(dict(self.headers))
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(IMAGE)))
+                self.end_headers()
+                self.wfile.write(IMAGE)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = "http://127.0.0.1:%d" % self.server.server_address[1]
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_images_elsewhere_are_fetched_without_hub_credentials(tmp_path):
+    cdn = CDN()
+    try:
+        with FakeHub() as hub:
+            client = hub_client.get_client(hub.url, "key", "secret")
+            downloader = downloads.ResultDownloader(lambda: client, str(tmp_path))
+
+            path = downloader.enqueue("job-1", f"{cdn.url}/images/cat.png?sig=abc").result()
+
+            assert open(path, "rb").read() == IMAGE
+            assert not any("X-API-Key" in headers or "X-API-Secret" in headers for headers in cdn.headers)
+            assert downloads.is_hub_url(client, f"{hub.url}/outputs/cat.png")
+            assert not downloads.is_hub_url(client, f"{cdn.url}/outputs/cat.png")
+    finally:
+        cdn.stop()
+
+
+def test_job_ids_cannot_escape_the_output_folder(tmp_path):
+    cdn = CDN()
+    try:
+        with FakeHub() as hub:
+            client = hub_client.get_client(hub.url, "key", "secret")
+            output_dir = tmp_path / "outputs"
+            downloader = downloads.ResultDownloader(lambda: client, str(output_dir))
+
+            path = downloader.enqueue("../../evil", f"{cdn.url}/cat.png").result()
+
+            assert os.path.dirname(path) == str(output_dir)
+            assert os.listdir(tmp_path) == ["outputs"]
+    finally:
+        cdn.stop()
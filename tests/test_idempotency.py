@@ -0,0 +1,95 @@
+import threading
+import time
+
+from benchmarks.bench_sweep import BASE_PARAMS
+from benchmarks.fake_hub import FakeHub
+from lib_stablequeue import backend, idempotency
+
+
+def wait_for(condition, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_claim_done_and_release():
+    cache = idempotency.DedupCache(ttl=60)
+    assert cache.claim("a")
+    assert cache.state("a") == idempotency.IN_FLIGHT
+    assert not cache.claim("a")
+
+    cache.done("a")
+    assert cache.state("a") == idempotency.DONE
+    assert not cache.claim("a")
+
+    assert cache.claim("b")
+    cache.release("b")
+    assert cache.state("b") is None
+    assert cache.claim("b")
+
+
+def test_claims_expire_after_ttl():
+    cache = idempotency.DedupCache(ttl=0.05)
+    assert cache.claim("a")
+    cache.done("a")
+    time.sleep(0.1)
+    assert cache.state("a") is None
+    assert cache.claim("a")
+
+
+def test_oldest_claims_are_evicted_beyond_size():
+    cache = idempotency.DedupCache(ttl=60, size=2)
+    for key in "abc":
+        assert cache.claim(key)
+    assert len(cache) == 2
+    assert cache.claim("a")
+
+
+def test_key_depends_on_payload_and_nonce_only():
+    payload = {"prompt": "a cat", "seed": 1}
+    assert idempotency.make_key(payload, "n") == idempotency.make_key({"seed": 1, "prompt": "a cat"}, "n")
+    assert idempotency.make_key(payload, "n") != idempotency.make_key(payload, "m")
+    assert idempotency.make_key(payload, "n", 0) != idempotency.make_key(payload, "n", 1)
+    assert idempotency.make_key(payload, None) is None
+
+
+def test_retry_while_the_original_is_in_flight_is_not_reported_queued(tmp_path):
+    settings = {
+        "stablequeue_api_key": "key",
+        "stablequeue_api_secret": "secret",
+        "stablequeue_job_delay": 0,
+        "stablequeue_track_jobs": False,
+        "stablequeue_retry_attempts": 1,
+        "stablequeue_log_level": "ERROR",
+    }
+    with FakeHub(latency=0.5, error_rate=1.0) as hub:
+        settings["stablequeue_url"] = hub.url
+        stablequeue = backend.Backend(settings.get, hub.url, str(tmp_path))
+        params = dict(BASE_PARAMS, target_server_alias="gpu-1", idempotency_nonce="click-1")
+
+        original = {}
+        thread = threading.Thread(target=lambda: original.update(stablequeue.queue_job_from_javascript(params, "gpu-1")))
+        thread.start()
+        assert wait_for(lambda: len(stablequeue.dedup_cache) == 1)
+
+        # The retried fetch arrives while the original waits on the hub
+        retry = stablequeue.queue_job_from_javascript(params, "gpu-1")
+        assert not retry["success"] and retry["pending"]
+
+        thread.join()
+        assert not original["success"]
+
+        # The original failed and released its key, so the next retry is sent
+        hub.latency = 0.0
+        hub.error_rate = 0.0
+        retry = stablequeue.queue_job_from_javascript(params, "gpu-1")
+        assert retry["success"]
+        assert hub.stats["jobs"] == 1
+
+        # Once accepted, a repeat is a duplicate and counts as queued without being sent
+        retry = stablequeue.queue_job_from_javascript(params, "gpu-1")
+        assert retry["success"]
+        assert hub.stats["jobs"] == 1 and hub.stats["requests"] == 2
@@ -0,0 +1,46 @@
+import sys
+import types
+
+import pytest
+
+from benchmarks import forge_stubs
+from benchmarks.fake_hub import FakeHub
+
+
+class Processing:
+    """Bare StableDiffusionProcessing: any attribute not set is None"""
+
+    def __getattr__(self, name):
+        return None
+
+
+@pytest.mark.parametrize("tab", ["modules.processing", "modules.img2img"])
+def test_armed_generate_never_reaches_local_process_images(tab):
+    with FakeHub() as hub:
+        forge_stubs.install({
+            "stablequeue_url": hub.url,
+            "stablequeue_api_key": "key",
+            "stablequeue_api_secret": "secret",
+            "stablequeue_outbox_journal": False,
+            "stablequeue_log_level": "ERROR",
+        }, stub_gradio=True)
+        module = forge_stubs.load_extension()
+        processing = sys.modules["modules.processing"]
+
+        script = module.StableQueueScript()
+        token = module.interceptor.arm(kind="single", server_alias="gpu-1")
+        p = Processing()
+        p.prompt = "a cat"
+        p.scripts = types.SimpleNamespace(alwayson_scripts=[script])
+        p.script_args = [token]
+
+        processed = sys.modules[tab].process_images(p)
+
+        assert isinstance(processed, processing.Processed)
+        assert processing.local_generations == []
+        assert module.interceptor.pending == {}
+
+        # Unarmed generations still run locally
+        p.script_args = [""]
+        sys.modules[tab].process_images(p)
+        assert processing.local_generations == [p]
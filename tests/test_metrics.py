@@ -0,0 +1,19 @@
+from lib_stablequeue import bulk, metrics
+
+
+def test_shards_stay_bounded_across_bulk_runs():
+    registry = metrics.Registry()
+
+    def submit(job):
+        registry.inc("jobs_total")
+        registry.observe("job_seconds", 0.01)
+        return True
+
+    for _ in range(50):
+        bulk.submit_concurrently(submit, range(20), max_in_flight=4)
+
+    counters, histograms = registry.collect()
+    assert counters[("jobs_total", ())] == 50 * 20
+    assert sum(histograms[("job_seconds", ())][1]) == 50 * 20
+    # Every bulk run's executor threads have exited, so their shards were folded away
+    assert len(registry._shards) <= 1
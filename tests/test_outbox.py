@@ -0,0 +1,150 @@
+import time
+
+import requests
+
+from benchmarks.bench_sweep import BASE_PARAMS
+from benchmarks.fake_hub import FakeHub
+from lib_stablequeue import backend, journal, outbox
+
+
+def wait_for(condition, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_journaled_jobs_replay_when_hub_returns(tmp_path):
+    hub = FakeHub().start()
+    port = hub.server.server_address[1]
+    url = hub.url
+    hub.stop()
+
+    settings = {
+        "stablequeue_url": url,
+        "stablequeue_api_key": "key",
+        "stablequeue_api_secret": "secret",
+        "stablequeue_job_delay": 0,
+        "stablequeue_track_jobs": False,
+        "stablequeue_health_ttl": 0,
+        "stablequeue_breaker_reset": 0.1,
+        "stablequeue_log_level": "ERROR",
+    }
+    stablequeue = backend.Backend(settings.get, url, str(tmp_path))
+    box = stablequeue.outbox
+    box.replay_interval = 0.1
+
+    params = dict(BASE_PARAMS, target_server_alias="gpu-1")
+    handles = [box.enqueue("single", "gpu-1", {"params": dict(params, seed=seed), "server_url": url})
+               for seed in range(5)]
+    assert wait_for(lambda: all(box.status(h)["status"] == outbox.WAITING for h in handles))
+
+    hub = FakeHub(port=port).start()
+    try:
+        assert wait_for(lambda: all(box.status(h)["status"] == outbox.QUEUED for h in handles))
+        assert hub.stats["jobs"] == len(handles)
+    finally:
+        hub.stop()
+    assert box.journal.load_pending() == []
+
+
+def test_parked_jobs_replay_in_submission_order():
+    down = True
+    submitted = []
+
+    def submit(entry):
+        if down:
+            return False, "connection refused"
+        # Uneven latencies: two workers sharing the replay would finish out of order
+        time.sleep(0.02 if entry.job["n"] % 2 == 0 else 0.001)
+        submitted.append(entry.job["n"])
+        return True, "queued"
+
+    box = outbox.Outbox(submit, workers=2, probe_fn=lambda: not down, replay_interval=0.05)
+    handles = [box.enqueue("single", "gpu-1", {"n": n}) for n in range(10)]
+    assert wait_for(lambda: all(box.status(h)["status"] == outbox.WAITING for h in handles))
+
+    down = False
+    # Enqueued while the replay drains, so it must wait behind the parked entries
+    handles += [box.enqueue("single", "gpu-1", {"n": n}) for n in range(10, 15)]
+    assert wait_for(lambda: all(box.status(h)["status"] == outbox.QUEUED for h in handles))
+    assert submitted[:10] == list(range(10))
+    assert sorted(submitted) == list(range(15))
+
+
+def test_recovered_jobs_replay_in_journal_order(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    previous = journal.Journal(path)
+    for n in range(20):
+        previous.put(f"h{n}", "single", "gpu-1", {"n": n}, time.time())
+    previous.flush()
+
+    submitted = []
+
+    def submit(entry):
+        time.sleep(0.02 if entry.job["n"] % 2 == 0 else 0.001)
+        submitted.append(entry.job["n"])
+        return True, "queued"
+
+    box = outbox.Outbox(submit, workers=2, journal=journal.Journal(path))
+    assert wait_for(lambda: len(submitted) == 20)
+    assert submitted == list(range(20))
+    assert wait_for(lambda: box.journal.load_pending() == [])
+
+
+def test_bulk_job_resumes_where_the_hub_went_away(tmp_path):
+    settings = {
+        "stablequeue_api_key": "key",
+        "stablequeue_api_secret": "secret",
+        "stablequeue_job_delay": 0,
+        "stablequeue_track_jobs": False,
+        "stablequeue_bulk_chunk_size": 10,
+        "stablequeue_retry_attempts": 1,
+        "stablequeue_log_level": "ERROR",
+    }
+    with FakeHub() as hub:
+        stablequeue = backend.Backend(settings.get, hub.url, str(tmp_path))
+        post_job = stablequeue.post_job
+        sent = []
+
+        def dropping_post_job(client, path, payload, *args, **kwargs):
+            # The hub answers two chunks, then the connection drops; post_job's
+            # inner call (after claiming the key) goes straight through
+            if kwargs.get("idempotency_key") is None:
+                return post_job(client, path, payload, *args, **kwargs)
+            if len(sent) == 2:
+                raise requests.exceptions.ConnectionError("connection reset")
+            sent.append(path)
+            return post_job(client, path, payload, *args, **kwargs)
+
+        stablequeue.post_job = dropping_post_job
+        params = dict(BASE_PARAMS, target_server_alias="gpu-1", seed=1000, idempotency_nonce="n")
+        entry = outbox.OutboxEntry("bulk", "gpu-1", {"params": params, "bulk_quantity": 50, "server_url": hub.url})
+
+        success, message = stablequeue.submit_outbox_entry(entry)
+        assert not success
+        assert entry.job["offset"] == 20 and entry.job["queued"] == 20
+
+        stablequeue.post_job = post_job
+        success, message = stablequeue.submit_outbox_entry(entry)
+        assert success and message.startswith("50/50")
+        assert hub.stats["jobs"] == 50 and hub.stats["requests"] == 5
+
+
+def test_parked_entry_progress_is_journaled(tmp_path):
+    def submit(entry):
+        entry.job["offset"] = 20
+        return False, "hub went away"
+
+    box = outbox.Outbox(submit, journal=journal.Journal(str(tmp_path / "outbox.sqlite3")),
+                        probe_fn=lambda: False, replay_interval=60)
+    first = box.enqueue("bulk", "gpu-1", {"n": 1})
+    assert wait_for(lambda: box.status(first)["status"] == outbox.WAITING)
+    second = box.enqueue("bulk", "gpu-1", {"n": 2})
+
+    rows = box.journal.load_pending()
+    assert [row["handle"] for row in rows] == [first, second]
+    # Rewritten in place: the first entry keeps its place ahead of the one parked behind it
+    assert [row["job"] for row in rows] == [{"n": 1, "offset": 20}, {"n": 2}]
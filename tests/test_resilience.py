@@ -0,0 +1,107 @@
+import time
+
+from lib_stablequeue import ratelimit, resilience
+
+
+def test_fixed_rate_spaces_requests_by_the_job_delay():
+    limiter = ratelimit.RateLimiter("fixed", job_delay=0.5)
+    assert limiter.reserve() == 0.0
+    # Each caller reserves its own slot in line
+    assert 0.45 < limiter.reserve() <= 0.5
+    assert 0.95 < limiter.reserve() <= 1.0
+
+
+def test_no_delay_or_off_disables_limiting():
+    assert not ratelimit.RateLimiter("fixed", job_delay=0).enabled
+    limiter = ratelimit.RateLimiter("off")
+    assert [limiter.reserve() for _ in range(100)] == [0.0] * 100
+
+
+def test_adaptive_rate_halves_on_overload_and_recovers():
+    limiter = ratelimit.RateLimiter("adaptive", max_rate=10)
+    limiter.observe(429, 0.01)
+    assert limiter.rate == 5
+    # One burst of rejections backs off once per request interval
+    limiter.observe(503, 0.01)
+    assert limiter.rate == 5
+
+    # Additive increase: about one request per second per step of the rate
+    for _ in range(30):
+        limiter.observe(202, 0.01)
+    assert 5 < limiter.rate < 10
+    for _ in range(100):
+        limiter.observe(202, 0.01)
+    assert limiter.rate == 10
+
+
+def test_retry_after_pauses_every_mode():
+    for mode in ("fixed", "adaptive"):
+        limiter = ratelimit.RateLimiter(mode, job_delay=0.01)
+        limiter.observe(429, 0.01, retry_after="2")
+        assert 1.9 < limiter.reserve() <= 2.0
+
+
+def test_parse_retry_after():
+    assert ratelimit.parse_retry_after("3") == 3.0
+    assert ratelimit.parse_retry_after("Thu, 01 Jan 1970 00:00:10 GMT", now=4) == 6.0
+    assert ratelimit.parse_retry_after("soon") == 0.0
+    assert ratelimit.parse_retry_after(None) == 0.0
+
+
+def test_breaker_opens_after_threshold_and_half_opens_after_reset():
+    breaker = resilience.CircuitBreaker(failure_threshold=3, reset_timeout=0.05)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == resilience.CLOSED and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == resilience.OPEN and not breaker.allow()
+
+    time.sleep(0.1)
+    assert breaker.allow() and breaker.state == resilience.HALF_OPEN
+    # The first failure while half-open reopens the circuit
+    breaker.record_failure()
+    assert breaker.state == resilience.OPEN and not breaker.allow()
+
+    time.sleep(0.1)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == resilience.CLOSED and breaker.failures == 0
+
+
+def test_breaker_stays_open_until_the_health_check_passes():
+    healthy = False
+    probes = []
+
+    def probe():
+        probes.append(healthy)
+        return healthy
+
+    breaker = resilience.CircuitBreaker(reset_timeout=0.05, health_check=resilience.HealthCheck(probe, ttl=60))
+    breaker.trip()
+    assert not breaker.allow() and probes == []
+
+    time.sleep(0.1)
+    assert not breaker.allow() and probes == [False]
+    # A failed probe restarts the reset timeout
+    assert not breaker.allow() and probes == [False]
+
+    healthy = True
+    breaker.health_check.invalidate()
+    time.sleep(0.1)
+    assert breaker.allow() and probes == [False, True]
+
+
+def test_health_check_caches_and_treats_errors_as_down():
+    calls = []
+
+    def probe():
+        calls.append(1)
+        raise OSError("refused")
+
+    check = resilience.HealthCheck(probe, ttl=60)
+    assert check() is False and check() is False
+    assert len(calls) == 1
+    check.invalidate()
+    check()
+    assert len(calls) == 2
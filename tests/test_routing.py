@@ -0,0 +1,20 @@
+from benchmarks.bench_sweep import BASE_PARAMS
+from benchmarks.fake_hub import FakeHub
+from lib_stablequeue import backend, routing
+
+
+def test_auto_job_on_a_fresh_backend_waits_for_the_server_list(tmp_path):
+    settings = {
+        "stablequeue_api_key": "key",
+        "stablequeue_api_secret": "secret",
+        "stablequeue_job_delay": 0,
+        "stablequeue_track_jobs": False,
+        "stablequeue_log_level": "ERROR",
+    }
+    with FakeHub() as hub:
+        settings["stablequeue_url"] = hub.url
+        stablequeue = backend.Backend(settings.get, hub.url, str(tmp_path))
+        params = dict(BASE_PARAMS, target_server_alias=routing.AUTO_ALIAS)
+
+        assert stablequeue.submit_to_stablequeue(params, hub.url, "key", "secret")
+        assert hub.stats["jobs"] == 1
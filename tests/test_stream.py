@@ -0,0 +1,46 @@
+from benchmarks.bench_sweep import BASE_PARAMS
+from benchmarks.fake_hub import FakeHub
+from lib_stablequeue import backend, sweep
+
+
+def test_sweep_falls_back_when_hub_rejects_streams(tmp_path):
+    settings = {
+        "stablequeue_api_key": "key",
+        "stablequeue_api_secret": "secret",
+        "stablequeue_job_delay": 0,
+        "stablequeue_track_jobs": False,
+        "stablequeue_stream_threshold": 1,
+        "stablequeue_log_level": "ERROR",
+    }
+    with FakeHub() as hub:
+        stablequeue = backend.Backend(settings.get, hub.url, str(tmp_path))
+        plan = sweep.build_plan(200, 1000)
+        params = dict(BASE_PARAMS, target_server_alias="gpu-1", seed=1000)
+
+        assert stablequeue.submit_plan(params, plan, hub.url, "key", "secret") == len(plan)
+        assert stablequeue.client(hub.url, "key", "secret").capabilities["stream_submit"] is False
+        assert hub.stats["jobs"] == len(plan)
+
+
+def test_large_sweep_streams_when_hub_accepts_chunked_uploads(tmp_path):
+    settings = {
+        "stablequeue_api_key": "key",
+        "stablequeue_api_secret": "secret",
+        "stablequeue_job_delay": 0,
+        "stablequeue_track_jobs": False,
+        "stablequeue_stream_threshold": 1000,
+        # Small chunks and a short queue, so the producer runs into backpressure
+        "stablequeue_stream_chunk_bytes": 4096,
+        "stablequeue_stream_max_pending": 2,
+        "stablequeue_log_level": "ERROR",
+    }
+    with FakeHub(stream=True) as hub:
+        stablequeue = backend.Backend(settings.get, hub.url, str(tmp_path))
+        plan = sweep.build_plan(5000, 1000)
+        params = dict(BASE_PARAMS, target_server_alias="gpu-1", seed=1000)
+
+        assert stablequeue.submit_plan(params, plan, hub.url, "key", "secret") == len(plan)
+        assert stablequeue.client(hub.url, "key", "secret").capabilities["stream_submit"] is True
+        assert hub.stats["jobs"] == len(plan)
+        # One streamed request, sent in many chunks
+        assert hub.stats["requests"] == 1 and hub.stats["chunks"] > 1
@@ -0,0 +1,13 @@
+import pytest
+
+from lib_stablequeue import sweep
+
+
+def test_unknown_axis_is_rejected():
+    with pytest.raises(ValueError, match="step"):
+        sweep.parse_axes("step=20|30")
+
+
+def test_known_axes_and_wildcards_parse():
+    axes = sweep.parse_axes("steps=20|30; sampler_name=Euler|DPM++ 2M; wildcards", "a {red|blue} cat")
+    assert axes == {"steps": [20, 30], "sampler_name": ["Euler", "DPM++ 2M"], "prompt": ["a red cat", "a blue cat"]}
@@ -0,0 +1,38 @@
+import time
+
+from benchmarks.fake_hub import FakeHub
+from lib_stablequeue import hub_client, tracker
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_jobs_unknown_to_the_hub_are_lost_and_evicted(monkeypatch):
+    monkeypatch.setattr(tracker, "MAX_FINISHED_JOBS", 0)
+    lost = []
+    with FakeHub() as hub:
+        # The fake hub has no status endpoints, so every poll is a 404
+        client = hub_client.get_client(hub.url, "key", "secret")
+        jobs = tracker.JobTracker(lambda: client, min_interval=0.01, max_interval=0.02, max_misses=3)
+        jobs.add_listener(lambda job: lost.append(job["job_id"]) if job["status"] == tracker.LOST else None)
+        for job_id in ("a", "b", "c"):
+            jobs.track(job_id, "gpu-1")
+
+        assert wait_for(lambda: len(lost) == 3)
+        assert jobs.outstanding() == 0
+        assert jobs.jobs() == []
+
+
+def test_jobs_older_than_max_age_are_lost():
+    with FakeHub() as hub:
+        client = hub_client.get_client(hub.url, "key", "secret")
+        jobs = tracker.JobTracker(lambda: client, min_interval=0.01, max_interval=0.02, max_misses=0, max_age=0.1)
+        jobs.track("a", "gpu-1")
+
+        assert wait_for(lambda: jobs.get("a")["status"] == tracker.LOST)
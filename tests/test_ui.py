@@ -0,0 +1,22 @@
+from benchmarks import forge_stubs
+from benchmarks.fake_hub import FakeHub
+
+
+def test_server_dropdowns_fill_on_page_load():
+    with FakeHub() as hub:
+        opts = forge_stubs.install({"stablequeue_url": hub.url, "stablequeue_log_level": "ERROR"}, stub_gradio=True)
+        module = forge_stubs.load_extension()
+        listeners = forge_stubs._Component.listeners
+        del listeners[:]
+
+        opts.update(stablequeue_api_key="key", stablequeue_api_secret="secret")
+        script = module.StableQueueScript()
+        script.ui(False)
+        module.create_stablequeue_tab()
+
+        loads = [kwargs for _, event, kwargs in listeners if event == "load"]
+        assert len(loads) == 2
+        for kwargs in loads:
+            # Building the UI never waits on the hub, so the dropdowns start out empty
+            assert kwargs["outputs"][0].kwargs["choices"] == ["Configure API key in settings"]
+            assert kwargs["fn"]()["choices"] == ["gpu-1", "gpu-2", module.routing.AUTO_ALIAS]